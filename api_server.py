@@ -0,0 +1,218 @@
+# api_server.py
+"""
+HTTP/JSON API for consumers other than the dashboard (MES screens, BI tools): filtered KPI values, panel trends
+and filter options. Results come from pages/dashboard_page.compute_panel_results, the same resolution as the
+dashboard: precompute.py artifacts for the default and single-site views, then the SQL query backend, then the
+shared filtered frames.
+
+Responses are cached in-process per (path, filters, language, data fingerprint) and carry an ETag hashed from the
+body, so every worker tags the same body alike and a display polling with If-None-Match gets a 304 from the cached
+body until a source file changes. Numbers are rounded to config.API_FLOAT_DECIMALS decimals. Identical
+requests arriving while a response is being computed wait for that one computation, which runs in a worker thread
+so the event loop keeps serving cached responses.
+
+Run next to the dashboard (starlette ships with streamlit; uvicorn is a separate install):
+    uvicorn api_server:app --host 0.0.0.0 --port 8600 --workers 4
+
+Endpoints (filters are repeatable query parameters, e.g. ?site=Plant%20A&site=Plant%20B&shift=Night):
+    GET /api/health
+    GET /api/filters                                  options per filter dimension
+    GET /api/panels                                   headless panels and their title keys
+    GET /api/kpis?panel=...&lang=EN&<filters>         KPI values and previous values per panel
+    GET /api/trends/{panel}?lang=EN&<filters>         trend tables of one panel (pandas orient "split")
+    GET /wallboard, /api/wallboard/state, /api/wallboard/events      kiosk mode, see wallboard.py
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import config
+import precomputed_store
+import panel_registry
+import wallboard
+from pages import dashboard_page
+from utils import get_unique_options_from_dfs_list
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEYS = ["site", "region", "department", "fc", "shift"] # Same dimensions as the sidebar filters
+
+def filter_options() -> Dict[str, List[str]]:
+    """Options per filter dimension, from the same source as the sidebar (SQL backend or raw frames)."""
+    query_backend = dashboard_page.get_synced_query_backend()
+    if query_backend is not None:
+        return {key: query_backend.distinct_values(key) for key in FILTER_KEYS}
+    raw_dfs = dashboard_page.get_all_raw_dataframes_for_filters()
+    return {key: get_unique_options_from_dfs_list(raw_dfs, key) for key in FILTER_KEYS}
+
+def _json_number(value: Any) -> Optional[float]:
+    return None if value is None or pd.isna(value) else round(float(value), config.API_FLOAT_DECIMALS)
+
+def _encode(payload: Any) -> bytes:
+    return json.dumps(payload, default=precomputed_store.json_default, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+# --- Response Cache ---
+class ResponseCache:
+    """LRU of encoded response bodies. Only touched from the event loop thread, so it needs no lock."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._bodies: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+
+    async def get_or_build(self, key: Tuple, build_body: Callable[[], bytes]) -> bytes:
+        body = self._bodies.get(key)
+        if body is not None:
+            self._bodies.move_to_end(key)
+            return body
+        pending = self._in_flight.get(key)
+        if pending is None: # First request for this key computes; concurrent identical ones await the same task
+            pending = asyncio.ensure_future(run_in_threadpool(build_body))
+            self._in_flight[key] = pending
+            pending.add_done_callback(lambda _task: self._in_flight.pop(key, None))
+        body = await asyncio.shield(pending) # A disconnecting client does not cancel the shared computation
+        self._bodies[key] = body
+        self._bodies.move_to_end(key)
+        while len(self._bodies) > self.max_entries:
+            self._bodies.popitem(last=False)
+        return body
+
+_RESPONSES = ResponseCache(config.API_RESPONSE_CACHE_MAX_ENTRIES)
+_FINGERPRINT: Tuple[float, str] = (0.0, "")
+
+def _data_fingerprint() -> str:
+    """precomputed_store.current_data_fingerprint, re-checked at most every config.API_FINGERPRINT_TTL_S seconds."""
+    global _FINGERPRINT
+    checked_at, fingerprint = _FINGERPRINT
+    if time.monotonic() - checked_at > config.API_FINGERPRINT_TTL_S:
+        _FINGERPRINT = (time.monotonic(), precomputed_store.current_data_fingerprint())
+    return _FINGERPRINT[1]
+
+def _filter_selections(request: Request) -> Dict[str, List[str]]:
+    return {key: request.query_params.getlist(key) for key in FILTER_KEYS if request.query_params.getlist(key)}
+
+def _error(status_code: int, message: str) -> Response:
+    return Response(_encode({"error": message}), status_code=status_code, media_type="application/json")
+
+async def _cached_json(request: Request, key_parts: Tuple, build_payload: Callable[[str], Any]) -> Response:
+    """Response for `key_parts` under the current data: 304 on a matching If-None-Match, cached body otherwise."""
+    data_fingerprint = _data_fingerprint()
+    cache_key = (request.url.path,) + key_parts + (data_fingerprint,)
+    body = await _RESPONSES.get_or_build(cache_key, lambda: _encode(build_payload(data_fingerprint)))
+    etag = '"' + hashlib.sha1(body).hexdigest()[:24] + '"'
+    headers = {"ETag": etag, "Cache-Control": f"max-age={config.API_CACHE_MAX_AGE_S}"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def _request_lang(request: Request) -> Optional[str]:
+    lang_code = request.query_params.get("lang", config.DEFAULT_LANG)
+    return lang_code if lang_code in config.TEXT_STRINGS else None
+
+# --- Endpoints ---
+async def health(request: Request) -> Response:
+    return Response(_encode({"status": "ok", "data_fingerprint": _data_fingerprint()}), media_type="application/json")
+
+async def filters(request: Request) -> Response:
+    return await _cached_json(request, (), lambda _fingerprint: filter_options())
+
+async def panels(request: Request) -> Response:
+    return await _cached_json(request, (), lambda _fingerprint: [
+        {"panel": panel_name_key, "title_key": panel_spec.title_key, "data_sources": list(panel_spec.data_sources)}
+        for panel_name_key, panel_spec in panel_registry.get_panel_specs(compute_only=True).items()])
+
+async def kpis(request: Request) -> Response:
+    lang_code = _request_lang(request)
+    if lang_code is None:
+        return _error(400, f"Unknown language; use one of {list(config.TEXT_STRINGS)}.")
+    available_panels = list(panel_registry.get_panel_specs(compute_only=True))
+    panel_names = request.query_params.getlist("panel") or available_panels
+    unknown_panels = [name for name in panel_names if name not in available_panels]
+    if unknown_panels:
+        return _error(404, f"Unknown panel(s): {unknown_panels}.")
+    filter_selections = _filter_selections(request)
+
+    def build_payload(data_fingerprint: str) -> Dict[str, Any]:
+        results = dashboard_page.compute_panel_results(filter_selections, lang_code, panel_names, data_fingerprint)
+        return {"filters": filter_selections, "data_fingerprint": data_fingerprint, "panels": {
+            panel_name_key: {"has_data": result.has_data,
+                             "kpis": {kpi_key: _json_number(value) for kpi_key, value in result.kpis.items()},
+                             "previous_kpis": {kpi_key: _json_number(value) for kpi_key, value in result.previous_kpis.items()}}
+            for panel_name_key, result in results.items()}}
+    key_parts = (tuple(sorted((k, tuple(sorted(v))) for k, v in filter_selections.items())), tuple(panel_names), lang_code)
+    return await _cached_json(request, key_parts, build_payload)
+
+async def trends(request: Request) -> Response:
+    panel_name_key = request.path_params["panel"]
+    lang_code = _request_lang(request)
+    if lang_code is None:
+        return _error(400, f"Unknown language; use one of {list(config.TEXT_STRINGS)}.")
+    if panel_name_key not in panel_registry.get_panel_specs(compute_only=True):
+        return _error(404, f"Unknown panel '{panel_name_key}'.")
+    filter_selections = _filter_selections(request)
+
+    def build_payload(data_fingerprint: str) -> Dict[str, Any]:
+        result = dashboard_page.compute_panel_results(filter_selections, lang_code, [panel_name_key], data_fingerprint).get(panel_name_key)
+        trends_payload = {}
+        for trend_key, trend_obj in (result.trends.items() if result is not None else []):
+            if isinstance(trend_obj, (pd.Series, pd.DataFrame)): # Same orient as the precompute.py artifacts
+                trends_payload[trend_key] = json.loads(trend_obj.to_json(orient="split", date_format="iso",
+                                                                         double_precision=config.API_FLOAT_DECIMALS))
+        return {"panel": panel_name_key, "filters": filter_selections, "data_fingerprint": data_fingerprint, "trends": trends_payload}
+    key_parts = (tuple(sorted((k, tuple(sorted(v))) for k, v in filter_selections.items())), lang_code)
+    return await _cached_json(request, key_parts, build_payload)
+
+# --- Wallboard ---
+def _wallboard_board(request: Request) -> Tuple[Optional[wallboard.Board], Optional[Response]]:
+    """Board of the request's filters (default config.WALLBOARD_FILTERS), panels and language, or an error response."""
+    lang_code = _request_lang(request)
+    if lang_code is None:
+        return None, _error(400, f"Unknown language; use one of {list(config.TEXT_STRINGS)}.")
+    available_panels = list(panel_registry.get_panel_specs(compute_only=True))
+    panel_names = request.query_params.getlist("panel") or config.WALLBOARD_PANELS or available_panels
+    unknown_panels = [name for name in panel_names if name not in available_panels]
+    if unknown_panels:
+        return None, _error(404, f"Unknown panel(s): {unknown_panels}.")
+    filter_selections = _filter_selections(request) or config.WALLBOARD_FILTERS
+    return wallboard.get_board(filter_selections, panel_names, lang_code), None
+
+async def wallboard_page(request: Request) -> Response:
+    rotate_s = float(request.query_params.get("rotate", config.WALLBOARD_ROTATE_S))
+    return HTMLResponse(wallboard.render_page(_request_lang(request) or config.DEFAULT_LANG, rotate_s))
+
+async def wallboard_state(request: Request) -> Response:
+    board, error_response = _wallboard_board(request)
+    if board is None:
+        return error_response
+    await board.ensure_built()
+    return Response(_encode(board.state()), media_type="application/json", headers={"Cache-Control": "no-store"})
+
+async def wallboard_events(request: Request) -> Response:
+    board, error_response = _wallboard_board(request)
+    if board is None:
+        return error_response
+    await board.ensure_built()
+    return StreamingResponse(wallboard.event_stream(board), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}) # No proxy buffering of the stream
+
+app = Starlette(routes=[
+    Route("/api/health", health),
+    Route("/api/filters", filters),
+    Route("/api/panels", panels),
+    Route("/api/kpis", kpis),
+    Route("/api/trends/{panel}", trends),
+    Route("/wallboard", wallboard_page),
+    Route("/api/wallboard/state", wallboard_state),
+    Route("/api/wallboard/events", wallboard_events),
+])
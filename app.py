@@ -5,7 +5,7 @@ from ui_components import (display_language_selector, display_navigation,
                            display_sidebar_filters, display_optional_modules_toggle,
                            display_footer)
 from pages import dashboard_page, glossary_page
-from typing import Callable, Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional
 import pandas as pd
 import logging
 
@@ -52,8 +52,12 @@ app_mode_selected = display_navigation(st.session_state, _)
 filter_selections: Dict[str, List[str]] = {}
 if app_mode_selected == dashboard_nav_label:
     try:
-        all_raw_dataframes_for_filter_options = dashboard_page.get_all_raw_dataframes_for_filters()
-        filter_selections = display_sidebar_filters(all_raw_dataframes_for_filter_options, _)
+        query_backend = dashboard_page.get_synced_query_backend()
+        if query_backend is not None: # Filter options come from SELECT DISTINCT instead of loading every file
+            filter_selections = display_sidebar_filters([], _, options_provider=query_backend.distinct_values)
+        else:
+            all_raw_dataframes_for_filter_options = dashboard_page.get_all_raw_dataframes_for_filters()
+            filter_selections = display_sidebar_filters(all_raw_dataframes_for_filter_options, _)
     except Exception as e:
         logger.error(f"Error populating sidebar filters: {e}")
         st.sidebar.error("Error loading filter options.")
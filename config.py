@@ -1,5 +1,5 @@
 # config.py
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
 # --- App Basics ---
 APP_TITLE_KEY = "app_title"
@@ -30,6 +30,165 @@ ALL_DATA_FILE_CONSTANTS = [ # Used by dashboard_page.get_all_raw_dataframes_for_
     "TEAM_COHESION_DATA_FILE", "PERCEIVED_WORKLOAD_DATA_FILE", "SPATIAL_DATA_FILE"
 ]
 
+# --- Precomputed Results Store (written by precompute.py, read first by dashboard_page.render) ---
+PRECOMPUTED_STORE_DIR = "precomputed"
+PRECOMPUTE_DEFAULT_WORKERS = 4 # Process pool size for the batch job (one task per site view)
+
+# --- Snapshot Export (see export_snapshots.py) ---
+EXPORT_DIR = "exports" # One dated subfolder per run, one folder per site inside it
+EXPORT_DEFAULT_FORMATS = ["html", "csv"] # Also "png" / "pdf" (figure images, need the kaleido package)
+EXPORT_PLOTLYJS = "cdn" # plotly.js in the HTML pages: "cdn", or True to inline it (offline, ~3.5 MB per page)
+EXPORT_IMAGE_WIDTH = 1200 # Pixels of the PNG / PDF figure images
+EXPORT_IMAGE_HEIGHT = 600
+
+# --- HTTP/JSON API (see api_server.py) ---
+API_RESPONSE_CACHE_MAX_ENTRIES = 512 # Encoded responses kept per API process (least recently used dropped)
+API_FINGERPRINT_TTL_S = 1.0 # Source files are stat'ed at most this often, however many requests arrive
+API_CACHE_MAX_AGE_S = 5 # Cache-Control max-age; clients revalidate with the ETag afterwards
+API_FLOAT_DECIMALS = 4 # Decimals of the numbers in API responses and snapshot exports
+
+# --- Wallboard / Kiosk Mode (see wallboard.py, served by api_server.py at /wallboard) ---
+WALLBOARD_FILTERS: Dict[str, List[str]] = {} # Fixed filter set when the URL has none, e.g. {"site": ["Plant A"]}
+WALLBOARD_PANELS: Optional[List[str]] = None # Panels rotated through when the URL names none (None: every headless panel)
+WALLBOARD_ROTATE_S = 20 # Seconds each panel is shown
+WALLBOARD_REFRESH_S = 10 # Source files are checked this often while a screen is connected
+WALLBOARD_HEARTBEAT_S = 15 # Keep-alive comment on the event stream when nothing changed
+WALLBOARD_RECONNECT_MS = 3000 # Browser retry delay after the event stream drops
+WALLBOARD_QUEUE_MAX = 32 # Updates buffered per screen; a screen further behind is dropped and reloads the state
+WALLBOARD_MAX_EXTEND_POINTS = 24 # Larger appends to a trace are sent as a restyle of the whole trace
+WALLBOARD_MAX_BOARDS = 64 # Boards kept per API process; beyond it the least recently used boards without screens are dropped
+WALLBOARD_IDLE_TTL_S = 600 # A board without screens is dropped this long after its last use
+
+# --- Query Backend ---
+# "pandas": every source is held as an in-memory DataFrame (default).
+# "duckdb" / "sqlite": sources are loaded into an embedded database file and filters/aggregations run as SQL
+# (see query_backend.py). "duckdb" falls back to "sqlite" if the duckdb package is not installed.
+DATA_BACKEND = "pandas"
+SQL_BACKEND_DB_PATH = "data/vitalsigns.db"
+
+# --- Shared In-Process Data Store ---
+# Raw frames and filtered results are cached once per server process (st.cache_resource) and handed to every
+# session by reference, so memory grows with the number of distinct filter combinations, not with sessions.
+SHARED_FILTERED_VIEWS_MAX_ENTRIES = 64 # Least recently used filter combinations beyond this are dropped (per source)
+
+# --- Lazy Rendering ---
+# Panels from the "Advanced Analytics" section on are collapsed behind a toggle: their data is loaded and their
+# figures built only once opened. Panel results are cached in the session for the current filters and language.
+LAZY_RENDER_BELOW_FOLD = True
+
+# --- Host-Wide Data Plane (multi-process deployments, see data_plane.py) ---
+# Directory of memory-mapped column files shared by all app processes on the host; None loads per process.
+DATA_PLANE_DIR: Optional[str] = None # e.g. "data_plane"
+DATA_PLANE_WATCH_INTERVAL_S = 30 # Poll interval of `python data_plane.py --watch`
+
+# --- Source Refresh (per-process loading, see utils.load_data_main) ---
+# A changed source file is read by a background thread while the previous version keeps being served, then swapped
+# in; False reloads it in the request that notices the change.
+DATA_REFRESH_IN_BACKGROUND = True
+
+# --- Retention Tiers (see retention_tiers.py) ---
+# Dated sources served as raw rows for their last raw_days days, daily rollups back to daily_days days and monthly
+# rollups beyond, compacted into TIER_STORE_DIR once per file version. None serves the full history of every file.
+# Downtime and OEE keep their raw rows (their engines bucket by minute / hour), as does spatial (positions).
+TIER_STORE_DIR: Optional[str] = None # e.g. "data_tiers"
+RETENTION_DEFAULT_POLICY: Dict[str, int] = {"raw_days": 90, "daily_days": 730}
+RETENTION_POLICIES: Dict[str, Dict[str, int]] = { # DATA_SOURCE_MAP key -> policy
+    source_key: RETENTION_DEFAULT_POLICY for source_key in
+    ["stability", "stress", "tasks", "collaboration", "wellbeing", "resilience", "psych_safety", "team_cohesion", "perceived_workload"]
+}
+TIER_DIMENSION_KEYS = ["site", "region", "department", "fc", "shift"] # Columns rollups group by (the sidebar filters / drill-down levels)
+TIER_COUNT_SUFFIX = " (Count)" # Header suffix of the column holding how many values a rolled-up value stands for
+TIER_MAINTENANCE_INTERVAL_S = 3600 # Poll interval of `python retention_tiers.py --watch`
+
+# --- Downtime Engine (see downtime_engine.py) ---
+# The downtime log is aggregated once per process, then only appended lines are read. Intervals are
+# FACILITY_CONFIG["MINUTES_PER_INTERVAL"] minutes, combined on the chart so it shows at most DOWNTIME_MAX_INTERVAL_BARS.
+DOWNTIME_MAX_INTERVAL_BARS = 120
+DOWNTIME_PARETO_TOP_CAUSES = 6 # Causes shown in the pie; the rest are combined into one "Other (n causes)" slice
+DOWNTIME_PERIOD_MINUTES = 24 * 60 # Previous value of the total: the total before the latest period of this length
+
+# --- OEE Rollups (see oee_engine.py) ---
+SHIFT_SCHEDULE = {"Morning": 6, "Afternoon": 14, "Night": 22} # Shift name -> start hour, for shift-granularity buckets
+OEE_PLANNED_TIME_SHARE = 1.0 # Share of calendar time a downtime group is planned to run (e.g. 1/3 for groups split by 8h shift)
+OEE_DEFAULT_GRANULARITY = "day" # "hour" | "shift" | "day" | "month", selected first in the OEE trend
+OEE_TREND_MAX_POINTS = 400 # Most recent buckets shown per granularity
+
+# --- Driver Analysis (see drivers_engine.py) ---
+# Metrics correlated across sources, aligned on their shared dimensions and month. Only sources with a date key in
+# pages/dashboard_page.DATA_SOURCE_MAP can take part; metrics missing from a file are skipped.
+DRIVER_METRICS: Dict[str, List[str]] = { # DATA_SOURCE_MAP key -> conceptual metric keys
+    "stability": ["rotation_rate", "retention_12m", "exits"],
+    "stress": ["stress_level_survey", "overtime_hours", "unfilled_shifts"],
+    "psych_safety": ["psych_safety_score"],
+    "perceived_workload": ["perceived_workload"],
+    "tasks": ["task_compliance_rate"],
+    "wellbeing": ["wellbeing_index"],
+    "oee": ["oee_overall", "oee_availability"]
+}
+DRIVER_MAX_LAG_MONTHS = 3 # Lagged matrices pair each metric with the others 1..N months later
+DRIVER_MIN_OBSERVATIONS = 6 # (group, month) pairs a correlation needs; fewer shows as no data
+DRIVER_MIN_ABS_CORRELATION = 0.3 # Weaker relations are not reported as drivers
+DRIVER_TOP_PAIRS = 5 # Driver relations listed in the insights
+
+# --- Drill-Down (see drilldown_engine.py) ---
+# KPIs of every source are rolled up once per data fingerprint along the dimension hierarchy below, so the drill-down
+# panel expands any node (e.g. a site) into its children's KPIs without reading the rows again. Levels a source has
+# no column for are skipped in its hierarchy. Aggregation "mean" averages the rows of a node, "sum" totals them.
+DRILLDOWN_LEVELS = ["region", "site", "department", "fc", "shift"]
+DRILLDOWN_METRICS: Dict[str, Dict[str, Tuple[str, str]]] = { # DATA_SOURCE_MAP key -> metric key -> (aggregation, label key)
+    "stability": {"rotation_rate": ("mean", "rotation_rate_metric"), "retention_12m": ("mean", "retention_12m_metric"),
+                  "hires": ("sum", "hires_label"), "exits": ("sum", "exits_label")},
+    "safety": {"incidents": ("sum", "incidents_label"), "near_misses": ("sum", "near_misses_label")},
+    "engagement": {"labor_climate_score": ("mean", "labor_climate_score_metric"), "enps_score": ("mean", "enps_metric"),
+                   "participation_rate": ("mean", "participation_rate_label")},
+    "stress": {"stress_level_survey": ("mean", "stress_level_label"), "overtime_hours": ("sum", "overtime_label"),
+               "unfilled_shifts": ("sum", "unfilled_shifts_label")},
+    "tasks": {"task_compliance_rate": ("mean", "task_compliance_rate_metric_card")},
+    "collaboration": {"collaboration_score": ("mean", "collaboration_score_label")},
+    "wellbeing": {"wellbeing_index": ("mean", "wellbeing_index_label")},
+    "downtime": {"downtime_duration": ("sum", "downtime_duration_label")}, # Merged minutes per group (downtime_engine)
+    "oee": {"oee_overall": ("mean", "oee_overall_label"), "oee_availability": ("mean", "oee_availability_label"),
+            "oee_performance": ("mean", "oee_performance_label"), "oee_quality": ("mean", "oee_quality_label")},
+    "resilience": {"resilience_score": ("mean", "resilience_score_card")},
+    "psych_safety": {"psych_safety_score": ("mean", "psych_safety_score_label")},
+    "team_cohesion": {"team_cohesion_index": ("mean", "team_cohesion_label")},
+    "perceived_workload": {"perceived_workload": ("mean", "perceived_workload_metric_card")}
+}
+DRILLDOWN_DEFAULT_METRIC = "rotation_rate" # Selected first in the drill-down panel
+DRILLDOWN_MISSING_LABEL = "-" # Node of the rows without a value at a level
+
+# --- Scenario Modeling (see scenario_engine.py) ---
+# What-if projections. Each outcome KPI is regressed on the scenario drivers over the (group, month) monthly means of
+# the driver analysis cube, within groups (each group's own mean removed), so a coefficient is the change in the
+# outcome that came with a unit change in the driver. A scenario changes drivers by a percentage of each site's
+# baseline (its mean over the last SCENARIO_BASELINE_MONTHS months with data) and adds the implied change to the
+# outcome baselines. Drivers or outcomes missing from the data are left out.
+SCENARIO_METRICS: Dict[str, List[str]] = { # DATA_SOURCE_MAP key -> conceptual metric keys (drivers and outcomes)
+    "stress": ["overtime_hours", "unfilled_shifts", "stress_level_survey"],
+    "stability": ["hires", "rotation_rate"],
+    "oee": ["oee_overall", "oee_availability"]
+}
+SCENARIO_DRIVERS: Dict[str, str] = { # Metric key -> label key of its slider
+    "overtime_hours": "overtime_label", "unfilled_shifts": "unfilled_shifts_label", "hires": "hires_label"
+}
+SCENARIO_OUTCOMES: Dict[str, Tuple[str, bool]] = { # Metric key -> (label key, higher is better)
+    "stress_level_survey": ("stress_level_label", False), "rotation_rate": ("rotation_rate_metric", False),
+    "oee_overall": ("oee_overall_label", True), "oee_availability": ("oee_availability_label", True)
+}
+SCENARIO_CHANGE_RANGE_PCT = (-50, 50) # Slider range of a driver change, in % of its baseline
+SCENARIO_CHANGE_STEP_PCT = 5
+SCENARIO_BASELINE_MONTHS = 3
+SCENARIO_MIN_OBSERVATIONS = 12 # (group, month) observations an outcome model needs beyond its number of drivers
+
+# --- Figure Payloads ---
+# Round trace data to display precision, shorten dates and share hover templates (see visualizations.py and
+# figure_payload_benchmark.py). Off sends full-precision data and per-trace formatting, as before.
+COMPACT_FIGURE_PAYLOADS = True
+
+# --- Startup Import Budget (checked by import_budget.py) ---
+STARTUP_IMPORT_MODULES = ["config", "utils", "ui_components", "pages.dashboard_page"] # What app.py needs before the first render
+STARTUP_IMPORT_BUDGET_MS = 2500 # Cold import time per module above, including its dependencies
+
 # --- Column Mapping (Conceptual Name -> Actual CSV Column Header) ---
 # !!! THIS IS CRITICAL - MAKE SURE IT MATCHES YOUR CSV FILES EXACTLY !!!
 COLUMN_MAP: Dict[str, Any] = {
@@ -97,7 +256,118 @@ COLUMN_MAP: Dict[str, Any] = {
     # Facility Config related conceptual keys (map to keys in FACILITY_CONFIG dict)
     "facility_width_key": "FACILITY_WIDTH", "facility_height_key": "FACILITY_HEIGHT",
     "facility_minutes_per_interval_key": "MINUTES_PER_INTERVAL",
-    "facility_work_areas_key": "WORK_AREAS", "facility_entry_exit_key": "ENTRY_EXIT_POINTS"
+    "facility_work_areas_key": "WORK_AREAS", "facility_entry_exit_key": "ENTRY_EXIT_POINTS",
+    "work_area": "Work Area" # Name of a FACILITY_CONFIG["WORK_AREAS"] area, for KPIs on the plant map
+}
+
+# --- Column Type Hints (Conceptual Name -> compact dtype applied at ingest by utils.optimize_dtypes) ---
+# "category": low-cardinality dimension strings; "float": 0-10 scores, percentages, coordinates, kept as float64 so
+# means and sums carry no float32 rounding noise; "int": counts, downcast to the smallest integer type that fits
+# (float64 if the column has gaps).
+COLUMN_TYPE_HINTS: Dict[str, str] = {
+    # Dimensions
+    "site": "category", "region": "category", "department": "category", "fc": "category", "shift": "category",
+    "month": "category", "spatial_zone": "category", "spatial_status": "category",
+    "downtime_cause": "category", "downtime_shift": "category",
+    # Percentages & scores
+    "rotation_rate": "float", "retention_6m": "float", "retention_12m": "float", "retention_18m": "float",
+    "labor_climate_score": "float", "enps_score": "float", "participation_rate": "float", "psych_safety_score": "float",
+    "stress_level_survey": "float", "overtime_hours": "float", "workload_perception": "float",
+    "psychological_signals": "float", "perceived_workload": "float", "task_compliance_rate": "float",
+    "collaboration_score": "float", "team_cohesion_index": "float", "wellbeing_index": "float",
+    "downtime_duration": "float", "oee_availability": "float", "oee_performance": "float",
+    "oee_quality": "float", "oee_overall": "float", "resilience_score": "float",
+    # Coordinates
+    "worker_x_coord": "float", "worker_y_coord": "float", "spatial_z_coord": "float",
+    # Counts
+    "hires": "int", "exits": "int", "incidents": "int", "near_misses": "int", "days_without_accidents": "int",
+    "active_alerts": "int", "recognitions_count": "int", "unfilled_shifts": "int",
+}
+
+# --- Source Schemas (validated once per file version at ingest, see schema_registry.py) ---
+# Conceptual keys per DATA_SOURCE_MAP source. A missing required column makes the source's report fail; missing
+# optional columns only disable the figures that use them.
+SCHEMA_DIMENSION_KEYS: List[str] = ["region", "department", "fc", "shift"]
+SOURCE_SCHEMAS: Dict[str, Dict[str, List[str]]] = {
+    "stability": {"required": ["site", "date", "rotation_rate"],
+                  "optional": SCHEMA_DIMENSION_KEYS + ["retention_6m", "retention_12m", "retention_18m", "hires", "exits"]},
+    "safety": {"required": ["site", "month", "incidents"],
+               "optional": SCHEMA_DIMENSION_KEYS + ["near_misses", "days_without_accidents", "active_alerts", "work_area"]},
+    "engagement": {"required": ["site"],
+                   "optional": SCHEMA_DIMENSION_KEYS + ["labor_climate_score", "enps_score", "participation_rate", "recognitions_count",
+                                                        "initiative", "autonomy", "recognition", "growth", "belonging"]},
+    "stress": {"required": ["site", "date"],
+               "optional": SCHEMA_DIMENSION_KEYS + ["stress_level_survey", "overtime_hours", "unfilled_shifts", "workload_perception", "psychological_signals"]},
+    "tasks": {"required": ["site", "task_date", "task_compliance_rate"], "optional": SCHEMA_DIMENSION_KEYS},
+    "collaboration": {"required": ["site", "collaboration_date", "collaboration_score"], "optional": SCHEMA_DIMENSION_KEYS},
+    "wellbeing": {"required": ["site", "wellbeing_date", "wellbeing_index"], "optional": SCHEMA_DIMENSION_KEYS},
+    "downtime": {"required": ["site", "downtime_date", "downtime_duration"], "optional": SCHEMA_DIMENSION_KEYS + ["downtime_cause", "downtime_shift", "work_area"]},
+    "oee": {"required": ["site", "oee_date"], # OEE (%) is derived from its factors when the file lacks it (see oee_engine.py)
+            "optional": SCHEMA_DIMENSION_KEYS + ["oee_overall", "oee_availability", "oee_performance", "oee_quality"]},
+    "resilience": {"required": ["site", "resilience_date", "resilience_score"], "optional": SCHEMA_DIMENSION_KEYS},
+    "psych_safety": {"required": ["site", "psych_safety_date", "psych_safety_score"], "optional": SCHEMA_DIMENSION_KEYS},
+    "team_cohesion": {"required": ["site", "team_cohesion_date", "team_cohesion_index"], "optional": SCHEMA_DIMENSION_KEYS},
+    "perceived_workload": {"required": ["site", "workload_date", "perceived_workload"], "optional": SCHEMA_DIMENSION_KEYS},
+    "spatial": {"required": ["spatial_timestamp", "worker_x_coord", "worker_y_coord"],
+                "optional": ["site", "spatial_worker_id", "spatial_zone", "spatial_status", "spatial_z_coord"]},
+}
+
+# File headers accepted for a conceptual key besides its COLUMN_MAP header (matched case-insensitively). The
+# conceptual key itself is always accepted, e.g. "rotation_rate" for "Rotation Rate (%)".
+COLUMN_ALIASES: Dict[str, List[str]] = {
+    "fc": ["functional_category"], "enps_score": ["nps", "enps"], "participation_rate": ["participation"],
+    "psych_safety_date": ["Survey Date"], "oee_overall": ["oee"], "downtime_duration": ["downtime_minutes"],
+    "work_area": ["area"],
+}
+
+# Unit per conceptual key: "date" columns are parsed as datetimes, "month" columns (month names or year-month) are
+# mapped to real months in their month key column, the others are parsed as numbers checked against UNIT_RANGES. Values that do not parse or fall outside the range are counted in the report and set to NaN / NaT.
+COLUMN_UNITS: Dict[str, str] = {
+    "date": "date", "task_date": "date", "collaboration_date": "date", "wellbeing_date": "date", "downtime_date": "date",
+    "oee_date": "date", "resilience_date": "date", "psych_safety_date": "date", "team_cohesion_date": "date",
+    "workload_date": "date", "spatial_timestamp": "date", "month": "month",
+    "rotation_rate": "percent", "retention_6m": "percent", "retention_12m": "percent", "retention_18m": "percent",
+    "participation_rate": "percent", "task_compliance_rate": "percent", "oee_availability": "percent",
+    "oee_performance": "percent", "oee_quality": "percent", "oee_overall": "percent",
+    "stress_level_survey": "score_10", "workload_perception": "score_10", "psychological_signals": "score_10",
+    "perceived_workload": "score_10", "wellbeing_index": "score_10", "psych_safety_score": "score_10",
+    "collaboration_score": "score_100", "team_cohesion_index": "score_100", "resilience_score": "score_100",
+    "labor_climate_score": "score_100", "enps_score": "enps",
+    "hires": "count", "exits": "count", "incidents": "count", "near_misses": "count", "days_without_accidents": "count",
+    "active_alerts": "count", "recognitions_count": "count", "unfilled_shifts": "count",
+    "overtime_hours": "hours", "downtime_duration": "minutes",
+    "worker_x_coord": "number", "worker_y_coord": "number", "spatial_z_coord": "number",
+    "initiative": "number", "autonomy": "number", "recognition": "number", "growth": "number", "belonging": "number",
+}
+MISSING_VALUE_MARKERS: List[str] = ["", "nan", "NaN", "NaT", "None"] # Blank cells after the string cleanup at ingest
+
+# --- Date Normalization (see date_normalization.py) ---
+# Formats tried, in order, on a sample of a date column's distinct values; the one parsing most of them is cached
+# per (file, column). Month-first before day-first: "1/2/2023" is January 2nd unless a value only fits day-first.
+DATE_FORMAT_CANDIDATES: List[str] = [
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S.%f",
+    "%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S",
+    "%Y/%m/%d", "%d.%m.%Y", "%d-%m-%Y", "%m/%d/%y", "%d/%m/%y", "ISO8601",
+]
+DATE_FORMAT_SAMPLE_SIZE = 500 # Distinct values the inference looks at
+DATE_SPLIT_MIN_DISTINCT = 20_000 # Distinct non-ISO timestamps from which date and time parts are parsed separately
+MONTH_FORMAT_CANDIDATES: List[str] = ["%Y-%m", "%Y/%m", "%m/%Y", "%Y-%m-%d"] # Month columns holding numbers
+MONTH_NAMES: Dict[str, int] = { # Lower-cased month names and abbreviations (EN / ES) -> month number
+    name: number for number, names in enumerate([
+        ["jan", "january", "ene", "enero"], ["feb", "february", "febrero"], ["mar", "march", "marzo"],
+        ["apr", "april", "abr", "abril"], ["may", "mayo"], ["jun", "june", "junio"], ["jul", "july", "julio"],
+        ["aug", "august", "ago", "agosto"], ["sep", "sept", "september", "septiembre", "set", "setiembre"],
+        ["oct", "october", "octubre"], ["nov", "november", "noviembre"], ["dec", "december", "dic", "diciembre"]], start=1)
+    for name in names
+}
+# Year of month names without one ("Jan") when no value of their column has a year to infer it from (the year of the
+# bundled samples); None leaves such values unparsed (NaT, counted as invalid in the validation report).
+MONTH_DEFAULT_YEAR: Optional[int] = 2023
+MONTH_KEY_SUFFIX = " (Month Key)" # Header suffix of the first-day-of-month column added per date / month column
+
+UNIT_RANGES: Dict[str, tuple] = { # Inclusive (min, max); None = unbounded
+    "percent": (0.0, 100.0), "score_10": (0.0, 10.0), "score_100": (0.0, 100.0), "enps": (-100.0, 100.0),
+    "count": (0.0, None), "hours": (0.0, None), "minutes": (0.0, None), "number": (None, None),
 }
 
 # --- Default Filter Selections ---
@@ -145,8 +415,15 @@ FACILITY_CONFIG = {
     ]
 }
 
+# --- Plant Map (see plant_map.py) ---
+# Per-area KPIs drawn on the FACILITY_CONFIG layout: KPI key -> (label key, plotly colorscale of the area fills).
+PLANT_MAP_KPIS: Dict[str, Tuple[str, str]] = {
+    "occupancy": ("plant_map_occupancy_label", "Blues"),
+    "downtime": ("plant_map_downtime_label", "OrRd"),
+    "incidents": ("plant_map_incidents_label", "Reds"),
+}
+
 # --- Placeholder Text ---
-PLACEHOLDER_TEXT_PLANT_MAP = """<div style='text-align: center; border: 1px dashed #7F8C8D; padding: 15px; margin:10px 0; background-color: #34495E;'><h5 style='color: #ECF0F1;'>📍 Interactive Plant Map (Future)</h5><p style='color: #BDC3C7; font-size: small;'><i>Visualize KPIs on a plant layout.</i></p></div>"""
 PLACEHOLDER_TEXT_AI_INSIGHTS = """<div style='text-align: center; border: 1px dashed #3498DB; padding: 15px; margin:10px 0; background-color: #34495E;'><h5 style='color: #ECF0F1;'>🤖 Predictive AI Insights (Future)</h5><p style='color: #BDC3C7; font-size: small;'><i>AI-driven predictions and recommendations.</i></p></div>"""
 
 # --- Text Strings for Internationalization (i18n) ---
@@ -188,6 +465,7 @@ TEXT_STRINGS: Dict[str, Dict[str, str]] = {
         "overtime_label": "Total Overtime", "unfilled_shifts_label": "Total Unfilled Shifts", "workload_vs_psych_chart_title": "Workload Perception vs. Psych. Stress Signals",
         "no_data_workload_psych": "Date, Workload, or Psych. Signals missing.", "workload_perception_label": "Avg. Workload Perception", "psychological_signals_label": "Avg. Psych. Stress Signals",
         "average_score_label": "Average Score (0-10)", "advanced_analytics_title": "🚀 Advanced Operational & People Analytics",
+        "lazy_panel_toggle": "Show", "lazy_panels_hint": "Panels below load when opened.",
 
         "task_compliance_title": "✅ Task Compliance", "task_compliance_rate_metric_card": "Avg. Task Compliance", "task_compliance_rate_gauge": "Task Compliance Rate",
         "task_compliance_trend_chart_title": "Task Compliance Score Trend", "compliance_label": "Compliance", "forecast_label": "Forecast", "task_compliance_help": "Target: > {target}%",
@@ -208,6 +486,27 @@ TEXT_STRINGS: Dict[str, Dict[str, str]] = {
         "total_downtime_shift_clock_title": "Downtime This Shift", "downtime_current_shift_card": "Shift Downtime", "downtime_shift_help": "Total downtime for selected shift(s).",
         "downtime_interval_plot_title": "Downtime per Interval", "downtime_duration_label": "Downtime", "no_data_downtime_interval": "Downtime date or duration missing.",
         "downtime_cause_plot_title": "Downtime by Cause", "downtime_by_cause_pie_title": "Downtime by Cause", "no_data_downtime_cause": "Downtime cause or duration missing.",
+        "downtime_by_shift_chart_title": "Downtime by Shift", "shift_label": "Shift", "minutes_label": "Minutes", "other_causes_label": "Other ({count} causes)",
+        "oee_granularity_label": "Granularity", "granularity_hour": "Hour", "granularity_shift": "Shift", "granularity_day": "Day", "granularity_month": "Month",
+        "oee_overall_label": "Overall OEE", "oee_availability_label": "Availability", "oee_performance_label": "Performance", "oee_quality_label": "Quality",
+        "drivers_title": "🔗 Drivers & Correlations", "drivers_heatmap_title": "Correlation Between Metrics", "drivers_lag_label": "Months Later",
+        "drivers_lag_option": "{months} mo.", "drivers_heatmap_lag_suffix": "{months} Months Later", "drivers_leading_axis": "Metric",
+        "drivers_following_axis": "Metric (Later)", "correlation_label": "Correlation", "no_data_drivers_lag": "Not enough overlapping months for this lag.",
+        "insight_driver_same_month": "{driver} and {outcome} move {direction} (r = {correlation:.2f}, {observations} observations).",
+        "insight_driver_lagged": "{driver} is followed {lag} months later by {direction} {outcome} (r = {correlation:.2f}, {observations} observations).",
+        "driver_direction_together": "together", "driver_direction_opposite": "in opposite directions",
+        "driver_direction_higher": "higher", "driver_direction_lower": "lower", "no_driver_insights": "No strong relations between metrics for the current filters.",
+        "data_as_of": "Data as of {timestamp}", "data_refreshing": "refreshing…", "data_as_of_unavailable": "Data as of: N/A",
+        "drilldown_title": "🔎 Drill-Down", "drilldown_metric_label": "KPI", "drilldown_all_option": "All",
+        "drilldown_chart_title": "KPI Breakdown", "drilldown_path_caption": "Showing: {path}", "drilldown_leaf_info": "Lowest level reached: nothing further to expand.",
+        "region_label": "Region", "site_label": "Site", "department_label": "Department", "fc_label": "Functional Category",
+        "participation_rate_label": "Survey Participation", "stress_level_label": "Stress Level",
+        "scenario_title": "🧪 Scenario Modeling", "scenario_drivers_label": "Change the drivers (% of each site's recent level):",
+        "scenario_outcome_label": "Outcome by site", "scenario_baseline_label": "Baseline", "scenario_projected_label": "Projected",
+        "scenario_chart_title": "Baseline vs. Projected by Site", "scenario_model_caption": "{outcome}: fitted on {observations} monthly observations (R² = {r_squared:.2f}).",
+        "scenario_no_model": "Not enough overlapping history to relate the drivers to the outcomes.",
+        "plant_map_kpi_label": "KPI per area", "plant_map_chart_title": "Plant Layout", "plant_map_entry_label": "Entry / Exit",
+        "plant_map_occupancy_label": "Occupancy (workers)", "plant_map_downtime_label": "Downtime (min)", "plant_map_incidents_label": "Incidents",
 
         "oee_dashboard_title": "⚙️ OEE", "oee_availability_card": "Availability", "oee_availability_gauge": "Availability (%)",
         "oee_performance_card": "Performance", "oee_performance_gauge": "Performance (%)", "oee_quality_card": "Quality", "oee_quality_gauge": "Quality (%)",
@@ -222,7 +521,7 @@ TEXT_STRINGS: Dict[str, Dict[str, str]] = {
         "time_label_spatial": "Time: {time_val} min", "distribution_map_note": "Scatter plot of worker locations.", "scatter_map_viz_missing": "Scatter map viz function unavailable.",
         "no_data_spatial_scatter": "Coordinate columns missing.", "x_coordinate_label": "X Coordinate (m)", "y_coordinate_label": "Y Coordinate (m)",
 
-        "plant_map_title": "📍 Plant Map (Future)", "ai_insights_title": "🤖 AI Insights (Future)",
+        "plant_map_title": "📍 Plant Map", "ai_insights_title": "🤖 AI Insights",
         "no_data_for_metric": "No data for this metric.", "no_data_for_trend": "No data for this trend.", "no_data_for_plot": "No data for this plot.",
         "translation_missing": "MISSING TRANSLATION ({key})" # For debugging missing translations
     },
@@ -231,6 +530,31 @@ TEXT_STRINGS: Dict[str, Dict[str, str]] = {
         "dashboard_nav_label": "Dashboard", "glossary_nav_label": "Glosario", "navigation_label": "Navegación",
         "filters_header": "Filtros", "select_site": "Seleccionar Sitio(s)", # ... and so on for ALL keys
         "stability_panel_title": "📈 Estabilidad Laboral",
+        "lazy_panel_toggle": "Mostrar", "lazy_panels_hint": "Los paneles siguientes se cargan al abrirlos.",
+        "downtime_analysis_title": "⏱️ Análisis de Paros", "downtime_interval_plot_title": "Paros por Intervalo", "downtime_by_cause_pie_title": "Paros por Causa",
+        "downtime_by_shift_chart_title": "Paros por Turno", "shift_label": "Turno", "minutes_label": "Minutos", "other_causes_label": "Otras ({count} causas)",
+        "oee_dashboard_title": "⚙️ OEE", "oee_trends_chart_title": "Tendencia de Componentes OEE", "oee_granularity_label": "Granularidad", "granularity_hour": "Hora", "granularity_shift": "Turno",
+        "granularity_day": "Día", "granularity_month": "Mes", "oee_overall_label": "OEE Global", "oee_availability_label": "Disponibilidad",
+        "oee_performance_label": "Rendimiento", "oee_quality_label": "Calidad",
+        "drivers_title": "🔗 Impulsores y Correlaciones", "drivers_heatmap_title": "Correlación Entre Métricas", "drivers_lag_label": "Meses Después",
+        "drivers_lag_option": "{months} m.", "drivers_heatmap_lag_suffix": "{months} Meses Después", "drivers_leading_axis": "Métrica",
+        "drivers_following_axis": "Métrica (Posterior)", "correlation_label": "Correlación", "no_data_drivers_lag": "No hay suficientes meses en común para este desfase.",
+        "insight_driver_same_month": "{driver} y {outcome} se mueven {direction} (r = {correlation:.2f}, {observations} observaciones).",
+        "insight_driver_lagged": "{driver} va seguido {lag} meses después de {direction} {outcome} (r = {correlation:.2f}, {observations} observaciones).",
+        "driver_direction_together": "en la misma dirección", "driver_direction_opposite": "en direcciones opuestas",
+        "driver_direction_higher": "mayor", "driver_direction_lower": "menor", "no_driver_insights": "No hay relaciones fuertes entre métricas con los filtros actuales.",
+        "data_as_of": "Datos a {timestamp}", "data_refreshing": "actualizando…", "data_as_of_unavailable": "Datos a: N/D",
+        "drilldown_title": "🔎 Desglose", "drilldown_metric_label": "KPI", "drilldown_all_option": "Todos",
+        "drilldown_chart_title": "Desglose del KPI", "drilldown_path_caption": "Mostrando: {path}", "drilldown_leaf_info": "Nivel más bajo alcanzado: no hay más que desglosar.",
+        "region_label": "Región", "site_label": "Planta", "department_label": "Departamento", "fc_label": "Categoría Funcional",
+        "participation_rate_label": "Participación en Encuestas", "stress_level_label": "Nivel de Estrés",
+        "scenario_title": "🧪 Modelado de Escenarios", "scenario_drivers_label": "Cambie los impulsores (% del nivel reciente de cada planta):",
+        "scenario_outcome_label": "Resultado por planta", "scenario_baseline_label": "Base", "scenario_projected_label": "Proyectado",
+        "scenario_chart_title": "Base vs. Proyectado por Planta", "scenario_model_caption": "{outcome}: ajustado con {observations} observaciones mensuales (R² = {r_squared:.2f}).",
+        "scenario_no_model": "No hay suficiente historial en común para relacionar los impulsores con los resultados.",
+        "plant_map_title": "📍 Mapa de Planta", "plant_map_kpi_label": "KPI por área", "plant_map_chart_title": "Distribución de Planta",
+        "plant_map_entry_label": "Entrada / Salida", "plant_map_occupancy_label": "Ocupación (trabajadores)",
+        "plant_map_downtime_label": "Paros (min)", "plant_map_incidents_label": "Incidentes",
         "rotation_rate_gauge": "Tasa de Rotación",
         "no_data_for_visualization_default": "No hay datos disponibles para esta visualización.",
         "translation_missing": "TRADUCCIÓN FALTANTE ({key})",
@@ -0,0 +1,213 @@
+# data_plane.py
+"""
+Host-wide shared data plane for multi-process deployments (several Streamlit servers behind a load balancer).
+Each source is decoded once per host into one .npy file per column under config.DATA_PLANE_DIR; every app
+process memory-maps those files, so the frames' pages are shared by all processes through the OS page cache.
+
+Refresh protocol:
+  - a source's generation is the fingerprint (path, size, mtime) of its CSV; files are written into a new
+    generation directory, then the source manifest is switched atomically with os.replace,
+  - readers compare the manifest fingerprint with the CSV's current fingerprint on every load (one stat call),
+    and attach the new generation as soon as it is published,
+  - publishing is serialized per host with a lock file, so a stale source is rebuilt by one process only.
+Sources are published either lazily by the first app process that needs them, or ahead of time by the daemon:
+    python data_plane.py --watch [--interval 30] [--plane-dir data_plane]
+Enabled with config.DATA_PLANE_DIR (utils.load_data_main then reads through load_source transparently).
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import config
+from precomputed_store import source_files_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+LOCK_FILE_NAME = ".publish.lock"
+
+# file path + date columns -> (fingerprint, attached frame), per process
+_ATTACHED: Dict[str, Tuple[str, pd.DataFrame]] = {}
+_ATTACH_LOCK = threading.Lock()
+
+def _source_id(file_path: str, date_cols_actual_names: Optional[List[str]]) -> str:
+    """The same CSV parsed with different date columns is a different source."""
+    key = json.dumps([os.path.abspath(file_path), sorted(date_cols_actual_names or [])])
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+def _manifest_path(plane_dir: str, source_id: str) -> str:
+    return os.path.join(plane_dir, f"{source_id}.manifest.json")
+
+@contextlib.contextmanager
+def _publisher_lock(plane_dir: str) -> Iterator[None]:
+    """Exclusive, host-wide lock for publishing (advisory file lock; in-process only where fcntl is unavailable)."""
+    os.makedirs(plane_dir, exist_ok=True)
+    with open(os.path.join(plane_dir, LOCK_FILE_NAME), "a") as lock_file:
+        try:
+            import fcntl
+        except ImportError: # Windows: app processes may occasionally publish the same generation twice, which is harmless
+            with _ATTACH_LOCK:
+                yield
+            return
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+# --- Publishing ---
+def _column_entry(col_values: pd.Series, generation_dir: str, file_stem: str) -> Dict[str, Any]:
+    """Writes one column as .npy files and returns its manifest entry. Strings are stored as categoricals."""
+    if not isinstance(col_values.dtype, pd.CategoricalDtype) and \
+       (pd.api.types.is_object_dtype(col_values.dtype) or pd.api.types.is_string_dtype(col_values.dtype)):
+        col_values = col_values.astype("category")
+
+    if isinstance(col_values.dtype, pd.CategoricalDtype):
+        categories = col_values.cat.categories
+        np.save(os.path.join(generation_dir, f"{file_stem}.codes.npy"), col_values.cat.codes.to_numpy())
+        entry = {"kind": "category", "codes": f"{file_stem}.codes.npy", "ordered": bool(col_values.cat.ordered)}
+        if pd.api.types.is_numeric_dtype(categories.dtype) or pd.api.types.is_datetime64_dtype(categories.dtype):
+            np.save(os.path.join(generation_dir, f"{file_stem}.categories.npy"), categories.to_numpy())
+            entry["categories_file"] = f"{file_stem}.categories.npy"
+        else:
+            entry["categories"] = [str(category) for category in categories]
+        return entry
+
+    if isinstance(col_values.dtype, pd.DatetimeTZDtype):
+        np.save(os.path.join(generation_dir, f"{file_stem}.npy"), col_values.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy())
+        return {"kind": "datetime_tz", "values": f"{file_stem}.npy", "tz": str(col_values.dt.tz)}
+
+    if pd.api.types.is_extension_array_dtype(col_values.dtype): # Nullable Int/Float/boolean: NaN-filled float64
+        values = col_values.to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        values = col_values.to_numpy()
+    np.save(os.path.join(generation_dir, f"{file_stem}.npy"), values)
+    return {"kind": "values", "values": f"{file_stem}.npy"}
+
+def publish_source(file_path: str, date_cols_actual_names: Optional[List[str]], df: pd.DataFrame,
+                   fingerprint: str, plane_dir: str) -> None:
+    """Writes `df` as a new generation of the source and switches its manifest to it. Caller holds the publisher lock."""
+    source_id = _source_id(file_path, date_cols_actual_names)
+    generation_name = f"{source_id}.{fingerprint[:12]}"
+    generation_dir = os.path.join(plane_dir, generation_name)
+    shutil.rmtree(generation_dir, ignore_errors=True) # Leftover of an interrupted publish
+    os.makedirs(generation_dir)
+
+    columns = []
+    for position, col in enumerate(df.columns):
+        entry = _column_entry(df[col], generation_dir, f"c{position}")
+        entry["name"] = str(col)
+        columns.append(entry)
+    manifest = {"version": MANIFEST_VERSION, "file_path": file_path, "fingerprint": fingerprint,
+                "generation": generation_name, "rows": len(df), "columns": columns}
+    manifest_path = _manifest_path(plane_dir, source_id)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    # Older generations: processes that still map them keep their pages until they re-attach (POSIX unlink
+    # semantics); where files in use can't be removed (Windows) they are left for the next publish.
+    for entry_name in os.listdir(plane_dir):
+        if entry_name.startswith(f"{source_id}.") and entry_name != generation_name and \
+           os.path.isdir(os.path.join(plane_dir, entry_name)):
+            shutil.rmtree(os.path.join(plane_dir, entry_name), ignore_errors=True)
+    logger.info(f"Published '{file_path}' to the data plane ({len(df)} rows, {len(columns)} columns, generation {generation_name}).")
+
+# --- Attaching ---
+def _read_manifest(plane_dir: str, source_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_manifest_path(plane_dir, source_id), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+def attach_source(file_path: str, date_cols_actual_names: Optional[List[str]], fingerprint: str,
+                  plane_dir: str) -> Optional[pd.DataFrame]:
+    """Memory-maps the published generation matching `fingerprint` (read-only, no copy), or None if there is none."""
+    manifest = _read_manifest(plane_dir, _source_id(file_path, date_cols_actual_names))
+    if manifest is None or manifest.get("fingerprint") != fingerprint:
+        return None
+    generation_dir = os.path.join(plane_dir, manifest["generation"])
+    try:
+        data = {}
+        for entry in manifest["columns"]:
+            if entry["kind"] == "category":
+                codes = np.load(os.path.join(generation_dir, entry["codes"]), mmap_mode="r")
+                categories = np.load(os.path.join(generation_dir, entry["categories_file"])) if "categories_file" in entry else entry["categories"]
+                data[entry["name"]] = pd.Categorical.from_codes(codes, categories=pd.Index(categories), ordered=entry["ordered"], validate=False)
+            elif entry["kind"] == "datetime_tz":
+                values = np.load(os.path.join(generation_dir, entry["values"]), mmap_mode="r")
+                data[entry["name"]] = pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(entry["tz"])
+            else:
+                data[entry["name"]] = np.load(os.path.join(generation_dir, entry["values"]), mmap_mode="r")
+    except (OSError, ValueError, KeyError) as e: # Generation replaced between reading the manifest and mapping it
+        logger.warning(f"Could not attach '{file_path}' from the data plane: {e}")
+        return None
+    return pd.DataFrame(data, index=pd.RangeIndex(manifest["rows"]), copy=False)
+
+def load_source(file_path: str, date_cols_actual_names: Optional[List[str]],
+                loader: Callable[[str, Optional[List[str]]], pd.DataFrame], plane_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Client entry point (used by utils.load_data_main): returns the source attached from the data plane,
+    publishing it first with `loader` if no process has published the current generation yet.
+    The returned frame is backed by read-only memory maps.
+    """
+    plane_dir = plane_dir or config.DATA_PLANE_DIR
+    attach_key = _source_id(file_path, date_cols_actual_names)
+    fingerprint = source_files_fingerprint([file_path])
+    attached = _ATTACHED.get(attach_key)
+    if attached is not None and attached[0] == fingerprint:
+        return attached[1]
+
+    df = attach_source(file_path, date_cols_actual_names, fingerprint, plane_dir)
+    if df is None:
+        with _publisher_lock(plane_dir):
+            df = attach_source(file_path, date_cols_actual_names, fingerprint, plane_dir) # Published while we waited?
+            if df is None:
+                loaded_df = loader(file_path, date_cols_actual_names)
+                if loaded_df.empty: # Missing / unreadable file: nothing to share, the loader already reported it
+                    return loaded_df
+                publish_source(file_path, date_cols_actual_names, loaded_df, fingerprint, plane_dir)
+                df = attach_source(file_path, date_cols_actual_names, fingerprint, plane_dir)
+                if df is None:
+                    df = loaded_df
+    with _ATTACH_LOCK:
+        _ATTACHED[attach_key] = (fingerprint, df)
+    return df
+
+# --- Daemon ---
+def publish_all() -> int:
+    """Publishes every stale dashboard source (same file / date column combinations as the app). Returns the source count."""
+    from pages import dashboard_page
+    raw_dfs = dashboard_page.load_raw_dataframes()
+    dashboard_page.get_all_raw_dataframes_for_filters()
+    return sum(1 for df in raw_dfs.values() if not df.empty)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Publish the dashboard sources to the shared data plane.")
+    parser.add_argument("--plane-dir", default=config.DATA_PLANE_DIR or "data_plane", help="Data plane directory (config.DATA_PLANE_DIR).")
+    parser.add_argument("--watch", action="store_true", help="Keep running and republish sources whose files change.")
+    parser.add_argument("--interval", type=float, default=config.DATA_PLANE_WATCH_INTERVAL_S, help="Seconds between checks with --watch.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    config.DATA_PLANE_DIR = args.plane_dir # Route utils.load_data_main through load_source in this process
+
+    sources_published = publish_all()
+    logger.info(f"Data plane '{args.plane_dir}' is current: {sources_published} sources.")
+    while args.watch:
+        time.sleep(args.interval)
+        publish_all() # Only sources whose fingerprint changed are reloaded
+    return 0 if sources_published else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+# date_normalization.py
+"""
+Date normalization for ingest (schema_registry.validate_frame) and the engines that read CSVs themselves.
+
+Dates are parsed with an explicit format in one vectorized pass: ISO formats directly, other formats over the
+distinct values of the column, which are far fewer than its rows. The format is inferred once per (file, column)
+from a sample of the values against config.DATE_FORMAT_CANDIDATES and cached, so later versions of the file and
+appended lines skip the inference; it is inferred again only when the cached format stops parsing some value.
+
+Month columns without a day ("Jan", "2023-01", "Enero 2023") become real months. A month name without a year takes
+it from the other values of the column: it is the latest such month not after the latest month given with a year.
+When no value of the column has a year, config.MONTH_DEFAULT_YEAR is used, or the value is left unparsed if that is
+None. Inferred years are logged as a warning. Every date and month column gets a month key column
+(month_key_header) holding the first day of its month, which utils.month_periods and the trend code group on.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_FORMAT = "mixed" # Per-value inference by pandas: correct but slow, used only when no candidate fits
+
+def month_key_header(header: str) -> str:
+    """Header of the month key column derived from a date or month column."""
+    return f"{header}{config.MONTH_KEY_SUFFIX}"
+
+def _sample_positions(length: int) -> np.ndarray:
+    """Up to config.DATE_FORMAT_SAMPLE_SIZE positions spread evenly over `length` values."""
+    return np.unique(np.linspace(0, length - 1, min(length, config.DATE_FORMAT_SAMPLE_SIZE)).astype(int))
+
+def _is_native_format(date_format: str) -> bool:
+    """ISO formats, which pandas parses natively; the others go through strptime value by value."""
+    return date_format == "ISO8601" or date_format.startswith("%Y-%m-%d")
+
+def _parse_distinct(distinct_values: np.ndarray, date_format: str) -> pd.DatetimeIndex:
+    """
+    pd.to_datetime of distinct values with an explicit format. Many distinct timestamps in a non-ISO format are split
+    into their date and time parts, which repeat far more often, and each part is parsed once per distinct value.
+    """
+    date_format_part, _, time_format_part = date_format.partition(" ")
+    if not time_format_part or date_format == FALLBACK_FORMAT or len(distinct_values) < config.DATE_SPLIT_MIN_DISTINCT:
+        return pd.to_datetime(distinct_values, format=date_format, errors="coerce")
+    parts = pd.Series(distinct_values).str.split(" ", n=1, expand=True)
+    if parts.shape[1] != 2:
+        return pd.to_datetime(distinct_values, format=date_format, errors="coerce")
+    date_codes, distinct_dates = pd.factorize(parts[0])
+    time_codes, distinct_times = pd.factorize(parts[1])
+    dates = np.append(pd.to_datetime(distinct_dates, format=date_format_part, errors="coerce").to_numpy(), np.datetime64("NaT", "ns"))
+    times = np.append((pd.to_datetime(distinct_times, format=time_format_part, errors="coerce") - pd.Timestamp("1900-01-01")).to_numpy(),
+                      np.timedelta64("NaT", "ns"))
+    return pd.DatetimeIndex(dates[date_codes] + times[time_codes])
+
+def _parse_with_format(values: pd.Series, date_format: str) -> pd.Series:
+    """One vectorized pass: directly for ISO formats, otherwise over the distinct values (codes == -1: missing)."""
+    if _is_native_format(date_format):
+        return pd.Series(pd.to_datetime(values, format=date_format, errors="coerce"), index=values.index)
+    codes, distinct_values = pd.factorize(values)
+    parsed = _parse_distinct(np.asarray(distinct_values, dtype=object).astype(str), date_format)
+    parsed_values = np.append(np.asarray(parsed, dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+    return pd.Series(parsed_values[codes], index=values.index)
+
+def infer_date_format(distinct_values: np.ndarray) -> str:
+    """The candidate format parsing most of a sample of the values (the first listed on a tie), else FALLBACK_FORMAT."""
+    sample = pd.Series(distinct_values[_sample_positions(len(distinct_values))]).astype(str)
+    best_format, best_parsed = FALLBACK_FORMAT, 0
+    for date_format in config.DATE_FORMAT_CANDIDATES:
+        parsed_count = int(pd.to_datetime(sample, format=date_format, errors="coerce").notna().sum())
+        if parsed_count > best_parsed:
+            best_format, best_parsed = date_format, parsed_count
+        if parsed_count == len(sample):
+            break
+    return best_format
+
+# (file path, column header) -> date format, per process
+_FORMATS: Dict[Tuple[str, str], str] = {}
+_FORMATS_LOCK = threading.Lock()
+
+def _given_values(values: pd.Series) -> pd.Series:
+    given = values.notna()
+    if values.dtype == object: # Blank cells come back as "nan" strings from the string cleanup at ingest
+        given &= ~values.astype(str).isin(config.MISSING_VALUE_MARKERS)
+    return given
+
+def _remember_format(file_path: str, header: str, date_format: str):
+    if date_format == FALLBACK_FORMAT:
+        logger.warning(f"No date format of config.DATE_FORMAT_CANDIDATES fits '{header}' in '{file_path}'; parsing value by value.")
+    else:
+        logger.info(f"Date format of '{header}' in '{file_path}': {date_format}.")
+    with _FORMATS_LOCK:
+        _FORMATS[(file_path, header)] = date_format
+
+def parse_dates(values: pd.Series, file_path: str, header: str) -> pd.Series:
+    """Datetime values of a column; values that do not parse are NaT. The format is cached per (file, column)."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    given = _given_values(values)
+    values = values.where(given)
+    if not given.any():
+        return pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    with _FORMATS_LOCK:
+        date_format = _FORMATS.get((file_path, header))
+    if date_format is None: # First version of the file seen by this process
+        date_format = infer_date_format(pd.unique(values[given].to_numpy(dtype=object)[_sample_positions(int(given.sum()))]))
+        _remember_format(file_path, header, date_format)
+    parsed = _parse_with_format(values, date_format)
+    failed = parsed.isna() & given
+    if failed.any(): # Values the cached format does not cover: switch only if another format covers more
+        new_format = infer_date_format(pd.unique(values[failed].to_numpy(dtype=object)))
+        if new_format not in (date_format, FALLBACK_FORMAT):
+            new_parsed = _parse_with_format(values, new_format)
+            if new_parsed.notna().sum() > parsed.notna().sum():
+                parsed = new_parsed
+                _remember_format(file_path, header, new_format)
+    return parsed
+
+def _parse_month_text(text: str) -> Tuple[Optional[pd.Timestamp], Optional[int]]:
+    """(month start, None) for a month with a year, (None, month number) for a bare month name, (None, None) otherwise."""
+    cleaned = text.strip()
+    for month_format in config.MONTH_FORMAT_CANDIDATES:
+        try:
+            return pd.Timestamp(datetime.strptime(cleaned, month_format)).to_period("M").to_timestamp(), None
+        except ValueError:
+            continue
+    parts = cleaned.replace("-", " ").replace("/", " ").split()
+    month_number = config.MONTH_NAMES.get(parts[0].lower().rstrip(".")) if parts else None
+    if month_number is None:
+        return None, None
+    if len(parts) > 1 and parts[-1].isdigit() and len(parts[-1]) == 4: # "Enero 2023", "Sept. 2023"
+        return pd.Timestamp(year=int(parts[-1]), month=month_number, day=1), None
+    return None, month_number
+
+def parse_months(values: pd.Series, source: str = "") -> pd.Series:
+    """
+    First day of the month of each value ("Jan", "January 2023", "2023-01", ...); NaT where none is recognized.
+    Month names without a year get one inferred as described in the module docstring; `source` names the column
+    in the warning.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.to_period("M").dt.to_timestamp()
+    codes, distinct_values = pd.factorize(values.where(_given_values(values)))
+    parsed = [_parse_month_text(str(value)) for value in distinct_values] # One call per distinct month
+    months: List[Optional[pd.Timestamp]] = [month for month, _month_number in parsed]
+    bare = [position for position, (month, month_number) in enumerate(parsed) if month_number is not None]
+    if bare:
+        given_months = [month for month in months if month is not None]
+        latest = max(given_months) if given_months else None
+        if latest is None and config.MONTH_DEFAULT_YEAR is None:
+            logger.warning(f"{len(bare)} month name(s) without a year in {source or 'a month column'} and no year to "
+                           "infer them from (config.MONTH_DEFAULT_YEAR is None); left unparsed.")
+        else:
+            for position in bare:
+                month_number = parsed[position][1]
+                if latest is None:
+                    year = config.MONTH_DEFAULT_YEAR
+                else: # Latest such month not after the latest month given with a year
+                    year = latest.year if month_number <= latest.month else latest.year - 1
+                months[position] = pd.Timestamp(year=year, month=month_number, day=1)
+            inferred_from = f"the latest month given with a year ({latest:%Y-%m})" if latest is not None else \
+                f"config.MONTH_DEFAULT_YEAR ({config.MONTH_DEFAULT_YEAR})"
+            logger.warning(f"Inferred the year of {len(bare)} month name(s) without one in {source or 'a month column'} "
+                           f"from {inferred_from}.")
+    parsed_values = np.array([np.datetime64(ts, "ns") if ts is not None else np.datetime64("NaT", "ns") for ts in months]
+                             + [np.datetime64("NaT", "ns")], dtype="datetime64[ns]")
+    return pd.Series(parsed_values[codes], index=values.index)
+
+def month_starts(dates: pd.Series) -> pd.Series:
+    """First day of the month of datetime values (NaT stays NaT), vectorized on the datetime64[M] view."""
+    return pd.Series(dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]").astype("datetime64[ns]"), index=dates.index)
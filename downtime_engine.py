@@ -0,0 +1,369 @@
+# downtime_engine.py
+"""
+Incremental downtime aggregation over large event logs (config.DOWNTIME_DATA_FILE, one row per event).
+The log is parsed once per process; after that only the bytes appended since the last read are parsed and
+folded into the aggregates, so the downtime panel never groups the raw event log on a rerun.
+
+Aggregates are kept per dimension group (the filter columns present in the log, e.g. site + shift):
+  - downtime minutes per group and per interval of FACILITY_CONFIG["MINUTES_PER_INTERVAL"] minutes, after merging
+    overlapping events of the same group (an event ends at start + duration),
+  - raw minutes and event count per group and cause (cause Pareto),
+  - the last merged interval of each group, which later events may still extend.
+Sidebar filters are applied to the small group table (utils.compute_filter_mask), not to the events.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+import config
+import date_normalization
+import schema_registry
+from utils import compute_filter_mask
+
+logger = logging.getLogger(__name__)
+
+DIMENSION_KEYS = ["site", "region", "department", "fc", "shift", "downtime_shift", "work_area"] # COLUMN_MAP keys grouped by
+FILTER_FALLBACKS = {"shift": "downtime_shift"} # Sidebar filter -> log column key it applies to when the log lacks the filter's column
+TAIL_SIGNATURE_BYTES = 4096 # Bytes before the read offset hashed to tell an appended log from a rewritten one
+DISPLAY_BAR_MINUTES = [1, 2, 5, 10, 15, 30, 60, 120, 240, 480, 720, 1440, 10080] # Preferred combined interval widths
+
+def _interval_contributions(group_ids: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                            interval_minutes: float) -> pd.Series:
+    """Minutes of each [start, end) interval (minutes since epoch) falling into each interval bucket, summed per (group, bucket)."""
+    if len(starts) == 0:
+        return pd.Series(dtype="float64", index=pd.MultiIndex.from_arrays([[], []], names=["group", "bucket"]))
+    first_bucket = np.floor(starts / interval_minutes).astype(np.int64)
+    last_bucket = np.maximum(np.ceil(ends / interval_minutes).astype(np.int64) - 1, first_bucket)
+    bucket_counts = last_bucket - first_bucket + 1
+    interval_pos = np.repeat(np.arange(len(starts)), bucket_counts)
+    buckets = first_bucket[interval_pos] + (np.arange(bucket_counts.sum()) - np.repeat(np.cumsum(bucket_counts) - bucket_counts, bucket_counts))
+    minutes = np.minimum(ends[interval_pos], (buckets + 1) * interval_minutes) - np.maximum(starts[interval_pos], buckets * interval_minutes)
+    contributions = pd.Series(minutes, index=pd.MultiIndex.from_arrays([group_ids[interval_pos], buckets], names=["group", "bucket"]))
+    return contributions.groupby(level=["group", "bucket"]).sum()
+
+def merge_overlapping_intervals(group_ids: np.ndarray, starts: np.ndarray,
+                                ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Unions overlapping [start, end) intervals within each group. Returns (group_ids, starts, ends) sorted by group, start."""
+    if len(starts) == 0:
+        return group_ids, starts, ends
+    order = np.lexsort((starts, group_ids))
+    group_ids, starts, ends = group_ids[order], starts[order], ends[order]
+    # Shift each group onto its own stretch of the axis so one running maximum covers all groups
+    origin = starts.min()
+    group_span = ends.max() - origin + 1.0
+    shifted_ends = np.maximum.accumulate(ends - origin + group_ids * group_span)
+    segment_start = np.ones(len(starts), dtype=bool)
+    segment_start[1:] = (starts[1:] - origin + group_ids[1:] * group_span) > shifted_ends[:-1]
+    segment_idx = np.flatnonzero(segment_start)
+    return group_ids[segment_idx], starts[segment_idx], np.maximum.reduceat(ends, segment_idx)
+
+class DowntimeAggregates:
+    """Running downtime aggregates of one event log. Thread-safe: updates and queries share one lock."""
+
+    def __init__(self, date_col: str, duration_col: str, cause_col: Optional[str], shift_col: Optional[str],
+                 dimension_cols: List[str], interval_minutes: Optional[float] = None, source_path: str = ""):
+        self.date_col, self.duration_col, self.cause_col, self.shift_col = date_col, duration_col, cause_col, shift_col
+        self.source_path = source_path # Keys the cached date format of the log (see date_normalization.py)
+        self.dimension_cols = dimension_cols
+        self.interval_minutes = float(interval_minutes or config.FACILITY_CONFIG.get("MINUTES_PER_INTERVAL", 1))
+        self.groups = pd.DataFrame(columns=dimension_cols) # group id (row position) -> dimension values, as strings
+        self._group_ids: Dict[tuple, int] = {}
+        self._group_minutes = np.zeros(0) # merged downtime minutes per group
+        self._group_events = np.zeros(0, dtype=np.int64)
+        self._group_event_minutes = np.zeros(0) # sum of the events' own durations (overlaps counted twice)
+        self._tail_starts = np.zeros(0) # last merged interval per group (NaN: none yet)
+        self._tail_ends = np.zeros(0)
+        self._interval_totals = _interval_contributions(np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), 1.0)
+        self._cause_totals = pd.DataFrame(columns=["minutes", "events"], index=pd.MultiIndex.from_arrays([[], []], names=["group", "cause"]))
+        self.event_count = 0
+        self._lock = threading.RLock()
+
+    # --- Updating ---
+    def _resolve_group_ids(self, events: pd.DataFrame) -> np.ndarray:
+        if not self.dimension_cols:
+            if not self._group_ids:
+                self._add_groups([()])
+            return np.zeros(len(events), dtype=np.int64)
+        dims = pd.MultiIndex.from_frame(events[self.dimension_cols].astype(object).fillna("").astype(str))
+        distinct = dims.unique()
+        new_groups = [key for key in distinct if key not in self._group_ids]
+        if new_groups:
+            self._add_groups(new_groups)
+        distinct_ids = np.array([self._group_ids[key] for key in distinct], dtype=np.int64)
+        return distinct_ids[distinct.get_indexer(dims)]
+
+    def _add_groups(self, new_groups: List[tuple]) -> None:
+        for key in new_groups:
+            self._group_ids[key] = len(self._group_ids)
+        if self.dimension_cols:
+            added_groups = pd.DataFrame(new_groups, columns=self.dimension_cols)
+            self.groups = added_groups if self.groups.empty else pd.concat([self.groups, added_groups], ignore_index=True)
+        else:
+            self.groups = pd.DataFrame(index=range(len(self._group_ids)))
+        grown = len(new_groups)
+        self._group_minutes = np.concatenate([self._group_minutes, np.zeros(grown)])
+        self._group_events = np.concatenate([self._group_events, np.zeros(grown, dtype=np.int64)])
+        self._group_event_minutes = np.concatenate([self._group_event_minutes, np.zeros(grown)])
+        self._tail_starts = np.concatenate([self._tail_starts, np.full(grown, np.nan)])
+        self._tail_ends = np.concatenate([self._tail_ends, np.full(grown, np.nan)])
+
+    def add_events(self, events: pd.DataFrame) -> bool:
+        """
+        Folds a batch of events into the aggregates. Events need not be sorted within the batch, but must not start
+        before the last merged interval of their group: returns False for such late events, in which case the log
+        has to be re-aggregated from scratch. Minutes, events and tails are then unchanged, but groups first seen in
+        the batch are already registered (with nothing aggregated for them).
+        """
+        starts = date_normalization.parse_dates(events[self.date_col], self.source_path, self.date_col) # Format cached per log
+        durations = pd.to_numeric(events[self.duration_col], errors="coerce").to_numpy(dtype="float64")
+        valid = starts.notna().to_numpy() & (durations > 0)
+        if not valid.any():
+            return True
+        events = events[valid]
+        start_minutes = starts[valid].to_numpy(dtype="datetime64[ns]").astype(np.int64) / 60e9
+        durations = durations[valid]
+        with self._lock:
+            group_ids = self._resolve_group_ids(events)
+            tail_starts = self._tail_starts[group_ids]
+            if (start_minutes < tail_starts).any(): # NaN (no tail yet) compares False
+                return False
+
+            # Event counts and the cause Pareto use each event's own duration (overlaps are not merged per cause)
+            self._group_events += np.bincount(group_ids, minlength=len(self._group_events))
+            self._group_event_minutes += np.bincount(group_ids, weights=durations, minlength=len(self._group_events))
+            self.event_count += len(group_ids)
+            if self.cause_col:
+                causes = events[self.cause_col].astype(object).fillna("").astype(str).to_numpy()
+                batch_causes = pd.DataFrame({"minutes": durations, "events": 1},
+                                            index=pd.MultiIndex.from_arrays([group_ids, causes], names=["group", "cause"]))
+                batch_causes = batch_causes.groupby(level=["group", "cause"]).sum()
+                self._cause_totals = batch_causes if self._cause_totals.empty else self._cause_totals.add(batch_causes, fill_value=0)
+
+            # Open tails of the touched groups are merged again with the new events: retract what they contributed
+            touched = np.unique(group_ids)
+            touched = touched[~np.isnan(self._tail_starts[touched])]
+            retracted = _interval_contributions(touched, self._tail_starts[touched], self._tail_ends[touched], self.interval_minutes)
+            np.subtract.at(self._group_minutes, touched, self._tail_ends[touched] - self._tail_starts[touched])
+
+            merged_groups, merged_starts, merged_ends = merge_overlapping_intervals(
+                np.concatenate([group_ids, touched]), np.concatenate([start_minutes, self._tail_starts[touched]]),
+                np.concatenate([start_minutes + durations, self._tail_ends[touched]]))
+            added = _interval_contributions(merged_groups, merged_starts, merged_ends, self.interval_minutes)
+            np.add.at(self._group_minutes, merged_groups, merged_ends - merged_starts)
+            last_of_group = np.flatnonzero(np.append(merged_groups[1:] != merged_groups[:-1], True))
+            self._tail_starts[merged_groups[last_of_group]] = merged_starts[last_of_group]
+            self._tail_ends[merged_groups[last_of_group]] = merged_ends[last_of_group]
+
+            delta = added.sub(retracted, fill_value=0)
+            interval_totals = self._interval_totals.add(delta, fill_value=0) if not self._interval_totals.empty else delta
+            self._interval_totals = interval_totals[interval_totals.abs() > 1e-9]
+        return True
+
+    # --- Queries ---
+    def _selected_groups(self, selections: Dict[str, List[str]]) -> np.ndarray:
+        if not self.dimension_cols:
+            return np.arange(len(self.groups))
+        group_selections = dict(selections)
+        for filter_key, log_key in FILTER_FALLBACKS.items(): # e.g. the sidebar shift filter on "Shift Of Downtime"
+            if (filter_key in group_selections and config.COLUMN_MAP.get(filter_key) not in self.dimension_cols
+                    and config.COLUMN_MAP.get(log_key) in self.dimension_cols):
+                group_selections[log_key] = group_selections.pop(filter_key)
+        group_mask = compute_filter_mask(self.groups, group_selections)
+        return np.arange(len(self.groups)) if group_mask is None else np.flatnonzero(group_mask)
+
+    def _bucket_totals(self, selections: Dict[str, List[str]]) -> pd.Series:
+        """Merged downtime minutes per interval bucket of the selected groups (buckets without downtime left out)."""
+        with self._lock:
+            selected = self._selected_groups(selections)
+            selected_totals = self._interval_totals[self._interval_totals.index.get_level_values("group").isin(selected)]
+            return selected_totals.groupby(level="bucket").sum()
+
+    def group_count(self, selections: Dict[str, List[str]]) -> int:
+        """Number of dimension groups (e.g. site x shift) matching the selections."""
+        with self._lock:
+            return len(self._selected_groups(selections))
+
+    def summary(self, selections: Dict[str, List[str]]) -> Dict[str, float]:
+        """Merged downtime minutes, event count and average event duration for the selections."""
+        with self._lock:
+            selected = self._selected_groups(selections)
+            total_minutes = float(self._group_minutes[selected].sum())
+            events = int(self._group_events[selected].sum())
+            event_minutes = float(self._group_event_minutes[selected].sum())
+        return {"total_minutes": total_minutes, "events": events, "avg_event_minutes": event_minutes / events if events else np.nan}
+
+    def interval_totals(self, selections: Dict[str, List[str]], max_bars: Optional[int] = None) -> Tuple[pd.Series, float]:
+        """
+        (downtime minutes per interval start, interval width in minutes). With max_bars, consecutive intervals are combined (whole multiples of
+        the interval, preferably a round width from DISPLAY_BAR_MINUTES) so at most max_bars intervals are returned;
+        gaps without downtime are left out.
+        """
+        per_bucket = self._bucket_totals(selections)
+        if per_bucket.empty:
+            return pd.Series(dtype="float64", name="minutes"), self.interval_minutes
+        buckets_per_bar = 1
+        if max_bars:
+            bucket_span = int(per_bucket.index.max() - per_bucket.index.min()) + 1
+            buckets_per_bar = max(1, -(-bucket_span // max_bars))
+            round_widths = [width / self.interval_minutes for width in DISPLAY_BAR_MINUTES
+                            if width % self.interval_minutes == 0 and width / self.interval_minutes >= buckets_per_bar]
+            buckets_per_bar = int(round_widths[0]) if round_widths else buckets_per_bar
+        per_bar = per_bucket.groupby(per_bucket.index // buckets_per_bar).sum()
+        interval_starts = pd.to_datetime(per_bar.index.to_numpy() * buckets_per_bar * self.interval_minutes * 60, unit="s")
+        return pd.Series(per_bar.to_numpy(), index=interval_starts, name="minutes"), buckets_per_bar * self.interval_minutes
+
+    def total_before_period(self, selections: Dict[str, List[str]], period_minutes: float) -> Optional[float]:
+        """
+        Merged downtime minutes before the latest `period_minutes` (counted back from the end of the last interval
+        with downtime, in whole intervals): the total as the previous period ended. None without downtime.
+        """
+        per_bucket = self._bucket_totals(selections)
+        if per_bucket.empty:
+            return None
+        first_bucket_of_period = per_bucket.index.max() + 1 - max(1, int(np.ceil(period_minutes / self.interval_minutes)))
+        return float(per_bucket[per_bucket.index < first_bucket_of_period].sum())
+
+    def shift_totals(self, selections: Dict[str, List[str]]) -> pd.DataFrame:
+        """Merged downtime minutes and events per shift, largest first (empty if the log has no shift column)."""
+        if not self.shift_col:
+            return pd.DataFrame(columns=[self.shift_col or "shift", "minutes", "events"])
+        with self._lock:
+            selected = self._selected_groups(selections)
+            per_group = pd.DataFrame({self.shift_col: self.groups[self.shift_col].to_numpy()[selected],
+                                      "minutes": self._group_minutes[selected], "events": self._group_events[selected]})
+        return per_group.groupby(self.shift_col, as_index=False).sum().sort_values("minutes", ascending=False, ignore_index=True)
+
+    def area_totals(self, selections: Dict[str, List[str]]) -> Optional[pd.Series]:
+        """Merged downtime minutes per work area (plant_map.py), or None if the log has no work area column."""
+        area_col = config.COLUMN_MAP["work_area"]
+        if area_col not in self.dimension_cols:
+            return None
+        with self._lock:
+            selected = self._selected_groups(selections)
+            return pd.Series(self._group_minutes[selected], index=self.groups[area_col].to_numpy()[selected]).groupby(level=0).sum()
+
+    def group_totals(self) -> pd.DataFrame:
+        """
+        One row per dimension group: its dimension values and its merged downtime minutes (under duration_col), the
+        per-group totals summary() adds up. A FILTER_FALLBACKS log column is also given under its filter's header
+        when the log lacks that column, so sidebar filters on the table select the same groups as on the aggregates.
+        """
+        with self._lock:
+            per_group = self.groups[self.dimension_cols].where(self.groups[self.dimension_cols] != "") # Rows without a value: missing again
+            per_group[self.duration_col] = self._group_minutes.copy()
+        for filter_key, log_key in FILTER_FALLBACKS.items():
+            filter_col, log_col = config.COLUMN_MAP.get(filter_key), config.COLUMN_MAP.get(log_key)
+            if filter_col not in self.dimension_cols and log_col in self.dimension_cols:
+                per_group[filter_col] = per_group[log_col]
+        return per_group
+
+    def cause_pareto(self, selections: Dict[str, List[str]]) -> pd.DataFrame:
+        """Causes ranked by downtime minutes with their share and cumulative share (%) of the total."""
+        columns = [self.cause_col or "cause", "minutes", "events", "share_pct", "cumulative_pct"]
+        if not self.cause_col:
+            return pd.DataFrame(columns=columns)
+        with self._lock:
+            selected = self._selected_groups(selections)
+            selected_causes = self._cause_totals[self._cause_totals.index.get_level_values("group").isin(selected)]
+            per_cause = selected_causes.groupby(level="cause").sum()
+        if per_cause.empty or per_cause["minutes"].sum() <= 0:
+            return pd.DataFrame(columns=columns)
+        pareto = per_cause.sort_values("minutes", ascending=False).rename_axis(self.cause_col).reset_index()
+        pareto["events"] = pareto["events"].astype(np.int64)
+        pareto["share_pct"] = 100.0 * pareto["minutes"] / pareto["minutes"].sum()
+        pareto["cumulative_pct"] = pareto["share_pct"].cumsum()
+        return pareto[columns]
+
+# --- Following the event log ---
+class _LogFollower:
+    """Byte offset of a log file consumed into its aggregates."""
+    def __init__(self, aggregates: DowntimeAggregates, header_names: List[str], offset: int, tail_signature: str, stat_key: tuple):
+        self.aggregates, self.header_names, self.offset = aggregates, header_names, offset
+        self.tail_signature, self.stat_key = tail_signature, stat_key
+
+_FOLLOWERS: Dict[str, _LogFollower] = {}
+_FOLLOWERS_LOCK = threading.Lock()
+
+def _tail_signature(log_file, offset: int) -> str:
+    log_file.seek(max(0, offset - TAIL_SIGNATURE_BYTES))
+    return hashlib.sha1(log_file.read(min(offset, TAIL_SIGNATURE_BYTES))).hexdigest()
+
+def _read_complete_lines(log_file, offset: int) -> Tuple[bytes, int]:
+    """Bytes from offset up to the last complete line (a line still being written is left for the next read)."""
+    log_file.seek(offset)
+    data = log_file.read()
+    complete_end = data.rfind(b"\n") + 1
+    return data[:complete_end], offset + complete_end
+
+def _wanted_columns() -> Dict[str, str]:
+    return {key: config.COLUMN_MAP[key] for key in ["downtime_date", "downtime_duration", "downtime_cause"] + DIMENSION_KEYS
+            if config.COLUMN_MAP.get(key)}
+
+def _build_follower(file_path: str, stat_key: tuple) -> Optional[_LogFollower]:
+    with open(file_path, "rb") as log_file:
+        data, offset = _read_complete_lines(log_file, 0)
+        if not data:
+            return None
+        file_headers = list(pd.read_csv(io.BytesIO(data), nrows=0).columns)
+        renames = schema_registry.header_renames(file_path, file_headers) # Same header mapping as the validated frames
+        header_names = [renames.get(header, header) for header in file_headers]
+        wanted = {key: col for key, col in _wanted_columns().items() if col in header_names}
+        if "downtime_date" not in wanted or "downtime_duration" not in wanted:
+            logger.warning(f"Downtime log '{file_path}' lacks the date or duration column; no downtime aggregates.")
+            return None
+        events = pd.read_csv(io.BytesIO(data), header=0, names=header_names, usecols=list(set(wanted.values())))
+        aggregates = DowntimeAggregates(
+            date_col=wanted["downtime_date"], duration_col=wanted["downtime_duration"], cause_col=wanted.get("downtime_cause"),
+            shift_col=wanted.get("downtime_shift", wanted.get("shift")),
+            dimension_cols=list(dict.fromkeys(wanted[key] for key in DIMENSION_KEYS if key in wanted)), source_path=file_path)
+        aggregates.add_events(events) # A single batch is always in order
+        logger.info(f"Aggregated downtime log '{file_path}': {aggregates.event_count} events, {len(aggregates.groups)} groups.")
+        return _LogFollower(aggregates, header_names, offset, _tail_signature(log_file, offset), stat_key)
+
+def _follow(follower: _LogFollower, file_path: str, stat_key: tuple) -> bool:
+    """Folds the lines appended since the last read into the aggregates. False if the log must be re-read from scratch."""
+    with open(file_path, "rb") as log_file:
+        if stat_key[0] < follower.offset or _tail_signature(log_file, follower.offset) != follower.tail_signature:
+            return False # Truncated or rewritten, not appended to
+        data, offset = _read_complete_lines(log_file, follower.offset)
+        if data:
+            aggregates = follower.aggregates
+            usecols = list(dict.fromkeys([aggregates.date_col, aggregates.duration_col] + ([aggregates.cause_col] if aggregates.cause_col else []) + aggregates.dimension_cols))
+            new_events = pd.read_csv(io.BytesIO(data), header=None, names=follower.header_names, usecols=usecols)
+            if not aggregates.add_events(new_events):
+                logger.info(f"Downtime log '{file_path}' received events older than already merged ones; re-aggregating it.")
+                return False
+            follower.offset, follower.tail_signature = offset, _tail_signature(log_file, offset)
+    follower.stat_key = stat_key
+    return True
+
+def get_downtime_aggregates(file_path: Optional[str] = None) -> Optional[DowntimeAggregates]:
+    """
+    Aggregates of the downtime log, current with the file. Costs one stat call when the file is unchanged and a parse of
+    the appended lines only when it grew; a rewritten file is re-aggregated. None if the log is missing or unusable.
+    """
+    file_path = file_path or config.DOWNTIME_DATA_FILE
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    stat_key = (file_stat.st_size, file_stat.st_mtime_ns)
+    with _FOLLOWERS_LOCK:
+        follower = _FOLLOWERS.get(file_path)
+        try:
+            if follower is not None and (follower.stat_key == stat_key or _follow(follower, file_path, stat_key)):
+                return follower.aggregates
+            follower = _build_follower(file_path, stat_key)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not aggregate downtime log '{file_path}': {e}")
+            follower = None
+        if follower is None:
+            _FOLLOWERS.pop(file_path, None)
+            return None
+        _FOLLOWERS[file_path] = follower
+        return follower.aggregates
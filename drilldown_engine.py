@@ -0,0 +1,160 @@
+# drilldown_engine.py
+"""
+Drill-down index: the KPIs of config.DRILLDOWN_METRICS rolled up along the dimension hierarchy of
+config.DRILLDOWN_LEVELS (region -> site -> department -> fc -> shift, skipping levels a source has no column for).
+
+Each source is grouped once per data fingerprint by all of its levels (its leaves), keeping per metric the sum and
+count of the values; every coarser level is a sum over those leaves, never over the rows again. The result is one
+node table per source, one row per node at any depth, from which a node's children are a filter on (depth, path).
+Sidebar filters mask the leaves and roll up again, which is cheap next to the rows, and are kept per filter
+combination like the shared filtered views.
+
+The downtime event log is not loaded as rows: its hierarchy is built from the merged minutes per dimension group of
+downtime_engine (DowntimeAggregates.group_totals), so overlapping events count once and every node shows the total
+the downtime panel shows for the same filters.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+import downtime_engine
+import retention_tiers
+from precomputed_store import current_data_fingerprint
+from utils import compute_filter_mask
+
+logger = logging.getLogger(__name__)
+
+DEPTH_COL = "depth" # Node table column: 0 for the root, 1 for the first level, ...
+ENGINE_SOURCES = ["downtime"] # Sources of config.DRILLDOWN_METRICS taken from their engine's aggregates, not loaded as frames
+
+def node_levels(node_table: pd.DataFrame) -> List[str]:
+    """Conceptual keys of the hierarchy levels of a node table (columns under their COLUMN_MAP header), top first."""
+    return [key for key in config.DRILLDOWN_LEVELS if config.COLUMN_MAP.get(key) in node_table.columns]
+
+def children(node_table: pd.DataFrame, path: List[str]) -> pd.DataFrame:
+    """Child nodes of the node at `path` (values of the first len(path) levels), sorted by their label."""
+    headers = [config.COLUMN_MAP[key] for key in node_levels(node_table)]
+    if len(path) >= len(headers):
+        return node_table.iloc[0:0]
+    nodes = node_table[(node_table[DEPTH_COL] == len(path) + 1).to_numpy()] # Compare the path on this depth's nodes only
+    for header, value in zip(headers, path):
+        nodes = nodes[(nodes[header] == value).to_numpy()]
+    return nodes.sort_values(headers[len(path)], kind="stable")
+
+def _level_values(values: pd.Series) -> pd.Series:
+    """A level column as strings, rows without a value under config.DRILLDOWN_MISSING_LABEL."""
+    if isinstance(values.dtype, pd.CategoricalDtype): # Work on the categories, not on every row
+        values = values.cat.rename_categories(values.cat.categories.astype(str))
+        if values.isna().any():
+            values = values.cat.add_categories([config.DRILLDOWN_MISSING_LABEL]).fillna(config.DRILLDOWN_MISSING_LABEL)
+        return values
+    return values.astype(str).where(values.notna(), config.DRILLDOWN_MISSING_LABEL)
+
+class SourceHierarchy:
+    """Leaf sums and counts of one source's metrics, and its node tables."""
+
+    def __init__(self, df: pd.DataFrame, metrics: Dict[str, str]):
+        """metrics: conceptual metric key -> aggregation ("mean" | "sum"), only those present in the frame."""
+        self.level_cols = [config.COLUMN_MAP[key] for key in config.DRILLDOWN_LEVELS if config.COLUMN_MAP.get(key) in df.columns]
+        self.metrics = metrics
+        values = pd.DataFrame({metric_key: pd.to_numeric(df[config.COLUMN_MAP[metric_key]], errors="coerce").astype("float64")
+                               for metric_key in metrics}, index=df.index)
+        tiered = retention_tiers.is_tiered(df)
+        if tiered: # Rollup rows stand for several values each: sum value x count, and the counts
+            counts_per_row = pd.DataFrame({metric_key: retention_tiers.value_counts(df, config.COLUMN_MAP[metric_key])
+                                           for metric_key in metrics}, index=df.index)
+            values = values.fillna(0) * counts_per_row
+        if self.level_cols:
+            level_keys = [_level_values(df[col]) for col in self.level_cols]
+            grouped = values.groupby(level_keys, observed=True, sort=False)
+            sums = grouped.sum()
+            counts = counts_per_row.groupby(level_keys, observed=True, sort=False).sum() if tiered else grouped.count()
+            self.leaves = pd.concat([sums.add_suffix("_sum"), counts.add_suffix("_count")], axis=1).reset_index()
+        else:
+            counts = counts_per_row.sum() if tiered else values.count()
+            self.leaves = pd.DataFrame({**{f"{key}_sum": [values[key].sum()] for key in metrics},
+                                        **{f"{key}_count": [counts[key]] for key in metrics}})
+        self._node_tables: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _rollup(self, leaves: pd.DataFrame) -> pd.DataFrame:
+        """Node table: level headers (None below the node's depth), DEPTH_COL and one value column per metric header."""
+        sum_cols = [f"{key}_sum" for key in self.metrics]
+        count_cols = [f"{key}_count" for key in self.metrics]
+        depth_tables = [leaves[sum_cols + count_cols].sum().to_frame().T.assign(**{DEPTH_COL: 0})]
+        for depth in range(1, len(self.level_cols) + 1):
+            depth_table = leaves.groupby(self.level_cols[:depth], observed=True, sort=False)[sum_cols + count_cols].sum().reset_index()
+            depth_tables.append(depth_table.assign(**{DEPTH_COL: depth}))
+        nodes = pd.concat(depth_tables, ignore_index=True)
+        node_table = pd.DataFrame({col: nodes[col].astype(object).where(nodes[col].notna(), None) for col in self.level_cols})
+        node_table[DEPTH_COL] = nodes[DEPTH_COL].astype(int)
+        for metric_key, aggregation in self.metrics.items():
+            sums, counts = nodes[f"{metric_key}_sum"].to_numpy(), nodes[f"{metric_key}_count"].to_numpy()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                node_values = sums / counts if aggregation == "mean" else sums
+            node_table[config.COLUMN_MAP[metric_key]] = np.where(counts > 0, node_values, np.nan)
+        return node_table
+
+    def node_table(self, selections: Dict[str, List[str]]) -> pd.DataFrame:
+        """Node table of the leaves matching the selections (all leaves without any), cached per selection."""
+        selection_key = tuple(sorted((k, tuple(sorted(v))) for k, v in selections.items() if v))
+        with self._lock:
+            cached = self._node_tables.get(selection_key)
+            if cached is not None:
+                self._node_tables.move_to_end(selection_key)
+                return cached
+        leaf_mask = compute_filter_mask(self.leaves, selections) if self.level_cols else None
+        node_table = self._rollup(self.leaves if leaf_mask is None else self.leaves[leaf_mask])
+        with self._lock:
+            self._node_tables[selection_key] = node_table
+            while len(self._node_tables) > config.SHARED_FILTERED_VIEWS_MAX_ENTRIES:
+                self._node_tables.popitem(last=False)
+        return node_table
+
+class DrillDownIndex:
+    """Source hierarchies of one version of the data."""
+
+    def __init__(self, hierarchies: Dict[str, SourceHierarchy]):
+        self.hierarchies = hierarchies
+
+    def node_tables(self, selections: Dict[str, List[str]]) -> Dict[str, pd.DataFrame]:
+        """Source key -> node table for the selections."""
+        return {source_key: hierarchy.node_table(selections) for source_key, hierarchy in self.hierarchies.items()}
+
+# data fingerprint -> drill-down index (None without any source), per process
+_INDEX: Dict[str, Optional[DrillDownIndex]] = {}
+_INDEX_LOCK = threading.Lock()
+
+def _build_index() -> Optional[DrillDownIndex]:
+    from pages.dashboard_page import load_raw_dataframes # Deferred: the dashboard page imports this module's users
+    hierarchies = {}
+    source_frames = load_raw_dataframes([source_key for source_key in config.DRILLDOWN_METRICS if source_key not in ENGINE_SOURCES])
+    if "downtime" in config.DRILLDOWN_METRICS:
+        aggregates = downtime_engine.get_downtime_aggregates()
+        source_frames["downtime"] = aggregates.group_totals() if aggregates is not None else pd.DataFrame()
+    for source_key, df in source_frames.items():
+        metrics = {metric_key: aggregation for metric_key, (aggregation, _label_key) in config.DRILLDOWN_METRICS[source_key].items()
+                   if config.COLUMN_MAP.get(metric_key) in df.columns}
+        if not df.empty and metrics:
+            hierarchies[source_key] = SourceHierarchy(df, metrics)
+    return DrillDownIndex(hierarchies) if hierarchies else None
+
+def get_drilldown_index() -> Optional[DrillDownIndex]:
+    """Drill-down index of the current data, rebuilt when any source file changes. None without any KPI source."""
+    fingerprint = current_data_fingerprint()
+    with _INDEX_LOCK:
+        if fingerprint in _INDEX:
+            return _INDEX[fingerprint]
+        index = _build_index()
+        if index is not None:
+            logger.info(f"Built drill-down index of {len(index.hierarchies)} sources: " + ", ".join(
+                f"{source_key} {len(hierarchy.leaves)} leaves on {hierarchy.level_cols or ['(none)']}"
+                for source_key, hierarchy in index.hierarchies.items()) + ".")
+        _INDEX.clear() # Only the current data is kept
+        _INDEX[fingerprint] = index
+        return index
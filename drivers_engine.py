@@ -0,0 +1,180 @@
+# drivers_engine.py
+"""
+Driver analysis: relates the people and operations metrics of config.DRIVER_METRICS to each other. The sources are
+aligned on the dimensions they share (site, region, department, fc, shift, whichever all of them have) and month,
+using the date keys of pages/dashboard_page.DATA_SOURCE_MAP. Sources without a date key (safety's month is a name
+without a year, engagement has no date) have no month to align on and are left out.
+
+Each source is reduced once per data fingerprint to monthly means per group, stored as a dense
+(group x month x metric) cube. Correlations are Pearson over the (group, month) observations where both metrics
+are present, for every metric pair at once from masked matrix products; the lagged matrices pair each metric with
+every other metric 1..config.DRIVER_MAX_LAG_MONTHS months later, within the same group.
+"""
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+import config
+import retention_tiers
+from precomputed_store import current_data_fingerprint
+from utils import compute_filter_mask, month_periods
+
+logger = logging.getLogger(__name__)
+
+DIMENSION_KEYS = ["site", "region", "department", "fc", "shift"]
+VARIANCE_EPSILON = 1e-9 # Pairs whose overlapping values are constant have no correlation
+
+def pairwise_correlations(leading: np.ndarray, following: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson r[i, j] between column i of `leading` and column j of `following` (same rows, NaN = missing) over the
+    rows where both are present, and the number of those rows. r is NaN where a pair has no variance.
+    """
+    lead_present = ~np.isnan(leading)
+    follow_present = ~np.isnan(following)
+    # Centering first keeps the sums small, so the one-pass variance below does not cancel out
+    lead = np.where(lead_present, leading - _column_means(leading, lead_present), 0.0)
+    follow = np.where(follow_present, following - _column_means(following, follow_present), 0.0)
+    lead_mask, follow_mask = lead_present.astype("float64"), follow_present.astype("float64")
+
+    observations = lead_mask.T @ follow_mask
+    sum_lead, sum_follow = lead.T @ follow_mask, lead_mask.T @ follow
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = lead.T @ follow - sum_lead * sum_follow / observations
+        variance_lead = (lead ** 2).T @ follow_mask - sum_lead ** 2 / observations
+        variance_follow = lead_mask.T @ (follow ** 2) - sum_follow ** 2 / observations
+        correlations = covariance / np.sqrt(variance_lead * variance_follow)
+    correlations[~((variance_lead > VARIANCE_EPSILON) & (variance_follow > VARIANCE_EPSILON))] = np.nan
+    return np.clip(correlations, -1.0, 1.0), observations.astype(np.int64)
+
+def _column_means(values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    counts = present.sum(axis=0)
+    return np.where(counts > 0, np.where(present, values, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+
+class DriverAnalysis:
+    """Monthly metric cube of the driver sources for one version of the data, with its correlation matrices."""
+
+    def __init__(self, source_frames: Dict[str, Tuple[pd.DataFrame, str, List[str]]]):
+        """source_frames: source key -> (raw frame, actual date column, conceptual metric keys present in the frame)."""
+        self.dimension_cols = [config.COLUMN_MAP[key] for key in DIMENSION_KEYS
+                               if all(config.COLUMN_MAP.get(key) in df.columns for df, _date_col, _metrics in source_frames.values())]
+        self.metric_sources: Dict[str, str] = {}
+        monthly_frames = []
+        for source_key, (df, date_col, metric_keys) in source_frames.items():
+            monthly_frames.append(self._monthly_means(df, date_col, metric_keys))
+            self.metric_sources.update({metric_key: source_key for metric_key in metric_keys})
+        self.metrics = list(self.metric_sources)
+        aligned = pd.concat(monthly_frames, axis=1, join="outer") # One row per (group, month) of any source
+        if aligned.empty:
+            raise ValueError("No driver source has a parseable date.")
+
+        group_index = aligned.index.droplevel("month") if self.dimension_cols else None
+        if group_index is not None:
+            group_ids, distinct_groups = pd.factorize(group_index)
+            self.groups = pd.DataFrame(list(distinct_groups), columns=self.dimension_cols) # factorize drops the level names
+        else:
+            group_ids, self.groups = np.zeros(len(aligned), dtype=np.int64), pd.DataFrame(index=range(1))
+        months = pd.PeriodIndex(aligned.index.get_level_values("month"))
+        self.months = pd.period_range(months.min(), months.max(), freq="M")
+        month_pos = months.asi8 - self.months[0].ordinal
+        self.cube = np.full((len(self.groups), len(self.months), len(self.metrics)), np.nan)
+        self.cube[group_ids, month_pos] = aligned[self.metrics].to_numpy(dtype="float64")
+        self.observation_count = len(aligned)
+        self._unfiltered = self._lagged_correlations(self.cube)
+
+    def _monthly_means(self, df: pd.DataFrame, date_col: str, metric_keys: List[str]) -> pd.DataFrame:
+        months = month_periods(df, date_col).rename("month")
+        group_keys = [df[col].astype(str) for col in self.dimension_cols] + [months]
+        if retention_tiers.is_tiered(df): # Rollups weighted by the values they stand for
+            return retention_tiers.weighted_aggregate(df, group_keys, {metric_key: (config.COLUMN_MAP[metric_key], "mean")
+                                                                      for metric_key in metric_keys})
+        values = pd.DataFrame({metric_key: pd.to_numeric(df[config.COLUMN_MAP[metric_key]], errors="coerce")
+                               for metric_key in metric_keys}, index=df.index)
+        return values.groupby(group_keys, observed=True).mean() # Rows without a month are dropped by the groupby
+
+    def _lagged_correlations(self, cube: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(correlations, observations), both (lag, leading metric, following metric) for lags 0..DRIVER_MAX_LAG_MONTHS."""
+        metric_count = len(self.metrics)
+        lag_count = config.DRIVER_MAX_LAG_MONTHS + 1
+        correlations = np.full((lag_count, metric_count, metric_count), np.nan)
+        observations = np.zeros((lag_count, metric_count, metric_count), dtype=np.int64)
+        month_count = cube.shape[1]
+        for lag in range(min(lag_count, month_count)):
+            leading = cube[:, :month_count - lag].reshape(-1, metric_count)
+            following = cube[:, lag:].reshape(-1, metric_count)
+            correlations[lag], observations[lag] = pairwise_correlations(leading, following)
+        correlations[observations < config.DRIVER_MIN_OBSERVATIONS] = np.nan
+        return correlations, observations
+
+    def lagged_correlations(self, selections: Dict[str, List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Correlation and observation matrices per lag for the groups of the selections (see _lagged_correlations)."""
+        group_mask = compute_filter_mask(self.groups, selections) if self.dimension_cols else None
+        if group_mask is None or group_mask.all():
+            return self._unfiltered
+        return self._lagged_correlations(self.cube[group_mask])
+
+    def metric_label(self, metric_key: str) -> str:
+        return config.COLUMN_MAP.get(metric_key, metric_key)
+
+    def correlation_matrix(self, selections: Dict[str, List[str]], lag: int = 0) -> pd.DataFrame:
+        """Metrics x metrics correlation at `lag` months (rows lead, columns follow), labelled with the CSV headers."""
+        labels = [self.metric_label(metric_key) for metric_key in self.metrics]
+        return pd.DataFrame(self.lagged_correlations(selections)[0][lag], index=labels, columns=labels)
+
+    def top_drivers(self, selections: Dict[str, List[str]], top_n: Optional[int] = None) -> pd.DataFrame:
+        """
+        Strongest relations between metrics of different sources, one row per metric pair at its strongest lag:
+        driver, outcome (conceptual keys), lag_months, correlation, observations. Pairs below
+        config.DRIVER_MIN_ABS_CORRELATION are left out.
+        """
+        correlations, observations = self.lagged_correlations(selections)
+        lags, leading, following = np.nonzero(np.abs(np.nan_to_num(correlations)) >= config.DRIVER_MIN_ABS_CORRELATION)
+        sources = np.array([self.metric_sources[metric_key] for metric_key in self.metrics], dtype=object)
+        keep = (sources[leading] != sources[following]) & ((lags > 0) | (leading < following)) # Lag 0 is symmetric
+        lags, leading, following = lags[keep], leading[keep], following[keep]
+        metric_names = np.array(self.metrics, dtype=object)
+        df_drivers = pd.DataFrame({
+            "driver": metric_names[leading], "outcome": metric_names[following], "lag_months": lags,
+            "correlation": correlations[lags, leading, following], "observations": observations[lags, leading, following],
+            "pair": [frozenset(pair) for pair in zip(leading, following)]
+        })
+        df_drivers = df_drivers.reindex(df_drivers["correlation"].abs().sort_values(ascending=False, kind="stable").index)
+        df_drivers = df_drivers.drop_duplicates("pair").drop(columns="pair").reset_index(drop=True)
+        return df_drivers.head(top_n) if top_n is not None else df_drivers
+
+# data fingerprint -> driver analysis (None without usable data), per process
+_ANALYSIS: Dict[str, Optional[DriverAnalysis]] = {}
+_ANALYSIS_LOCK = threading.Lock()
+
+def load_metric_sources(metrics_by_source: Dict[str, List[str]]) -> Dict[str, Tuple[pd.DataFrame, str, List[str]]]:
+    """DriverAnalysis input for the dated sources of `metrics_by_source` (source key -> conceptual metric keys)."""
+    from pages.dashboard_page import DATA_SOURCE_MAP, load_raw_dataframes # Deferred: the dashboard page imports this module's users
+    dated_sources = [key for key in metrics_by_source if key in DATA_SOURCE_MAP and DATA_SOURCE_MAP[key][1]]
+    source_frames = {}
+    for source_key, df in load_raw_dataframes(dated_sources).items():
+        date_col = config.COLUMN_MAP.get(DATA_SOURCE_MAP[source_key][1])
+        metric_keys = [metric_key for metric_key in metrics_by_source[source_key] if config.COLUMN_MAP.get(metric_key) in df.columns]
+        if not df.empty and date_col in df.columns and metric_keys:
+            source_frames[source_key] = (df, date_col, metric_keys)
+    return source_frames
+
+def get_driver_analysis() -> Optional[DriverAnalysis]:
+    """Driver analysis of the current data, rebuilt when any source file changes. None with fewer than two metrics."""
+    fingerprint = current_data_fingerprint()
+    with _ANALYSIS_LOCK:
+        if fingerprint in _ANALYSIS:
+            return _ANALYSIS[fingerprint]
+        source_frames = load_metric_sources(config.DRIVER_METRICS)
+        analysis = None
+        if sum(len(metric_keys) for _df, _date_col, metric_keys in source_frames.values()) >= 2:
+            try:
+                analysis = DriverAnalysis(source_frames)
+            except ValueError as e:
+                logger.warning(f"Driver analysis skipped: {e}")
+        if analysis is not None:
+            logger.info(f"Built driver analysis of {len(source_frames)} sources: {len(analysis.metrics)} metrics, "
+                        f"{analysis.observation_count} (group, month) observations on {analysis.dimension_cols or ['month']}.")
+        _ANALYSIS.clear() # Only the current data is kept
+        _ANALYSIS[fingerprint] = analysis
+        return analysis
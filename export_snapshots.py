@@ -0,0 +1,179 @@
+# export_snapshots.py
+"""
+Headless snapshot export for the weekly per-site reports: one folder per site holding every panel's figures as a
+static HTML page (and PNG / PDF images when kaleido is installed) and the panel KPIs as CSV, plus one CSV with the
+KPIs of all exported sites.
+
+Panel results come from the precompute.py artifacts when they match the current data, and are computed otherwise
+with the same setup as precompute.py: the raw frames are loaded once and handed to each worker process, and the
+engines behind the downtime, OEE and drivers panels build their aggregates once per worker and serve every site
+of that worker from them.
+
+Usage (in the app's working directory):
+    python export_snapshots.py [--sites "Plant A" "Plant B"] [--formats html csv png pdf] [--workers 8] [--lang EN] [--out-dir exports]
+"""
+import argparse
+import html
+import importlib.util
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import config
+import precomputed_store
+import panel_registry
+from panel_results import PanelResult, localize_insight
+from utils import get_unique_options_from_dfs_list
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ["html", "csv", "png", "pdf"]
+IMAGE_FORMATS = ["png", "pdf"] # Rendered with kaleido
+KPI_COLUMNS = ["site", "panel", "kpi", "value", "previous_value"]
+
+# Set once per worker process by _init_worker so the raw frames are pickled once per worker, not once per site.
+_WORKER_RAW_DFS: Dict[str, pd.DataFrame] = {}
+
+def _init_worker(raw_dfs: Dict[str, pd.DataFrame]):
+    global _WORKER_RAW_DFS
+    _WORKER_RAW_DFS = raw_dfs
+
+def site_dir_name(site: str) -> str:
+    """File-system safe folder name of a site."""
+    return re.sub(r"[^\w.-]+", "_", site).strip("._") or "site"
+
+def site_panel_results(site: str, raw_dfs: Dict[str, pd.DataFrame], lang_code: str, data_fingerprint: str) -> Dict[str, PanelResult]:
+    """Every headless panel's result for the single-site view: precomputed artifact if current, computed otherwise."""
+    from pages import dashboard_page
+    filter_selections = {"site": [site]}
+    view_key = precomputed_store.view_key_for_filters(filter_selections)
+    results: Dict[str, PanelResult] = {}
+    filtered_dfs: Optional[Dict[str, pd.DataFrame]] = None
+    for panel_name_key, panel_spec in panel_registry.get_panel_specs(compute_only=True).items():
+        precomputed_result = precomputed_store.load_panel_result(view_key, panel_name_key, lang_code, data_fingerprint)
+        if precomputed_result is not None:
+            results[panel_name_key] = precomputed_result
+            continue
+        if filtered_dfs is None: # Filtered once, only when some panel is not precomputed
+            filtered_dfs = dashboard_page.filter_dataframes(raw_dfs, filter_selections)
+        try:
+            results[panel_name_key] = panel_spec.compute(filtered_dfs, filter_selections, lang_code)
+        except Exception as e:
+            logger.error(f"Error computing panel '{panel_name_key}' for site '{site}': {e}", exc_info=True)
+    return results
+
+def _rounded(value: Any) -> Optional[float]:
+    return None if value is None or pd.isna(value) else round(float(value), config.API_FLOAT_DECIMALS)
+
+def kpi_rows(site: str, panel_results: Dict[str, PanelResult]) -> List[Dict[str, Any]]:
+    """KPI values rounded like the API's; previous_value only where the panel has a previous period (else empty)."""
+    return [{"site": site, "panel": panel_name_key, "kpi": kpi_key, "value": _rounded(value),
+             "previous_value": _rounded(result.previous_kpis.get(kpi_key))}
+            for panel_name_key, result in panel_results.items() for kpi_key, value in result.kpis.items()]
+
+def render_snapshot_html(site: str, panel_results: Dict[str, PanelResult], figures: Dict[Tuple[str, str], Any],
+                         lang_code: str, df_kpis: pd.DataFrame) -> str:
+    """Static page of one site: per panel its KPI table, figures and insights."""
+    text_strings = config.TEXT_STRINGS.get(lang_code, config.TEXT_STRINGS[config.DEFAULT_LANG])
+    _ = lambda key: text_strings.get(key, key)
+    include_plotlyjs: Any = config.EXPORT_PLOTLYJS # Loaded by the first figure of the page only
+    sections = []
+    for panel_name_key, result in panel_results.items():
+        if not result.has_data:
+            continue
+        parts = [f"<h2>{html.escape(_(result.title_key))}</h2>"]
+        df_panel_kpis = df_kpis[df_kpis["panel"] == panel_name_key]
+        if not df_panel_kpis.empty:
+            parts.append(df_panel_kpis[["kpi", "value", "previous_value"]].to_html(index=False, float_format=lambda v: f"{v:,.2f}", na_rep="-"))
+        for (figure_panel, _slot), fig in figures.items():
+            if figure_panel == panel_name_key:
+                parts.append(fig.to_html(full_html=False, include_plotlyjs=include_plotlyjs))
+                include_plotlyjs = False
+        if result.insights:
+            parts.append(f"<h3>{html.escape(_('actionable_insights_title'))}</h3><ul>" +
+                         "".join(f"<li>{html.escape(localize_insight(insight_item, _))}</li>" for insight_item in result.insights) + "</ul>")
+        sections.append("<section>" + "\n".join(parts) + "</section>")
+    title = f"{_('app_title')} - {site}"
+    return (f"<!DOCTYPE html><html lang='{lang_code.lower()}'><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+            f"<style>body{{font-family:sans-serif;background:#2C3E50;color:#ECF0F1;margin:2em}}"
+            f"table{{border-collapse:collapse}}td,th{{border:1px solid #7F8C8D;padding:4px 8px}}</style></head>"
+            f"<body><h1>{html.escape(title)}</h1><p>{date.today().isoformat()}</p>\n" + "\n".join(sections) + "</body></html>")
+
+def _export_site(site: str, lang_code: str, formats: List[str], out_dir: str, data_fingerprint: str) -> Tuple[str, List[Dict[str, Any]], int]:
+    """Worker task: writes the snapshot files of one site. Returns (site, KPI rows, files written)."""
+    import visualizations as viz # Batch side only, as in precomputed_store
+    panel_results = site_panel_results(site, _WORKER_RAW_DFS, lang_code, data_fingerprint)
+    site_dir = os.path.join(out_dir, site_dir_name(site))
+    os.makedirs(site_dir, exist_ok=True)
+    rows = kpi_rows(site, panel_results)
+    df_kpis = pd.DataFrame(rows, columns=KPI_COLUMNS)
+    figures = {(panel_name_key, slot): viz.build_figure(spec, lang_code)
+               for panel_name_key, result in panel_results.items() if result.has_data for slot, spec in result.figures.items()}
+
+    files_written = 0
+    if "csv" in formats:
+        df_kpis.to_csv(os.path.join(site_dir, "kpis.csv"), index=False)
+        files_written += 1
+    if "html" in formats:
+        with open(os.path.join(site_dir, "snapshot.html"), "w", encoding="utf-8") as fh:
+            fh.write(render_snapshot_html(site, panel_results, figures, lang_code, df_kpis))
+        files_written += 1
+    for image_format in (fmt for fmt in formats if fmt in IMAGE_FORMATS):
+        for (panel_name_key, slot), fig in figures.items():
+            fig.write_image(os.path.join(site_dir, f"{panel_name_key}.{slot}.{image_format}"), format=image_format,
+                            width=config.EXPORT_IMAGE_WIDTH, height=config.EXPORT_IMAGE_HEIGHT)
+            files_written += 1
+    return site, rows, files_written
+
+def run(sites: Optional[List[str]], formats: List[str], workers: int, lang_code: str, out_dir: str) -> int:
+    """Exports the given sites (default: all) over a process pool. Returns the number of sites exported."""
+    from pages import dashboard_page
+    started = time.perf_counter()
+    if any(fmt in IMAGE_FORMATS for fmt in formats) and importlib.util.find_spec("kaleido") is None:
+        logger.warning("kaleido is not installed; skipping PNG / PDF images (pip install kaleido).")
+        formats = [fmt for fmt in formats if fmt not in IMAGE_FORMATS]
+    data_fingerprint = precomputed_store.current_data_fingerprint()
+    compute_panels = list(panel_registry.get_panel_specs(compute_only=True).values())
+    raw_dfs = dashboard_page.load_raw_dataframes(panel_registry.required_sources(compute_panels)) # Only what the panels read
+    if not sites:
+        sites = get_unique_options_from_dfs_list([df for df in raw_dfs.values() if not df.empty], "site")
+    run_dir = os.path.join(out_dir, date.today().isoformat()) # Weekly runs do not overwrite each other
+    logger.info(f"Exporting {len(sites)} sites ({', '.join(formats)}) to '{run_dir}' with {workers} workers.")
+
+    all_rows: List[Dict[str, Any]] = []
+    sites_exported = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(raw_dfs,)) as pool:
+        futures = {pool.submit(_export_site, site, lang_code, formats, run_dir, data_fingerprint): site for site in sites}
+        for future in as_completed(futures):
+            try:
+                site, rows, files_written = future.result()
+                all_rows.extend(rows)
+                sites_exported += 1
+                logger.info(f"Exported site '{site}' ({files_written} files).")
+            except Exception as e:
+                logger.error(f"Export failed for site '{futures[future]}': {e}", exc_info=True)
+    if "csv" in formats and all_rows:
+        pd.DataFrame(all_rows, columns=KPI_COLUMNS).sort_values(["site", "panel", "kpi"]).to_csv(
+            os.path.join(run_dir, "kpis_all_sites.csv"), index=False)
+    logger.info(f"Export finished: {sites_exported}/{len(sites)} sites in {time.perf_counter() - started:.1f}s.")
+    return sites_exported
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export per-site dashboard snapshots (HTML / PNG / PDF figures, CSV KPIs).")
+    parser.add_argument("--sites", nargs="+", help="Sites to export (default: every site in the data).")
+    parser.add_argument("--formats", nargs="+", choices=EXPORT_FORMATS, default=config.EXPORT_DEFAULT_FORMATS, help="Files to write per site.")
+    parser.add_argument("--workers", type=int, default=config.PRECOMPUTE_DEFAULT_WORKERS, help="Process pool size.")
+    parser.add_argument("--lang", default=config.DEFAULT_LANG, choices=list(config.TEXT_STRINGS.keys()), help="Language of the snapshots.")
+    parser.add_argument("--out-dir", default=config.EXPORT_DIR, help="Output directory; each run writes a dated subfolder.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sites_exported = run(args.sites, args.formats, max(1, args.workers), args.lang, args.out_dir)
+    return 0 if sites_exported else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
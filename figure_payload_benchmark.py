@@ -0,0 +1,65 @@
+# figure_payload_benchmark.py
+"""
+Measures the JSON payload of the main chart builders with config.COMPACT_FIGURE_PAYLOADS off and on
+(the size Streamlit sends over the websocket for each st.plotly_chart).
+
+Usage:
+    python figure_payload_benchmark.py [--months 36] [--categories 20]
+"""
+import argparse
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import config
+import visualizations as viz
+
+def _sample_builders(months: int, categories: int) -> Dict[str, Callable[[], go.Figure]]:
+    rng = np.random.default_rng(42)
+    month_ends = pd.date_range("2021-01-31", periods=months, freq="M")
+    df_trend = pd.DataFrame({"Date": month_ends, "Hires_Total_Agg": rng.uniform(5, 60, months), "Exits_Total_Agg": rng.uniform(5, 60, months)})
+    compliance_series = pd.Series(rng.uniform(70, 100, months), index=month_ends)
+    df_bars = pd.DataFrame({"Site": [f"Site {i}" for i in range(categories)],
+                            "Value A": rng.uniform(0, 100, categories), "Value B": rng.uniform(0, 100, categories)})
+    return {
+        "create_trend_chart (2 series, avg + rolling)": lambda: viz.create_trend_chart(
+            df_trend, "Date", {"hires_label": "Hires_Total_Agg", "exits_label": "Exits_Total_Agg"}, "hires_vs_exits_chart_title",
+            config.DEFAULT_LANG, "people_count_label", "month_axis_label", show_average_line=True, rolling_avg_window=3),
+        "create_task_compliance_trend_themed (+ forecast)": lambda: viz.create_task_compliance_trend_themed(
+            compliance_series, compliance_series.index, config.DEFAULT_LANG, forecast_series=compliance_series.rolling(3, min_periods=1).mean()),
+        "create_comparison_bar_chart (stacked + totals)": lambda: viz.create_comparison_bar_chart(
+            df_bars, "Site", {"hires_label": "Value A", "exits_label": "Value B"}, "hires_vs_exits_chart_title", config.DEFAULT_LANG,
+            "category_label", "people_count_label", barmode="stack", show_total_for_stacked=True),
+    }
+
+def measure(months: int, categories: int) -> List[Dict[str, object]]:
+    """Payload bytes per builder with compaction off and on."""
+    rows = []
+    compact_setting = config.COMPACT_FIGURE_PAYLOADS
+    try:
+        for builder_name, build in _sample_builders(months, categories).items():
+            sizes = {}
+            for compact in (False, True):
+                config.COMPACT_FIGURE_PAYLOADS = compact
+                sizes[compact] = len(build().to_json().encode("utf-8"))
+            rows.append({"figure": builder_name, "before": sizes[False], "after": sizes[True],
+                         "reduction_pct": 100.0 * (1 - sizes[True] / max(sizes[False], 1))})
+    finally:
+        config.COMPACT_FIGURE_PAYLOADS = compact_setting
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Figure JSON payload size with and without compaction.")
+    parser.add_argument("--months", type=int, default=36, help="Points per trend series.")
+    parser.add_argument("--categories", type=int, default=20, help="Bars per bar-chart series.")
+    args = parser.parse_args(argv)
+
+    print(f"plotly binary typed arrays: {'yes' if viz.PLOTLY_BINARY_ARRAYS else 'no (plotly < 6)'}")
+    for row in measure(args.months, args.categories):
+        print(f"{row['figure']:<52} {row['before']:>8,} B -> {row['after']:>8,} B  (-{row['reduction_pct']:.0f}%)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
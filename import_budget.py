@@ -0,0 +1,64 @@
+# import_budget.py
+"""
+Startup import budget check: cold-imports each module in a fresh interpreter with `python -X importtime`
+and reports its total import cost and the most expensive modules it pulls in.
+Exits with status 1 if any module exceeds the budget (e.g. a module-level plotly.express import creeping back).
+
+Usage (in the app's working directory):
+    python import_budget.py [--budget-ms 2500] [--top 10] [module ...]
+"""
+import argparse
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+import config
+
+def measure_import(module_name: str) -> Tuple[float, List[Tuple[float, float, str]]]:
+    """Returns (total ms, [(self ms, cumulative ms, imported module), ...]) for a cold import of module_name."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing '{module_name}' failed:\n{completed.stderr.strip()[-2000:]}")
+    entries = [] # (self ms, cumulative ms, name, nesting depth); nested imports are listed before their importer
+    for line in completed.stderr.splitlines(): # "import time: <self us> | <cumulative us> | <indented name>"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, imported_name = line[len("import time:"):].split("|", 2)
+            depth = len(imported_name) - len(imported_name.lstrip()) - 1
+            entries.append((int(self_us) / 1000, int(cumulative_us) / 1000, imported_name.strip(), depth))
+        except ValueError:
+            continue
+    # Keep only the module's own import tree (interpreter startup imports such as site hooks come first)
+    module_index = next((i for i in range(len(entries) - 1, -1, -1) if entries[i][2] == module_name and entries[i][3] == 0), None)
+    if module_index is None:
+        return 0.0, []
+    tree_start = module_index
+    while tree_start > 0 and entries[tree_start - 1][3] > 0:
+        tree_start -= 1
+    module_entries = [(self_ms, cumulative_ms, name) for self_ms, cumulative_ms, name, _depth in entries[tree_start:module_index + 1]]
+    return entries[module_index][1], module_entries
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report per-module import cost against the startup budget.")
+    parser.add_argument("modules", nargs="*", default=config.STARTUP_IMPORT_MODULES, help="Modules to cold-import.")
+    parser.add_argument("--budget-ms", type=float, default=config.STARTUP_IMPORT_BUDGET_MS, help="Maximum import time per module.")
+    parser.add_argument("--top", type=int, default=10, help="Number of most expensive imported modules to list.")
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for module_name in args.modules:
+        total_ms, entries = measure_import(module_name)
+        status = "OK" if total_ms <= args.budget_ms else "OVER BUDGET"
+        print(f"{module_name}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms) {status}")
+        for self_ms, cumulative_ms, imported_name in sorted(entries, key=lambda e: e[1], reverse=True)[1:args.top + 1]:
+            print(f"    {cumulative_ms:8.1f} ms cumulative {self_ms:8.1f} ms self  {imported_name}")
+        if total_ms > args.budget_ms:
+            over_budget.append(module_name)
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+# oee_engine.py
+"""
+OEE rollups: availability, performance, quality and overall OEE of the OEE source, aggregated in one vectorized
+pass into hour / shift / day / month buckets per dimension group (the filter columns present in the source).
+Buckets hold sums and counts, so the mean for any filter combination is a sum over the selected groups' buckets;
+the OEE panel reads its gauges and trends from here and never filters or groups the source rows.
+
+Overall OEE of a row is the OEE column, or availability x performance x quality where that is missing.
+Buckets without an availability value fall back to the downtime log (downtime_engine) when it is available:
+availability = 1 - downtime / planned time, planned time being the bucket length per selected downtime group
+scaled by config.OEE_PLANNED_TIME_SHARE.
+"""
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+import config
+from utils import compute_filter_mask, load_data_main, served_source_fingerprint
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ["hour", "shift", "day", "month"]
+METRICS = ["availability", "performance", "quality", "overall"] # COLUMN_MAP keys "oee_<metric>"
+DIMENSION_KEYS = ["site", "region", "department", "fc", "shift"]
+
+def _shift_start_minutes() -> np.ndarray:
+    return np.array(sorted(start_hour * 60 for start_hour in config.SHIFT_SCHEDULE.values()), dtype=np.int64)
+
+def bucket_starts(timestamps: np.ndarray, granularity: str) -> np.ndarray:
+    """Start of the bucket of each timestamp (datetime64[ns]); month buckets are labelled by their month-end date."""
+    if granularity == "hour":
+        return timestamps.astype("datetime64[h]").astype("datetime64[ns]")
+    if granularity == "day":
+        return timestamps.astype("datetime64[D]").astype("datetime64[ns]")
+    if granularity == "month":
+        return ((timestamps.astype("datetime64[M]") + 1).astype("datetime64[D]") - 1).astype("datetime64[ns]")
+    if granularity == "shift": # Shift instance start from config.SHIFT_SCHEDULE; a night shift belongs to the day it started
+        days = timestamps.astype("datetime64[D]")
+        minute_of_day = (timestamps - days.astype("datetime64[ns]")).astype("timedelta64[m]").astype(np.int64)
+        shift_starts = _shift_start_minutes()
+        shift_pos = np.searchsorted(shift_starts, minute_of_day, side="right") - 1
+        started_yesterday = shift_pos < 0
+        start_minutes = shift_starts[shift_pos] # -1 wraps to the last shift of the day
+        return (days - started_yesterday.astype(np.int64)).astype("datetime64[ns]") + start_minutes.astype("timedelta64[m]")
+    raise ValueError(f"Unknown OEE granularity '{granularity}'.")
+
+def bucket_minutes(starts: np.ndarray, granularity: str) -> np.ndarray:
+    """Calendar length in minutes of the buckets starting at `starts` (as returned by bucket_starts)."""
+    if granularity == "hour":
+        return np.full(len(starts), 60.0)
+    if granularity == "day":
+        return np.full(len(starts), 1440.0)
+    if granularity == "month":
+        return pd.DatetimeIndex(starts).days_in_month.to_numpy(dtype="float64") * 1440.0
+    shift_starts = _shift_start_minutes()
+    shift_lengths = np.diff(np.append(shift_starts, shift_starts[0] + 1440)).astype("float64")
+    minute_of_day = (starts - starts.astype("datetime64[D]").astype("datetime64[ns]")).astype("timedelta64[m]").astype(np.int64)
+    return shift_lengths[np.searchsorted(shift_starts, minute_of_day)]
+
+class OeeRollups:
+    """Sums and counts of the OEE metrics per (granularity, group, bucket) for one version of the OEE source."""
+
+    def __init__(self, df_oee: pd.DataFrame):
+        self.date_col = config.COLUMN_MAP["oee_date"]
+        metric_cols = {metric: config.COLUMN_MAP.get(f"oee_{metric}") for metric in METRICS}
+        self.dimension_cols = list(dict.fromkeys(config.COLUMN_MAP[key] for key in DIMENSION_KEYS
+                                                 if config.COLUMN_MAP.get(key) in df_oee.columns))
+        timestamps = pd.to_datetime(df_oee[self.date_col], errors="coerce")
+        valid_rows = timestamps.notna().to_numpy()
+        timestamps = timestamps[valid_rows].to_numpy(dtype="datetime64[ns]")
+        values = {metric: pd.to_numeric(df_oee[col], errors="coerce").to_numpy(dtype="float64")[valid_rows]
+                  if col in df_oee.columns else np.full(len(timestamps), np.nan) for metric, col in metric_cols.items()}
+        derived_overall = values["availability"] * values["performance"] * values["quality"] / 1e4
+        values["overall"] = np.where(np.isnan(values["overall"]), derived_overall, values["overall"])
+
+        if self.dimension_cols:
+            dims = df_oee.loc[valid_rows, self.dimension_cols].astype(object).fillna("").astype(str)
+            group_index = pd.MultiIndex.from_frame(dims)
+            group_ids, distinct_groups = pd.factorize(group_index)
+            self.groups = pd.DataFrame(list(distinct_groups), columns=self.dimension_cols) # factorize drops the level names
+        else:
+            group_ids, self.groups = np.zeros(len(timestamps), dtype=np.int64), pd.DataFrame(index=range(1))
+
+        # All granularities at once: rows stacked per granularity, one groupby over (granularity, group, bucket)
+        stacked = {"granularity": np.repeat(np.arange(len(GRANULARITIES)), len(timestamps)),
+                   "group": np.tile(group_ids, len(GRANULARITIES)),
+                   "bucket": np.concatenate([bucket_starts(timestamps, granularity) for granularity in GRANULARITIES])}
+        for metric, metric_values in values.items():
+            stacked[f"{metric}_sum"] = np.tile(np.nan_to_num(metric_values), len(GRANULARITIES))
+            stacked[f"{metric}_n"] = np.tile(~np.isnan(metric_values), len(GRANULARITIES)).astype(np.int64)
+        self.table = pd.DataFrame(stacked).groupby(["granularity", "group", "bucket"]).sum()
+        self.row_count = len(timestamps)
+
+    def _selected_table(self, selections: Dict[str, List[str]], granularity: str) -> pd.DataFrame:
+        group_mask = compute_filter_mask(self.groups, selections) if self.dimension_cols else None
+        granularity_table = self.table.xs(GRANULARITIES.index(granularity), level="granularity")
+        if group_mask is not None:
+            granularity_table = granularity_table[np.isin(granularity_table.index.get_level_values("group"), np.flatnonzero(group_mask))]
+        return granularity_table.groupby(level="bucket").sum()
+
+    def rollup(self, selections: Dict[str, List[str]], granularity: str, downtime_aggregates=None) -> pd.DataFrame:
+        """Mean metrics (%) per bucket of `granularity` for the selections, oldest first; `date_col` holds the bucket start."""
+        per_bucket = self._selected_table(selections, granularity)
+        df_rollup = pd.DataFrame({metric: per_bucket[f"{metric}_sum"] / per_bucket[f"{metric}_n"].replace(0, np.nan)
+                                  for metric in METRICS}, index=per_bucket.index)
+        if downtime_aggregates is not None and not df_rollup.empty:
+            self._fill_availability_from_downtime(df_rollup, selections, granularity, downtime_aggregates)
+        return df_rollup.rename_axis(self.date_col).reset_index()
+
+    def _fill_availability_from_downtime(self, df_rollup: pd.DataFrame, selections: Dict[str, List[str]],
+                                         granularity: str, downtime_aggregates) -> None:
+        interval_series, _bar_minutes = downtime_aggregates.interval_totals(selections)
+        if interval_series.empty:
+            return
+        downtime_per_bucket = interval_series.groupby(bucket_starts(interval_series.index.to_numpy(dtype="datetime64[ns]"), granularity)).sum()
+        df_rollup["downtime_minutes"] = downtime_per_bucket.reindex(df_rollup.index).fillna(0.0).to_numpy()
+        planned_minutes = bucket_minutes(df_rollup.index.to_numpy(dtype="datetime64[ns]"), granularity) * \
+            downtime_aggregates.group_count(selections) * config.OEE_PLANNED_TIME_SHARE
+        downtime_availability = 100.0 * np.clip(1.0 - df_rollup["downtime_minutes"] / planned_minutes, 0.0, 1.0)
+        df_rollup["availability"] = df_rollup["availability"].fillna(downtime_availability)
+        derived_overall = df_rollup["availability"] * df_rollup["performance"] * df_rollup["quality"] / 1e4
+        df_rollup["overall"] = df_rollup["overall"].fillna(derived_overall)
+
+    def latest_bucket(self, selections: Dict[str, List[str]], granularity: str) -> Optional[pd.Timestamp]:
+        """Start of the latest bucket of `granularity` holding rows of the selections (None without rows)."""
+        per_bucket = self._selected_table(selections, granularity)
+        return per_bucket.index.max() if not per_bucket.empty else None
+
+    def overall(self, selections: Dict[str, List[str]], downtime_aggregates=None,
+                before: Optional[pd.Timestamp] = None) -> Dict[str, Optional[float]]:
+        """
+        Mean of each metric (%) over all rows of the selections (None if a metric has no value). With `before` (a day
+        start, e.g. latest_bucket(..., "day")), over the rows before it only: the values as the previous period ended.
+        Availability from the downtime log is then averaged over the months ending before it.
+        """
+        per_bucket = self._selected_table(selections, "month" if before is None else "day")
+        totals = (per_bucket if before is None else per_bucket[per_bucket.index < before]).sum()
+        metric_means = {metric: (totals[f"{metric}_sum"] / totals[f"{metric}_n"]) if totals.get(f"{metric}_n", 0) else np.nan
+                        for metric in METRICS}
+        if np.isnan(metric_means["availability"]) and downtime_aggregates is not None:
+            monthly = self.rollup(selections, "month", downtime_aggregates)
+            if before is not None:
+                monthly = monthly[monthly[self.date_col] < before]
+            metric_means["availability"] = monthly["availability"].mean()
+            if np.isnan(metric_means["overall"]):
+                metric_means["overall"] = monthly["overall"].mean()
+        return {metric: (float(value) if pd.notna(value) else None) for metric, value in metric_means.items()}
+
+# file path -> (source fingerprint, rollups), per process
+_ROLLUPS: Dict[str, Tuple[str, Optional[OeeRollups]]] = {}
+_ROLLUPS_LOCK = threading.Lock()
+
+def get_oee_rollups(file_path: Optional[str] = None) -> Optional[OeeRollups]:
+    """Rollups of the OEE source, rebuilt when the file changes (one stat call otherwise). None without usable data."""
+    file_path = file_path or config.OEE_DATA_FILE
+    fingerprint = served_source_fingerprint(file_path) # The version load_data_main returns below
+    with _ROLLUPS_LOCK:
+        cached = _ROLLUPS.get(file_path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        date_col = config.COLUMN_MAP.get("oee_date")
+        df_oee = load_data_main(file_path, date_cols_actual_names=[date_col] if date_col else None)
+        rollups = None
+        if not df_oee.empty and date_col in df_oee.columns:
+            rollups = OeeRollups(df_oee)
+            logger.info(f"Built OEE rollups of '{file_path}': {rollups.row_count} rows -> {len(rollups.table)} buckets.")
+        _ROLLUPS[file_path] = (fingerprint, rollups)
+        return rollups
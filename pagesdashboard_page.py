@@ -2,35 +2,16 @@
 import streamlit as st
 import pandas as pd
 import config
-from utils import load_data_main, apply_all_filters_to_df
-from typing import Callable, Dict, List, Any
+import precomputed_store
+import panel_registry
+from panel_results import localize_insight
+from utils import load_data_main, apply_all_filters_to_df, served_source_fingerprint
+from typing import Callable, Dict, List, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Import panel rendering functions dynamically to avoid large import block if some are optional
-# This is more robust if a panel file is missing or has import errors.
-PANEL_MODULE_NAMES = [
-    "stability_panel", "safety_panel", "engagement_panel", "stress_panel",
-    "task_compliance_panel", "collaboration_panel", "wellbeing_panel",
-    "downtime_panel", "oee_panel", "resilience_panel", "spatial_dynamics_panel"
-]
-
-# Dataframe mapping: panel_name -> list of conceptual dataframe keys it needs
-PANEL_DATA_REQUIREMENTS = {
-    "stability_panel": ["stability"],
-    "safety_panel": ["safety"],
-    "engagement_panel": ["engagement", "psych_safety"], # Example: engagement also uses psych_safety data
-    "stress_panel": ["stress", "perceived_workload"],
-    "task_compliance_panel": ["tasks"],
-    "collaboration_panel": ["collaboration", "team_cohesion"],
-    "wellbeing_panel": ["wellbeing", "psych_safety", "perceived_workload"], # Can also access engagement/stress if needed via all_dfs
-    "downtime_panel": ["downtime"],
-    "oee_panel": ["oee"],
-    "resilience_panel": ["resilience"],
-    "spatial_dynamics_panel": ["spatial"]
-}
-
+# Panels, their order and data requirements live in panel_registry.py; sources are resolved here.
 DATA_SOURCE_MAP = { # Conceptual key -> (FILE_CONSTANT_NAME_IN_CONFIG, date_col_conceptual_key_or_None)
     "stability": ("STABILITY_DATA_FILE", "date"),
     "safety": ("SAFETY_DATA_FILE", None), # Month is text
@@ -49,26 +30,121 @@ DATA_SOURCE_MAP = { # Conceptual key -> (FILE_CONSTANT_NAME_IN_CONFIG, date_col_
 }
 
 
-@st.cache_data # Cache the combined loading and filtering logic if filter_selections are hashable
-def load_and_filter_data_for_dashboard(filter_selections_tuple: tuple) -> Dict[str, pd.DataFrame]:
-    # Convert tuple back to dict for selections
-    filter_selections = dict(filter_selections_tuple)
+def load_raw_dataframes(source_keys: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    """Loads the given sources of DATA_SOURCE_MAP (default: all), unfiltered. load_data_main is cached."""
     loaded_dfs_raw: Dict[str, pd.DataFrame] = {}
-    loaded_dfs_filtered: Dict[str, pd.DataFrame] = {}
-
     for key, (file_const_name, date_col_key) in DATA_SOURCE_MAP.items():
+        if source_keys is not None and key not in source_keys:
+            continue
         file_path = getattr(config, file_const_name, None)
         if not file_path:
             logger.warning(f"File constant {file_const_name} not found in config. Skipping data source: {key}")
             loaded_dfs_raw[key] = pd.DataFrame()
-            loaded_dfs_filtered[key] = pd.DataFrame()
             continue
 
         date_col_actual_name = config.COLUMN_MAP.get(date_col_key) if date_col_key else None
-        df_raw = load_data_main(file_path, date_cols_actual_names=[date_col_actual_name] if date_col_actual_name else None)
-        loaded_dfs_raw[key] = df_raw
-        loaded_dfs_filtered[key] = apply_all_filters_to_df(df_raw, filter_selections)
-    return loaded_dfs_filtered
+        loaded_dfs_raw[key] = load_data_main(file_path, date_cols_actual_names=[date_col_actual_name] if date_col_actual_name else None)
+    return loaded_dfs_raw
+
+
+def filter_dataframes(loaded_dfs_raw: Dict[str, pd.DataFrame], filter_selections: Dict[str, List[str]]) -> Dict[str, pd.DataFrame]:
+    """Applies the sidebar selections to every source. Unfiltered sources are the raw frames themselves: read-only."""
+    return {key: apply_all_filters_to_df(df_raw, filter_selections) for key, df_raw in loaded_dfs_raw.items()}
+
+
+@st.cache_resource(max_entries=config.SHARED_FILTERED_VIEWS_MAX_ENTRIES * len(DATA_SOURCE_MAP)) # Shared by all sessions
+def load_and_filter_source(source_key: str, filter_selections_tuple: tuple, data_fingerprint: str = "") -> pd.DataFrame:
+    """
+    One filtered source for one filter combination, cached per source so each panel opened later only loads what it
+    adds. The frame is shared by reference between sessions (no per-session pickled copy), and an unfiltered source is
+    the raw frame itself, so consumers must treat it as read-only.
+    data_fingerprint (precomputed_store.current_data_fingerprint) only keys the cache, so changed files are re-filtered.
+    """
+    # Convert tuple back to dict for selections
+    filter_selections = dict(filter_selections_tuple)
+    return apply_all_filters_to_df(load_raw_dataframes([source_key]).get(source_key, pd.DataFrame()), filter_selections)
+
+
+def load_and_filter_data_for_dashboard(filter_selections_tuple: tuple, data_fingerprint: str = "",
+                                       source_keys: Optional[tuple] = None) -> Dict[str, pd.DataFrame]:
+    """Filtered sources (source_keys, default all) for one filter combination (see load_and_filter_source)."""
+    source_keys = source_keys if source_keys is not None else tuple(DATA_SOURCE_MAP.keys())
+    return {key: load_and_filter_source(key, filter_selections_tuple, data_fingerprint) for key in source_keys}
+
+
+@st.cache_resource # One embedded database connection per server process, shared by all sessions
+def get_query_backend() -> Optional[Any]:
+    """Returns the SQL query backend when config.DATA_BACKEND selects one, else None (in-memory pandas path)."""
+    if config.DATA_BACKEND not in ("duckdb", "sqlite"):
+        return None
+    from query_backend import SqlQueryBackend
+    return SqlQueryBackend(config.SQL_BACKEND_DB_PATH, engine=config.DATA_BACKEND)
+
+
+def get_synced_query_backend() -> Optional[Any]:
+    """get_query_backend() after reloading any source file that changed since the last rerun."""
+    query_backend = get_query_backend()
+    if query_backend is not None:
+        query_backend.sync_sources(DATA_SOURCE_MAP)
+    return query_backend
+
+
+def current_source_fingerprints() -> Dict[str, str]:
+    """Per-source fingerprint of the served file version (utils.served_source_fingerprint) of every DATA_SOURCE_MAP source."""
+    return {key: served_source_fingerprint(getattr(config, file_const_name, "") or "")
+            for key, (file_const_name, _date_col_key) in DATA_SOURCE_MAP.items()}
+
+
+def compute_panel_results(filter_selections: Dict[str, List[str]], lang_code: str, panel_names: List[str],
+                          data_fingerprint: str, source_fingerprints: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    PanelResults of the given headless panels for one filter combination, outside a session (api_server.py,
+    wallboard.py): precompute.py artifacts, then the SQL query backend, then the shared filtered frames, as in render.
+    With source_fingerprints (see current_source_fingerprints) each filtered frame is keyed on its own file, so only
+    the sources that changed are re-filtered.
+    """
+    panel_specs = panel_registry.get_panel_specs(compute_only=True)
+    view_key = precomputed_store.view_key_for_filters(filter_selections)
+    hashable_filter_selections = tuple(sorted((k, tuple(sorted(v))) for k, v in filter_selections.items()))
+    query_backend = get_synced_query_backend()
+    results: Dict[str, Any] = {}
+    in_memory_panels = []
+    for panel_name_key in panel_names:
+        panel_spec = panel_specs[panel_name_key]
+        precomputed_result = precomputed_store.load_panel_result(view_key, panel_name_key, lang_code, data_fingerprint) if view_key else None
+        if precomputed_result is not None:
+            results[panel_name_key] = precomputed_result
+        elif query_backend is not None and panel_spec.supports_sql:
+            results[panel_name_key] = panel_spec.compute_sql(query_backend, filter_selections, lang_code)
+        else:
+            in_memory_panels.append(panel_spec)
+    if in_memory_panels:
+        source_keys = panel_registry.required_sources(in_memory_panels)
+        if source_fingerprints is not None:
+            filtered_dfs = {key: load_and_filter_source(key, hashable_filter_selections, source_fingerprints.get(key, data_fingerprint))
+                            for key in source_keys}
+        else:
+            filtered_dfs = load_and_filter_data_for_dashboard(hashable_filter_selections, data_fingerprint, tuple(source_keys))
+        for panel_spec in in_memory_panels:
+            try:
+                results[panel_spec.name] = panel_spec.compute(filtered_dfs, filter_selections, lang_code)
+            except Exception as e:
+                logger.error(f"Error computing panel '{panel_spec.name}' for filters {filter_selections}: {e}", exc_info=True)
+    return results
+
+
+PANEL_RESULTS_SESSION_KEY = "dashboard_panel_results"
+
+
+def _lazy_toggle_key(panel_name_key: str) -> str:
+    return f"lazy_panel_open_{panel_name_key}"
+
+
+def _is_panel_open(st_session_state: Any, panel_spec: Any) -> bool:
+    """Above-the-fold panels are always open; below-the-fold ones once their toggle is on (config.LAZY_RENDER_BELOW_FOLD)."""
+    if not (config.LAZY_RENDER_BELOW_FOLD and panel_spec.below_fold):
+        return True
+    return bool(st_session_state.get(_lazy_toggle_key(panel_spec.name), False))
 
 
 def render(st_session_state: Any, _: Callable[[str, Optional[str]], str], filter_selections: Dict[str, List[str]]):
@@ -76,7 +152,11 @@ def render(st_session_state: Any, _: Callable[[str, Optional[str]], str], filter
     # Make filter_selections hashable for caching
     # Convert lists to tuples within the dict values
     hashable_filter_selections = tuple(sorted((k, tuple(sorted(v))) for k, v in filter_selections.items()))
-    all_filtered_dfs = load_and_filter_data_for_dashboard(hashable_filter_selections)
+    lang_code = st_session_state.selected_lang_code
+    # Default and single-site views are served from precompute.py artifacts when they match the current data
+    precomputed_view_key = precomputed_store.view_key_for_filters(filter_selections)
+    data_fingerprint = precomputed_store.current_data_fingerprint() # Cheap: one stat per source file
+    query_backend = get_query_backend() # None unless config.DATA_BACKEND is "duckdb" / "sqlite"; synced by app.py's sidebar this rerun
 
     # --- Main Dashboard Area ---
     st.title(_("dashboard_title"))
@@ -86,64 +166,66 @@ def render(st_session_state: Any, _: Callable[[str, Optional[str]], str], filter
     st.info(_("psych_safety_note"))
     st.markdown("---")
 
-    # --- Dynamically Render Panels ---
-    panel_render_order = [ # Define the order you want panels to appear
-        "stability_panel", "safety_panel", "engagement_panel", "stress_panel",
-        # "advanced_analytics_title_header", # Special key for header
-        "task_compliance_panel", "collaboration_panel", "wellbeing_panel",
-        "downtime_panel", "oee_panel", "resilience_panel", "spatial_dynamics_panel"
-    ]
+    # --- Schedule Panels ---
+    # Collapsed below-the-fold panels are skipped entirely. For the others, a result comes from the first source
+    # that has it: this session's cache, precompute.py artifacts, the SQL query backend, or in-memory compute over
+    # the filtered frames. Frames are loaded only for the panels in the last group, each shared source once.
+    # Results are language-independent (insights and notices are localization keys, figures are built per language
+    # from a cached skeleton, see visualizations.build_figure), so a language switch reuses the session's results;
+    # only precomputed ones, whose figures were rendered in one language, are bound to theirs.
+    panel_specs = panel_registry.get_panel_specs()
+    session_results = st_session_state.setdefault(PANEL_RESULTS_SESSION_KEY, {}) # panel name -> (result key, PanelResult)
+    result_key = (hashable_filter_selections, data_fingerprint)
+    panel_results: Dict[str, Any] = {}
+    in_memory_panels = []
+    for panel_name_key, panel_spec in panel_specs.items():
+        if not _is_panel_open(st_session_state, panel_spec):
+            continue
+        cached_entry = session_results.get(panel_name_key)
+        if cached_entry is not None and cached_entry[0] == result_key and cached_entry[1].lang_code in (None, lang_code):
+            panel_results[panel_name_key] = cached_entry[1]
+            continue
+        if precomputed_view_key and panel_spec.supports_compute:
+            precomputed_result = precomputed_store.load_panel_result(precomputed_view_key, panel_name_key, lang_code, data_fingerprint)
+            if precomputed_result is not None:
+                panel_results[panel_name_key] = precomputed_result
+                continue
+        if not (query_backend is not None and panel_spec.supports_sql):
+            in_memory_panels.append(panel_spec)
+    all_filtered_dfs: Dict[str, pd.DataFrame] = {}
+    if in_memory_panels:
+        all_filtered_dfs = load_and_filter_data_for_dashboard(hashable_filter_selections, data_fingerprint,
+                                                              tuple(panel_registry.required_sources(in_memory_panels)))
 
-    advanced_header_rendered = False
-    for panel_name_key in panel_render_order:
+    # --- Render Panels ---
+    for panel_name_key in panel_registry.PANEL_ORDER:
         # Check if it's time to render the "Advanced Analytics" header
-        if panel_name_key == "task_compliance_panel" and not advanced_header_rendered:
+        if panel_name_key == panel_registry.ADVANCED_SECTION_START:
             st.header(_("advanced_analytics_title"))
+            if config.LAZY_RENDER_BELOW_FOLD:
+                st.caption(_("lazy_panels_hint"))
             st.markdown("---")
-            advanced_header_rendered = True
+        panel_spec = panel_specs.get(panel_name_key)
+        if panel_spec is None: # Missing panel (recorded in panel_registry.MISSING_PANEL_MODULES)
+            continue
+        if config.LAZY_RENDER_BELOW_FOLD and panel_spec.below_fold:
+            st.checkbox(f"{_('lazy_panel_toggle')} {_(panel_spec.title_key)}", key=_lazy_toggle_key(panel_name_key))
+            if not _is_panel_open(st_session_state, panel_spec):
+                continue
 
         try:
-            panel_module = __import__(f"panels.{panel_name_key}", fromlist=[panel_name_key])
-            # Prepare specific arguments for the panel's render function
-            # This needs to be flexible based on what each panel's render function expects
-            render_args = [st, st_session_state.selected_lang_code, _] # Common args
-
-            if panel_name_key == "stability_panel":
-                render_args.insert(1, all_filtered_dfs.get("stability", pd.DataFrame()))
-            elif panel_name_key == "safety_panel":
-                render_args.insert(1, all_filtered_dfs.get("safety", pd.DataFrame()))
-            elif panel_name_key == "engagement_panel":
-                render_args.insert(1, all_filtered_dfs.get("engagement", pd.DataFrame()))
-                render_args.insert(2, all_filtered_dfs.get("psych_safety", pd.DataFrame())) # Add psych_safety
-            elif panel_name_key == "stress_panel":
-                render_args.insert(1, all_filtered_dfs.get("stress", pd.DataFrame()))
-                render_args.insert(2, all_filtered_dfs.get("perceived_workload", pd.DataFrame()))
-            elif panel_name_key == "task_compliance_panel":
-                 render_args.insert(1, all_filtered_dfs.get("tasks", pd.DataFrame()))
-            elif panel_name_key == "collaboration_panel":
-                render_args.insert(1, all_filtered_dfs.get("collaboration", pd.DataFrame()))
-                render_args.insert(2, all_filtered_dfs.get("team_cohesion", pd.DataFrame()))
-            elif panel_name_key == "wellbeing_panel":
-                render_args.insert(1, all_filtered_dfs.get("wellbeing", pd.DataFrame()))
-                render_args.insert(2, all_filtered_dfs.get("psych_safety", pd.DataFrame()))
-                render_args.insert(3, all_filtered_dfs.get("perceived_workload", pd.DataFrame()))
-            elif panel_name_key == "downtime_panel":
-                render_args.insert(1, all_filtered_dfs.get("downtime", pd.DataFrame()))
-                render_args.insert(2, filter_selections.get('shift', [])) # Pass selected shifts for context
-            elif panel_name_key == "oee_panel":
-                render_args.insert(1, all_filtered_dfs.get("oee", pd.DataFrame()))
-            elif panel_name_key == "resilience_panel":
-                render_args.insert(1, all_filtered_dfs.get("resilience", pd.DataFrame()))
-            elif panel_name_key == "spatial_dynamics_panel":
-                 render_args.insert(1, all_filtered_dfs.get("spatial", pd.DataFrame()))
-            # Add more elif blocks here for other panels if they have unique arg needs
-
-            panel_module.render(*render_args)
-
-        except ImportError:
-            logger.warning(f"Panel module 'panels.{panel_name_key}.py' not found or not implemented.")
-            # Optionally, display a placeholder or skip
-            # st.warning(_("panel_not_available", panel_name=_(f"{panel_name_key}_title", panel_name_key.replace("_"," ").title())))
+            if panel_name_key in panel_results:
+                panel_result = panel_results[panel_name_key]
+            elif query_backend is not None and panel_spec.supports_sql:
+                # Filters and aggregations are pushed down as SQL; no DataFrame of the source is loaded
+                panel_result = panel_spec.compute_sql(query_backend, filter_selections, lang_code)
+            elif panel_spec.supports_compute:
+                panel_result = panel_spec.compute(all_filtered_dfs, filter_selections, lang_code)
+            else: # Legacy panel: computes while rendering, nothing to cache
+                panel_spec.render(st, all_filtered_dfs, filter_selections, lang_code, _)
+                continue
+            session_results[panel_name_key] = (result_key, panel_result)
+            panel_spec.render_result(st, panel_result, lang_code, _)
         except Exception as e:
             panel_display_name = _(f"{panel_name_key}_title", panel_name_key.replace("_panel","").replace("_"," ").title())
             logger.error(f"Error rendering panel '{panel_name_key}': {e}", exc_info=True)
@@ -152,12 +234,14 @@ def render(st_session_state: Any, _: Callable[[str, Optional[str]], str], filter
 
 
     # --- Placeholder Modules ---
-    st.header(_("plant_map_title"))
-    st.markdown(config.PLACEHOLDER_TEXT_PLANT_MAP, unsafe_allow_html=True)
-    # st.warning(_("This module is a placeholder for future development.", "Module currently in development.")) # Redundant with placeholder text
-    st.markdown("---")
     st.header(_("ai_insights_title"))
-    st.markdown(config.PLACEHOLDER_TEXT_AI_INSIGHTS, unsafe_allow_html=True)
+    # Fed by the driver relations of drivers_panel once it has been computed for the current view
+    drivers_entry = session_results.get("drivers_panel")
+    if drivers_entry is not None and drivers_entry[0] == result_key and drivers_entry[1].has_data:
+        for insight_item in drivers_entry[1].insights:
+            st.markdown(f"💡 {localize_insight(insight_item, _)}")
+    else:
+        st.markdown(config.PLACEHOLDER_TEXT_AI_INSIGHTS, unsafe_allow_html=True)
     # st.warning(_("This module is a placeholder for future development."))
     st.markdown("---")
 
@@ -0,0 +1,133 @@
+# panel_registry.py
+"""
+Panel plugin registry. Every panel module under panels/ declares what it needs and how it is computed:
+
+    DATA_SOURCES = ["engagement", "psych_safety"]   # DATA_SOURCE_MAP keys of pages/dashboard_page.py
+    TITLE_KEY = "engagement_title"                   # optional, localization key of the panel header
+    ENGINE_SOURCES = ["downtime"]                     # optional, sources an engine reads for a panel (not in DATA_SOURCES)
+    def compute(dataframes, filters, lang_code) -> PanelResult          # headless, cacheable
+    def render_result(st_container, result, lang_code, _)             # thin layout
+    def compute_sql(backend, filters, lang_code) -> PanelResult       # optional, SQL query backend
+
+The dashboard, precompute.py and any other consumer resolve panels here instead of hardcoding
+names, data requirements and argument lists. Modules are imported once per process; missing
+ones are recorded in MISSING_PANEL_MODULES and not retried.
+"""
+import importlib
+import logging
+import pandas as pd
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from panel_results import PanelResult
+
+logger = logging.getLogger(__name__)
+
+PANEL_ORDER = [ # Display order on the dashboard
+    "stability_panel", "safety_panel", "engagement_panel", "stress_panel",
+    "task_compliance_panel", "collaboration_panel", "wellbeing_panel",
+    "downtime_panel", "oee_panel", "drivers_panel", "drilldown_panel", "scenario_panel", "resilience_panel", "spatial_dynamics_panel",
+    "plant_map_panel"
+]
+ADVANCED_SECTION_START = "task_compliance_panel" # The "Advanced Analytics" header is rendered before this panel
+
+# Data requirements of panels that still only expose the legacy positional `render(st, df..., lang_code, _)`
+# without declaring DATA_SOURCES. The frames are passed in this order, followed by LEGACY_FILTER_ARGS.
+LEGACY_DATA_REQUIREMENTS: Dict[str, List[str]] = {
+    "safety_panel": ["safety"],
+    "engagement_panel": ["engagement", "psych_safety"],
+    "stress_panel": ["stress", "perceived_workload"],
+    "collaboration_panel": ["collaboration", "team_cohesion"],
+    "wellbeing_panel": ["wellbeing", "psych_safety", "perceived_workload"],
+    "resilience_panel": ["resilience"],
+    "spatial_dynamics_panel": ["spatial"]
+}
+LEGACY_FILTER_ARGS: Dict[str, List[str]] = {} # panel -> filter keys, e.g. {"some_panel": ["shift"]} for selected shifts
+
+@dataclass(frozen=True)
+class PanelSpec:
+    """A resolved panel: its module, declared data sources and entry points."""
+    name: str
+    module: Any
+    data_sources: Tuple[str, ...]
+
+    @property
+    def title_key(self) -> str:
+        return getattr(self.module, "TITLE_KEY", f"{self.name}_title")
+
+    @property
+    def watched_sources(self) -> Tuple[str, ...]:
+        """Every source whose change alters the result: DATA_SOURCES plus the ENGINE_SOURCES its engine reads."""
+        engine_sources = tuple(key for key in getattr(self.module, "ENGINE_SOURCES", []) if key not in self.data_sources)
+        return self.data_sources + engine_sources
+
+    @property
+    def below_fold(self) -> bool:
+        """Panels from ADVANCED_SECTION_START on (rendered lazily with config.LAZY_RENDER_BELOW_FOLD)."""
+        return self.name in PANEL_ORDER and PANEL_ORDER.index(self.name) >= PANEL_ORDER.index(ADVANCED_SECTION_START)
+
+    @property
+    def supports_compute(self) -> bool:
+        """True for panels with the headless compute / render_result API (cacheable, precomputable)."""
+        return callable(getattr(self.module, "compute", None)) and callable(getattr(self.module, "render_result", None))
+
+    @property
+    def supports_sql(self) -> bool:
+        return self.supports_compute and callable(getattr(self.module, "compute_sql", None))
+
+    def compute(self, dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+        return self.module.compute({key: dataframes.get(key, pd.DataFrame()) for key in self.data_sources}, filters, lang_code)
+
+    def compute_sql(self, backend: Any, filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+        return self.module.compute_sql(backend, filters, lang_code)
+
+    def render_result(self, st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+        self.module.render_result(st_container, result, lang_code, _)
+
+    def render(self, st_container: Any, dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]],
+               lang_code: str, _: Callable[[str, Optional[str]], str]):
+        """Computes and renders from in-memory frames (through the legacy positional `render` for unmigrated panels)."""
+        if self.supports_compute:
+            self.render_result(st_container, self.compute(dataframes, filters, lang_code), lang_code, _)
+            return
+        render_args = [st_container] + [dataframes.get(key, pd.DataFrame()) for key in self.data_sources] + \
+                      [filters.get(filter_key, []) for filter_key in LEGACY_FILTER_ARGS.get(self.name, [])] + [lang_code, _]
+        self.module.render(*render_args)
+
+# Resolved once per process: panel name -> PanelSpec, or -> import error for missing panels
+_PANEL_SPECS: Dict[str, PanelSpec] = {}
+MISSING_PANEL_MODULES: Dict[str, str] = {}
+
+def get_panel_spec(panel_name_key: str) -> Optional[PanelSpec]:
+    """Imports panels.<panel_name_key> on first use. Missing panels are recorded and not re-attempted on later reruns."""
+    if panel_name_key in _PANEL_SPECS:
+        return _PANEL_SPECS[panel_name_key]
+    if panel_name_key in MISSING_PANEL_MODULES:
+        return None
+    try:
+        panel_module = importlib.import_module(f"panels.{panel_name_key}")
+    except ImportError as e:
+        logger.warning(f"Panel module 'panels.{panel_name_key}.py' not found or not implemented ({e}); skipping it from now on.")
+        MISSING_PANEL_MODULES[panel_name_key] = str(e)
+        return None
+    data_sources = getattr(panel_module, "DATA_SOURCES", None)
+    if data_sources is None:
+        data_sources = LEGACY_DATA_REQUIREMENTS.get(panel_name_key, [])
+    _PANEL_SPECS[panel_name_key] = PanelSpec(panel_name_key, panel_module, tuple(data_sources))
+    return _PANEL_SPECS[panel_name_key]
+
+def get_panel_specs(compute_only: bool = False) -> Dict[str, PanelSpec]:
+    """Available panels in PANEL_ORDER. compute_only keeps panels with the headless compute API (e.g. for precompute.py)."""
+    specs = {}
+    for panel_name_key in PANEL_ORDER:
+        spec = get_panel_spec(panel_name_key)
+        if spec is not None and (spec.supports_compute or not compute_only):
+            specs[panel_name_key] = spec
+    return specs
+
+def required_sources(specs: List[PanelSpec]) -> List[str]:
+    """Data sources needed by the given panels, each listed once (shared sources such as psych_safety are loaded once)."""
+    sources: List[str] = []
+    for spec in specs:
+        sources.extend(key for key in spec.data_sources if key not in sources)
+    return sources
@@ -0,0 +1,72 @@
+# panel_results.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+
+# A figure spec is {"builder": "<visualizations function name>", "kwargs": {...}}.
+# `lang_code` is deliberately NOT part of the kwargs; it is supplied when the figure is built,
+# so the same spec can be rendered in any language (see visualizations.build_figure, which caches the figure's
+# language-independent skeleton and its last built figure on the spec under "_skeleton" / "_figure").
+FigureSpec = Dict[str, Any]
+
+
+def figure_spec(builder: str, **kwargs) -> FigureSpec:
+    """Small helper so panels don't hand-build the spec dict."""
+    return {"builder": builder, "kwargs": kwargs}
+
+
+@dataclass
+class PanelResult:
+    """Output of a panel's pure `compute` step. Contains no Streamlit objects."""
+    panel_name: str
+    title_key: str
+    has_data: bool = False
+    kpis: Dict[str, Optional[float]] = field(default_factory=dict) # kpi_key -> current value
+    previous_kpis: Dict[str, Optional[float]] = field(default_factory=dict) # kpi_key -> value of the previous period (only KPIs that have one)
+    trends: Dict[str, Any] = field(default_factory=dict) # trend_key -> aggregated DataFrame / Series
+    cards: Dict[str, Dict[str, Any]] = field(default_factory=dict) # slot -> viz.display_metric_card kwargs (no container/lang)
+    figures: Dict[str, FigureSpec] = field(default_factory=dict) # slot -> figure spec
+    notices: Dict[str, Dict[str, Any]] = field(default_factory=dict) # slot -> notice (see `notice`) shown instead of a figure
+    insights: List[Dict[str, Any]] = field(default_factory=list) # see `insight`
+    lang_code: Optional[str] = None # Language the result is bound to (precompute.py artifacts hold rendered figures); None: any
+
+
+def notice(level: str, text_key: str, sub_text_key: Optional[str] = None, detail: str = "") -> Dict[str, Any]:
+    """A message to show in a slot, kept as localization keys so it stays language-independent.
+    level: 'info' | 'warning' | 'error' (the Streamlit container method to call)."""
+    return {"level": level, "text_key": text_key, "sub_text_key": sub_text_key, "detail": detail}
+
+
+def render_notice(st_container: Any, notice_dict: Dict[str, Any], _) -> None:
+    """Shows a notice created by `notice` on the given container."""
+    text = _(notice_dict["text_key"])
+    if notice_dict.get("sub_text_key"): text += f" ({_(notice_dict['sub_text_key'])})"
+    if notice_dict.get("detail"): text += notice_dict["detail"]
+    getattr(st_container, notice_dict.get("level", "info"))(text)
+
+
+def insight(text_key: str, localized_args: Optional[Dict[str, str]] = None, **args) -> Dict[str, Any]:
+    """An insight kept as a localization key and format arguments, like `notice`.
+    localized_args: format argument -> localization key of its value (e.g. a panel title), resolved when shown."""
+    return {"text_key": text_key, "args": args, "localized_args": localized_args or {}}
+
+
+def localize_insight(insight_item: Any, _) -> str:
+    """Text of an insight created by `insight` in the language of `_` (a text key -> text callable)."""
+    if isinstance(insight_item, str): # Already text (artifacts written before insights were kept as keys)
+        return insight_item
+    format_args = dict(insight_item.get("args", {}))
+    format_args.update({name: _(text_key) for name, text_key in insight_item.get("localized_args", {}).items()})
+    text = _(insight_item["text_key"])
+    try:
+        return text.format(**format_args)
+    except (KeyError, IndexError, ValueError):
+        return text
+
+
+def render_insights(st_container: Any, insights_list: List[Dict[str, Any]], _) -> None:
+    """Shows the actionable insights block shared by all panels."""
+    if insights_list:
+        st_container.markdown("---")
+        st_container.subheader(_("actionable_insights_title"))
+        for insight_item in insights_list:
+            st_container.markdown(f"💡 {localize_insight(insight_item, _)}")
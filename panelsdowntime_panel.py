@@ -0,0 +1,170 @@
+# panels/downtime_panel.py
+import streamlit as st
+import pandas as pd
+import config
+import visualizations as viz
+import insights
+import downtime_engine
+from panel_results import PanelResult, figure_spec, notice, render_notice, render_insights
+from typing import Callable, Any, Optional, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The event log can hold millions of rows: it is not loaded as a DataFrame source. The panel queries the running
+# aggregates of downtime_engine instead, which apply the sidebar filters to their groups.
+DATA_SOURCES: List[str] = []
+ENGINE_SOURCES = ["downtime"]
+TITLE_KEY = "downtime_analysis_title"
+
+def compute(dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    """Pure computation step: downtime KPIs, interval totals, cause Pareto and shift totals. No Streamlit calls."""
+    result = PanelResult(panel_name="downtime_panel", title_key=TITLE_KEY)
+    aggregates = downtime_engine.get_downtime_aggregates()
+    if aggregates is None:
+        return result
+    summary = aggregates.summary(filters)
+    if summary["events"] == 0:
+        return result
+    result.has_data = True
+
+    # --- Metric Cards & Gauge ---
+    total_downtime = summary["total_minutes"]
+    prev_total_downtime = aggregates.total_before_period(filters, config.DOWNTIME_PERIOD_MINUTES) # Delta: the latest period's downtime
+    result.kpis.update({"total_downtime": total_downtime, "downtime_incidents": float(summary["events"]),
+                        "avg_duration_incident": summary["avg_event_minutes"]})
+    result.previous_kpis["total_downtime"] = prev_total_downtime
+
+    result.cards["total_downtime"] = dict(
+        label_key="total_downtime_metric_card",
+        value=total_downtime,
+        unit=" min",
+        higher_is_better=False,
+        target_value=config.TOTAL_DOWNTIME_THRESHOLDS.get("target"),
+        threshold_good=config.TOTAL_DOWNTIME_THRESHOLDS.get("good"),
+        threshold_warning=config.TOTAL_DOWNTIME_THRESHOLDS.get("warning"),
+        previous_value=prev_total_downtime,
+        help_text_key="total_downtime_help",
+        value_format_str=".0f"
+    )
+    result.cards["downtime_incidents"] = dict(
+        label_key="number_of_incidents_metric_card",
+        value=summary["events"],
+        higher_is_better=False,
+        help_text_key="num_incidents_help",
+        value_format_str=".0f"
+    )
+    result.cards["avg_duration_incident"] = dict(
+        label_key="avg_duration_incident_metric_card",
+        value=summary["avg_event_minutes"],
+        unit=" min",
+        higher_is_better=False,
+        help_text_key="avg_duration_help",
+        value_format_str=".1f"
+    )
+    result.figures["total_downtime_gauge"] = figure_spec(
+        "create_kpi_gauge",
+        value=total_downtime,
+        title_key="total_downtime_gauge",
+        unit=" min",
+        higher_is_worse=True,
+        threshold_good=config.TOTAL_DOWNTIME_THRESHOLDS.get("good"),
+        threshold_warning=config.TOTAL_DOWNTIME_THRESHOLDS.get("warning"),
+        target_line_value=config.TOTAL_DOWNTIME_THRESHOLDS.get("target"),
+        previous_value=prev_total_downtime,
+        max_value_override=config.TOTAL_DOWNTIME_THRESHOLDS.get("max_display"),
+        value_format_str=".0f"
+    )
+
+    # --- Downtime per Interval ---
+    interval_series, bar_minutes = aggregates.interval_totals(filters, max_bars=config.DOWNTIME_MAX_INTERVAL_BARS)
+    if not interval_series.empty:
+        result.trends["downtime_per_interval"] = interval_series
+        df_intervals = interval_series.rename_axis(aggregates.date_col).reset_index()
+        result.figures["downtime_interval"] = figure_spec(
+            "create_downtime_interval_plot_themed",
+            df=df_intervals,
+            date_col=aggregates.date_col,
+            value_col="minutes",
+            bar_minutes=bar_minutes
+        )
+    else:
+        result.notices["downtime_interval"] = notice("info", "no_data_downtime_interval")
+
+    # --- Cause Pareto ---
+    df_pareto = aggregates.cause_pareto(filters)
+    if not df_pareto.empty:
+        result.trends["cause_pareto"] = df_pareto
+        result.figures["downtime_causes"] = figure_spec(
+            "create_downtime_causes_pie_themed",
+            downtime_events_df=df_pareto,
+            cause_col=aggregates.cause_col,
+            duration_col="minutes",
+            top_n=config.DOWNTIME_PARETO_TOP_CAUSES
+        )
+    else:
+        result.notices["downtime_causes"] = notice("info", "no_data_downtime_cause")
+
+    # --- Downtime per Shift ---
+    df_shifts = aggregates.shift_totals(filters)
+    if not df_shifts.empty:
+        result.trends["shift_totals"] = df_shifts
+        result.figures["downtime_shifts"] = figure_spec(
+            "create_comparison_bar_chart",
+            df=df_shifts,
+            category_col=aggregates.shift_col,
+            value_cols_map={"downtime_duration_label": "minutes"},
+            title_key="downtime_by_shift_chart_title",
+            x_axis_title_key="shift_label",
+            y_axis_title_key="minutes_label",
+            data_label_format_str=".0f"
+        )
+
+    # --- Actionable Insights ---
+    try:
+        result.insights = insights.generate_downtime_insights(
+            pd.DataFrame(), # No event-level frame: the panel works on aggregates
+            total_downtime,
+            summary["events"],
+            summary["avg_event_minutes"]
+        )
+    except Exception as e:
+        logger.error(f"Error generating downtime insights: {e}")
+        result.notices["insights"] = notice("warning", "error_generating_insights", detail=f": {e}")
+    return result
+
+def render_result(st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    """Thin render step: lays out a PanelResult produced by `compute`."""
+    st_container.header(_(result.title_key))
+
+    if result.has_data:
+        card_cols = st_container.columns(3)
+        for card_col, card_key in zip(card_cols, ["total_downtime", "downtime_incidents", "avg_duration_incident"]):
+            with card_col:
+                viz.display_metric_card(card_col, lang_code=lang_code, **result.cards[card_key])
+
+        col1, col2 = st_container.columns([1, 2]) # Layout: 1/3 for gauge, 2/3 for the interval plot
+        with col1:
+            col1.plotly_chart(viz.build_figure(result.figures["total_downtime_gauge"], lang_code), use_container_width=True)
+        with col2:
+            if "downtime_interval" in result.figures:
+                col2.plotly_chart(viz.build_figure(result.figures["downtime_interval"], lang_code), use_container_width=True)
+            elif "downtime_interval" in result.notices:
+                render_notice(col2, result.notices["downtime_interval"], _)
+
+        col3, col4 = st_container.columns(2)
+        with col3:
+            if "downtime_causes" in result.figures:
+                col3.plotly_chart(viz.build_figure(result.figures["downtime_causes"], lang_code), use_container_width=True)
+            elif "downtime_causes" in result.notices:
+                render_notice(col3, result.notices["downtime_causes"], _)
+        with col4:
+            if "downtime_shifts" in result.figures:
+                col4.plotly_chart(viz.build_figure(result.figures["downtime_shifts"], lang_code), use_container_width=True)
+
+        if "insights" in result.notices:
+            render_notice(st_container, result.notices["insights"], _)
+        render_insights(st_container, result.insights, _)
+    else:
+        st_container.info(_("no_data_available"))
+    st_container.markdown("---")
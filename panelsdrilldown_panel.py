@@ -0,0 +1,110 @@
+# panels/drilldown_panel.py
+import streamlit as st
+import pandas as pd
+import config
+import visualizations as viz
+import drilldown_engine
+from panel_results import PanelResult, figure_spec
+from typing import Callable, Any, Optional, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Node tables come from drilldown_engine, which rolls every KPI source up its dimension hierarchy once per data
+# fingerprint and applies the sidebar filters to the leaves: no filtered DataFrame source is loaded for this panel.
+DATA_SOURCES: List[str] = []
+ENGINE_SOURCES = list(config.DRILLDOWN_METRICS)
+TITLE_KEY = "drilldown_title"
+
+METRIC_WIDGET_KEY = "drilldown_metric"
+LEVEL_WIDGET_KEY = "drilldown_level_{level}"
+FIGURES_STATE_KEY = "drilldown_figures" # Session state: (result, {slot: figure spec}) of the charts below the top level
+
+def _figure_slot(source_key: str, metric_key: str, path: List[str]) -> str:
+    return f"{source_key}/{metric_key}/" + "/".join(path)
+
+def _children_figure(df_children: pd.DataFrame, child_level: str, source_key: str, metric_key: str) -> Dict[str, Any]:
+    """Spec of the bar chart comparing the children of a node on one metric."""
+    label_key = config.DRILLDOWN_METRICS[source_key][metric_key][1]
+    return figure_spec("create_comparison_bar_chart", df=df_children, category_col=config.COLUMN_MAP[child_level],
+                       value_cols_map={label_key: config.COLUMN_MAP[metric_key]}, title_key="drilldown_chart_title",
+                       x_axis_title_key=f"{child_level}_label", y_axis_title_key=label_key)
+
+def _session_figure(result: PanelResult, slot: str, build_spec: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Figure spec of a chart below the top level, built once per session and result; the result is left as computed."""
+    cached_result, figures = st.session_state.get(FIGURES_STATE_KEY, (None, {}))
+    if cached_result is not result: # New filters or data: specs of the previous result no longer apply
+        figures = {}
+        st.session_state[FIGURES_STATE_KEY] = (result, figures)
+    if slot not in figures:
+        figures[slot] = build_spec()
+    return figures[slot]
+
+def compute(dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    """
+    Pure computation step: the node table of every KPI source (trend "nodes_<source>"), its overall KPIs and, per
+    metric, the chart of the top level (what the panel shows first, and what headless exports include).
+    """
+    result = PanelResult(panel_name="drilldown_panel", title_key=TITLE_KEY)
+    index = drilldown_engine.get_drilldown_index()
+    if index is None:
+        return result
+    for source_key, node_table in index.node_tables(filters).items():
+        root = node_table[node_table[drilldown_engine.DEPTH_COL] == 0]
+        root_values = {metric_key: root[config.COLUMN_MAP[metric_key]].iloc[0] for metric_key in index.hierarchies[source_key].metrics}
+        if all(pd.isna(value) for value in root_values.values()):
+            continue
+        result.has_data = True
+        result.trends[f"nodes_{source_key}"] = node_table
+        result.kpis.update({metric_key: None if pd.isna(value) else float(value) for metric_key, value in root_values.items()})
+        levels = drilldown_engine.node_levels(node_table)
+        df_top_level = drilldown_engine.children(node_table, []) if levels else pd.DataFrame()
+        for metric_key, value in root_values.items():
+            if not df_top_level.empty and pd.notna(value):
+                result.figures[_figure_slot(source_key, metric_key, [])] = _children_figure(df_top_level, levels[0], source_key, metric_key)
+    return result
+
+def _metric_options(result: PanelResult) -> List[tuple]:
+    """(source key, metric key) of every metric with a node table in the result, in config.DRILLDOWN_METRICS order."""
+    return [(source_key, metric_key) for source_key, metrics in config.DRILLDOWN_METRICS.items()
+            if f"nodes_{source_key}" in result.trends for metric_key in metrics
+            if config.COLUMN_MAP[metric_key] in result.trends[f"nodes_{source_key}"].columns]
+
+def render_result(st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    """Thin render step: one selector per hierarchy level; the chart shows the children of the deepest node chosen."""
+    st_container.header(_(result.title_key))
+    if not result.has_data:
+        st_container.info(_("no_data_available"))
+        st_container.markdown("---")
+        return
+
+    metric_options = _metric_options(result)
+    default_position = next((i for i, (_source, metric_key) in enumerate(metric_options) if metric_key == config.DRILLDOWN_DEFAULT_METRIC), 0)
+    source_key, metric_key = st_container.selectbox(_("drilldown_metric_label"), metric_options, index=default_position,
+                                                    format_func=lambda option: _(config.DRILLDOWN_METRICS[option[0]][option[1]][1]),
+                                                    key=METRIC_WIDGET_KEY)
+    node_table = result.trends[f"nodes_{source_key}"]
+    levels = drilldown_engine.node_levels(node_table)
+
+    # --- Path: each level offers the children of the node chosen above it ---
+    path: List[str] = []
+    for level_container, level in zip(st_container.columns(len(levels)) if levels else [], levels):
+        child_labels = drilldown_engine.children(node_table, path)[config.COLUMN_MAP[level]].tolist()
+        choice = level_container.selectbox(_(f"{level}_label"), [None] + child_labels,
+                                           format_func=lambda label: _("drilldown_all_option") if label is None else label,
+                                           key=LEVEL_WIDGET_KEY.format(level=level))
+        if choice is None:
+            break
+        path.append(choice)
+    st_container.caption(_("drilldown_path_caption").format(path=" › ".join([_("drilldown_all_option")] + path)))
+
+    # --- Children of the chosen node ---
+    df_children = drilldown_engine.children(node_table, path)
+    if df_children.empty:
+        st_container.info(_("drilldown_leaf_info"))
+    else:
+        slot = _figure_slot(source_key, metric_key, path)
+        spec = result.figures.get(slot) or _session_figure(
+            result, slot, lambda: _children_figure(df_children, levels[len(path)], source_key, metric_key))
+        st_container.plotly_chart(viz.build_figure(spec, lang_code), use_container_width=True)
+    st_container.markdown("---")
@@ -0,0 +1,72 @@
+# panels/drivers_panel.py
+import streamlit as st
+import pandas as pd
+import config
+import visualizations as viz
+import insights
+import drivers_engine
+from panel_results import PanelResult, figure_spec, notice, render_notice, render_insights
+from typing import Callable, Any, Optional, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Correlations come from drivers_engine, which aligns its own sources on shared dimensions and month and applies the
+# sidebar filters to those groups: no filtered DataFrame source is loaded for this panel.
+DATA_SOURCES: List[str] = []
+ENGINE_SOURCES = list(config.DRIVER_METRICS)
+TITLE_KEY = "drivers_title"
+
+LAG_WIDGET_KEY = "drivers_lag_months"
+
+def compute(dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    """Pure computation step: correlation matrix per lag and the strongest cross-source driver relations."""
+    result = PanelResult(panel_name="drivers_panel", title_key=TITLE_KEY)
+    analysis = drivers_engine.get_driver_analysis()
+    if analysis is None:
+        return result
+
+    # --- Correlation Heatmaps, one per lag (the widget in render_result picks one) ---
+    for lag in range(config.DRIVER_MAX_LAG_MONTHS + 1):
+        df_matrix = analysis.correlation_matrix(filters, lag)
+        if df_matrix.isna().all().all():
+            result.notices[f"drivers_lag_{lag}"] = notice("info", "no_data_drivers_lag")
+            continue
+        result.has_data = True
+        result.trends[f"correlation_lag_{lag}"] = df_matrix
+        result.figures[f"drivers_lag_{lag}"] = figure_spec("create_correlation_heatmap_themed", matrix_df=df_matrix, lag_months=lag)
+    if not result.has_data:
+        return result
+
+    # --- Driver Relations & Insights ---
+    df_drivers = analysis.top_drivers(filters, config.DRIVER_TOP_PAIRS)
+    result.trends["top_drivers"] = df_drivers
+    if not df_drivers.empty:
+        result.kpis["strongest_driver_correlation"] = float(df_drivers["correlation"].iloc[0])
+    try:
+        metric_labels = {metric_key: analysis.metric_label(metric_key) for metric_key in analysis.metrics}
+        result.insights = insights.generate_driver_insights(df_drivers, metric_labels)
+    except Exception as e:
+        logger.error(f"Error generating driver insights: {e}")
+        result.notices["insights"] = notice("warning", "error_generating_insights", detail=f": {e}")
+    return result
+
+def render_result(st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    """Thin render step: lays out a PanelResult produced by `compute`."""
+    st_container.header(_(result.title_key))
+
+    if result.has_data:
+        lag_options = list(range(config.DRIVER_MAX_LAG_MONTHS + 1))
+        lag = st_container.radio(_("drivers_lag_label"), lag_options, horizontal=True,
+                                 format_func=lambda months: _("drivers_lag_option").format(months=months), key=LAG_WIDGET_KEY)
+        if f"drivers_lag_{lag}" in result.figures:
+            st_container.plotly_chart(viz.build_figure(result.figures[f"drivers_lag_{lag}"], lang_code), use_container_width=True)
+        elif f"drivers_lag_{lag}" in result.notices:
+            render_notice(st_container, result.notices[f"drivers_lag_{lag}"], _)
+
+        if "insights" in result.notices:
+            render_notice(st_container, result.notices["insights"], _)
+        render_insights(st_container, result.insights, _)
+    else:
+        st_container.info(_("no_data_available"))
+    st_container.markdown("---")
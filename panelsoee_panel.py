@@ -0,0 +1,127 @@
+# panels/oee_panel.py
+import streamlit as st
+import pandas as pd
+import config
+import visualizations as viz
+import insights
+import downtime_engine
+import oee_engine
+from panel_results import PanelResult, figure_spec, notice, render_notice, render_insights
+from typing import Callable, Any, Optional, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Gauges and trends read the hour / shift / day / month buckets of oee_engine, which apply the sidebar filters to
+# their groups: the OEE source is not loaded as a filtered DataFrame source.
+DATA_SOURCES: List[str] = []
+ENGINE_SOURCES = ["oee", "downtime"] # Downtime backs availability where the OEE source has none
+TITLE_KEY = "oee_dashboard_title"
+
+OEE_COMPONENTS_CONFIG = [ # (metric of oee_engine.METRICS, card label key, gauge title key, legend label key)
+    ("availability", "oee_availability_card", "oee_availability_gauge", "oee_availability_label"),
+    ("performance", "oee_performance_card", "oee_performance_gauge", "oee_performance_label"),
+    ("quality", "oee_quality_card", "oee_quality_gauge", "oee_quality_label"),
+    ("overall", "oee_overall_card", "oee_overall_gauge", "oee_overall_label")
+]
+GRANULARITY_WIDGET_KEY = "oee_trend_granularity"
+
+def compute(dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    """Pure computation step: OEE component KPIs and one trend per granularity, from precomputed buckets."""
+    result = PanelResult(panel_name="oee_panel", title_key=TITLE_KEY)
+    rollups = oee_engine.get_oee_rollups()
+    if rollups is None:
+        return result
+    downtime_aggregates = downtime_engine.get_downtime_aggregates() # Availability fallback where the OEE source has none
+    oee_components = rollups.overall(filters, downtime_aggregates)
+    if all(value is None for value in oee_components.values()):
+        return result
+    result.has_data = True
+    # Previous values: the components as the day before the latest one ended (card deltas: the latest day's effect)
+    latest_day = rollups.latest_bucket(filters, "day")
+    previous_components = rollups.overall(filters, downtime_aggregates, before=latest_day) if latest_day is not None else {}
+
+    # --- Metric Cards & Gauges ---
+    for metric, card_key, gauge_key, _legend_key in OEE_COMPONENTS_CONFIG:
+        metric_value = oee_components[metric]
+        thresholds = config.OEE_THRESHOLDS.get(metric, {})
+        prev_value = previous_components.get(metric)
+        result.kpis[f"oee_{metric}"] = metric_value
+        if prev_value is not None:
+            result.previous_kpis[f"oee_{metric}"] = prev_value
+        result.cards[metric] = dict(
+            label_key=card_key,
+            value=metric_value,
+            unit="%",
+            higher_is_better=True,
+            target_value=thresholds.get("target"),
+            threshold_good=thresholds.get("good"),
+            threshold_warning=thresholds.get("warning"),
+            previous_value=prev_value,
+            help_text_key="oee_metric_help",
+            value_format_str=".1f"
+        )
+        result.figures[f"{metric}_gauge"] = figure_spec(
+            "create_kpi_gauge",
+            value=metric_value,
+            title_key=gauge_key,
+            unit="%",
+            higher_is_worse=False,
+            threshold_good=thresholds.get("good"),
+            threshold_warning=thresholds.get("warning"),
+            target_line_value=thresholds.get("target"),
+            previous_value=prev_value,
+            max_value_override=100.0,
+            value_format_str=".1f"
+        )
+
+    # --- Trends, one per granularity (the widget in render_result picks one) ---
+    oee_metrics_map = {legend_key: metric for metric, _card_key, _gauge_key, legend_key in OEE_COMPONENTS_CONFIG}
+    for granularity in oee_engine.GRANULARITIES:
+        df_rollup = rollups.rollup(filters, granularity, downtime_aggregates).tail(config.OEE_TREND_MAX_POINTS)
+        if df_rollup.empty:
+            result.notices[f"oee_trend_{granularity}"] = notice("info", "no_data_for_trend")
+            continue
+        result.trends[f"oee_{granularity}"] = df_rollup
+        result.figures[f"oee_trend_{granularity}"] = figure_spec(
+            "create_oee_trends_themed",
+            df=df_rollup,
+            date_col=rollups.date_col,
+            oee_metrics_map=oee_metrics_map,
+            target_value=config.OEE_THRESHOLDS["overall"].get("target"),
+            intraday=granularity in ("hour", "shift")
+        )
+
+    # --- Actionable Insights ---
+    try:
+        result.insights = insights.generate_oee_insights(pd.DataFrame(), oee_components)
+    except Exception as e:
+        logger.error(f"Error generating OEE insights: {e}")
+        result.notices["insights"] = notice("warning", "error_generating_insights", detail=f": {e}")
+    return result
+
+def render_result(st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    """Thin render step: lays out a PanelResult produced by `compute`."""
+    st_container.header(_(result.title_key))
+
+    if result.has_data:
+        component_cols = st_container.columns(len(OEE_COMPONENTS_CONFIG))
+        for component_col, (metric, _card_key, _gauge_key, _legend_key) in zip(component_cols, OEE_COMPONENTS_CONFIG):
+            with component_col:
+                viz.display_metric_card(component_col, lang_code=lang_code, **result.cards[metric])
+                component_col.plotly_chart(viz.build_figure(result.figures[f"{metric}_gauge"], lang_code), use_container_width=True)
+
+        granularity = st_container.radio(_("oee_granularity_label"), oee_engine.GRANULARITIES, horizontal=True,
+                                         index=oee_engine.GRANULARITIES.index(config.OEE_DEFAULT_GRANULARITY),
+                                         format_func=lambda option: _(f"granularity_{option}"), key=GRANULARITY_WIDGET_KEY)
+        if f"oee_trend_{granularity}" in result.figures:
+            st_container.plotly_chart(viz.build_figure(result.figures[f"oee_trend_{granularity}"], lang_code), use_container_width=True)
+        elif f"oee_trend_{granularity}" in result.notices:
+            render_notice(st_container, result.notices[f"oee_trend_{granularity}"], _)
+
+        if "insights" in result.notices:
+            render_notice(st_container, result.notices["insights"], _)
+        render_insights(st_container, result.insights, _)
+    else:
+        st_container.info(_("no_data_available"))
+    st_container.markdown("---")
@@ -0,0 +1,53 @@
+# panels/plant_map_panel.py
+import streamlit as st
+import pandas as pd
+import config
+import visualizations as viz
+import downtime_engine
+import plant_map
+from panel_results import PanelResult, figure_spec
+from typing import Callable, Any, Optional, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Occupancy and incidents come from the filtered spatial and safety frames; downtime from the running aggregates of
+# downtime_engine (the event log is not loaded as a DataFrame source), grouped by work area.
+DATA_SOURCES = ["spatial", "safety"]
+ENGINE_SOURCES = ["downtime"]
+TITLE_KEY = "plant_map_title"
+
+KPI_WIDGET_KEY = "plant_map_kpi"
+
+def compute(dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    """Pure computation step: per-area KPIs (trend "areas") and one plant map figure per KPI with any value."""
+    result = PanelResult(panel_name="plant_map_panel", title_key=TITLE_KEY)
+    geometry = plant_map.get_facility_geometry()
+    if not geometry.area_names:
+        return result
+    aggregates = downtime_engine.get_downtime_aggregates()
+    df_areas = plant_map.area_kpis(geometry, dataframes.get("spatial", pd.DataFrame()), dataframes.get("safety", pd.DataFrame()),
+                                   aggregates.area_totals(filters) if aggregates is not None else None)
+    result.trends["areas"] = df_areas
+    for kpi_key, (label_key, colorscale) in config.PLANT_MAP_KPIS.items():
+        if df_areas[kpi_key].isna().all():
+            continue
+        result.has_data = True
+        result.kpis[kpi_key] = float(df_areas[kpi_key].sum())
+        result.figures[kpi_key] = figure_spec("create_plant_map_themed", area_df=df_areas, value_col=kpi_key,
+                                              facility_config_dict=config.FACILITY_CONFIG, value_label_key=label_key, colorscale=colorscale)
+    return result
+
+def render_result(st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    """Thin render step: the KPI to draw on the layout, then its plant map."""
+    st_container.header(_(result.title_key))
+    if not result.has_data:
+        st_container.info(_("no_data_available"))
+        st_container.markdown("---")
+        return
+
+    kpi_options = [kpi_key for kpi_key in config.PLANT_MAP_KPIS if kpi_key in result.figures]
+    kpi_key = st_container.radio(_("plant_map_kpi_label"), kpi_options, horizontal=True,
+                                 format_func=lambda key: _(config.PLANT_MAP_KPIS[key][0]), key=KPI_WIDGET_KEY)
+    st_container.plotly_chart(viz.build_figure(result.figures[kpi_key], lang_code), use_container_width=True)
+    st_container.markdown("---")
@@ -0,0 +1,96 @@
+# panels/scenario_panel.py
+import streamlit as st
+import pandas as pd
+import config
+import visualizations as viz
+import scenario_engine
+from panel_results import PanelResult, figure_spec, notice, render_notice
+from typing import Callable, Any, Optional, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Models and site baselines come from scenario_engine, which fits them on the driver analysis cube of its sources and
+# applies the sidebar filters to its groups: no filtered DataFrame source is loaded for this panel.
+DATA_SOURCES: List[str] = []
+ENGINE_SOURCES = list(config.SCENARIO_METRICS)
+TITLE_KEY = "scenario_title"
+
+CHANGE_WIDGET_KEY = "scenario_change_{driver}"
+OUTCOME_WIDGET_KEY = "scenario_outcome"
+
+def _sites_figure(df_sites: pd.DataFrame, outcome_key: str, value_cols_map: Dict[str, str]) -> Dict[str, Any]:
+    """Spec of the bar chart comparing the sites on one outcome (value_cols_map: label key -> column)."""
+    return figure_spec("create_comparison_bar_chart", df=df_sites[df_sites[outcome_key].notna()], # Sites of other sources have no baseline for it
+                       category_col=config.COLUMN_MAP["site"], value_cols_map=value_cols_map, title_key="scenario_chart_title",
+                       x_axis_title_key="site_label", y_axis_title_key=config.SCENARIO_OUTCOMES[outcome_key][0])
+
+def compute(dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    """
+    Pure computation step: fitted coefficients, site baselines, baseline KPIs (mean over the sites) and the baseline
+    chart of each outcome (figure "baseline_<outcome>", for headless exports; the panel charts the projection).
+    """
+    result = PanelResult(panel_name="scenario_panel", title_key=TITLE_KEY)
+    model = scenario_engine.get_scenario_model()
+    if model is None:
+        return result
+    df_baseline = model.baseline(filters)
+    if df_baseline.empty:
+        return result
+    result.has_data = True
+    if model.coefficients.empty:
+        result.notices["model"] = notice("info", "scenario_no_model")
+        return result
+    result.trends["baseline"] = df_baseline
+    result.trends["coefficients"] = model.coefficients
+    for outcome_key in model.coefficients.index:
+        baseline_value = df_baseline[outcome_key].mean()
+        result.kpis[outcome_key] = None if pd.isna(baseline_value) else float(baseline_value)
+        if pd.notna(baseline_value):
+            result.figures[f"baseline_{outcome_key}"] = _sites_figure(df_baseline, outcome_key, {"scenario_baseline_label": outcome_key})
+    return result
+
+def render_result(st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    """Thin render step: driver sliders, then the projection of the cached baselines (only the change is computed)."""
+    st_container.header(_(result.title_key))
+    if not result.has_data:
+        st_container.info(_("no_data_available"))
+        st_container.markdown("---")
+        return
+    if "model" in result.notices:
+        render_notice(st_container, result.notices["model"], _)
+        st_container.markdown("---")
+        return
+
+    df_baseline, df_coefficients = result.trends["baseline"], result.trends["coefficients"]
+    drivers = [key for key in config.SCENARIO_DRIVERS if key in df_coefficients.columns
+               and (df_coefficients[key] != 0).any() and df_baseline[key].notna().any()]
+    st_container.markdown(_("scenario_drivers_label"))
+    changes_pct: Dict[str, float] = {}
+    for driver_container, driver_key in zip(st_container.columns(len(drivers)) if drivers else [], drivers):
+        changes_pct[driver_key] = driver_container.slider(
+            _(config.SCENARIO_DRIVERS[driver_key]), *config.SCENARIO_CHANGE_RANGE_PCT, value=0,
+            step=config.SCENARIO_CHANGE_STEP_PCT, format="%d%%", key=CHANGE_WIDGET_KEY.format(driver=driver_key))
+    df_projection = scenario_engine.project(df_baseline, df_coefficients, changes_pct)
+
+    # --- Outcome KPIs: mean over the sites, baseline -> projected ---
+    outcomes = list(df_coefficients.index)
+    for outcome_container, outcome_key in zip(st_container.columns(len(outcomes)), outcomes):
+        label_key, higher_is_better = config.SCENARIO_OUTCOMES[outcome_key]
+        baseline_value = df_projection[outcome_key].mean()
+        projected_value = df_projection[f"{outcome_key}{scenario_engine.PROJECTED_SUFFIX}"].mean()
+        outcome_container.metric(_(label_key), "N/A" if pd.isna(projected_value) else f"{projected_value:.2f}",
+                                 delta=None if pd.isna(projected_value - baseline_value) else f"{projected_value - baseline_value:+.2f}",
+                                 delta_color="normal" if higher_is_better else "inverse")
+
+    # --- Baseline vs. projection per site, for one outcome ---
+    outcome_key = st_container.radio(_("scenario_outcome_label"), outcomes, horizontal=True,
+                                     format_func=lambda key: _(config.SCENARIO_OUTCOMES[key][0]), key=OUTCOME_WIDGET_KEY)
+    label_key = config.SCENARIO_OUTCOMES[outcome_key][0]
+    st_container.plotly_chart(viz.build_figure(_sites_figure(df_projection, outcome_key, {
+        "scenario_baseline_label": outcome_key, "scenario_projected_label": f"{outcome_key}{scenario_engine.PROJECTED_SUFFIX}"}), lang_code),
+        use_container_width=True)
+    model_row = df_coefficients.loc[outcome_key]
+    st_container.caption(_("scenario_model_caption").format(outcome=_(label_key), observations=int(model_row["observations"]),
+                                                            r_squared=model_row["r_squared"]))
+    st_container.markdown("---")
@@ -4,123 +4,165 @@ import pandas as pd
 import config
 import visualizations as viz
 import insights
-from utils import get_dummy_prev_val
-from typing import Callable, Any, Optional
+import retention_tiers
+import schema_registry
+from panel_results import PanelResult, figure_spec, notice, render_notice, render_insights
+from utils import get_dummy_prev_val, monthly_aggregate
+from typing import Callable, Any, Optional, Dict, List
 import logging
 
 logger = logging.getLogger(__name__)
 
-def render(st_container: Any, df_tasks_filtered: pd.DataFrame, lang_code: str, _: Callable[[str, Optional[str]], str]):
-    st_container.header(_("task_compliance_title"))
+DATA_SOURCES = ["tasks"] # DATA_SOURCE_MAP keys this panel needs (see panel_registry.py)
+TITLE_KEY = "task_compliance_title"
+
+def _assemble_result(result: PanelResult, avg_compliance: Optional[float], monthly_compliance_series: Optional[pd.Series],
+                     df_for_insights: pd.DataFrame) -> PanelResult:
+    """Fills cards, figure specs and insights from the aggregated values (shared by the pandas and SQL paths)."""
+    # --- Metric Card & Gauge ---
+    prev_compliance = get_dummy_prev_val(avg_compliance, 0.05, True) if avg_compliance is not None else None
+    result.kpis["task_compliance_rate"] = avg_compliance # No previous period yet: the dummy value is for the card only
+
+    result.cards["task_compliance_rate"] = dict(
+        label_key="task_compliance_rate_metric_card",
+        value=avg_compliance,
+        unit="%",
+        higher_is_better=True,
+        target_value=config.TASK_COMPLIANCE.get("target"),
+        threshold_good=config.TASK_COMPLIANCE.get("good"),
+        threshold_warning=config.TASK_COMPLIANCE.get("warning"),
+        previous_value=prev_compliance,
+        help_text_key="task_compliance_help",
+        value_format_str=".1f"
+    )
+    result.figures["task_compliance_gauge"] = figure_spec(
+        "create_kpi_gauge",
+        value=avg_compliance,
+        title_key="task_compliance_rate_gauge",
+        unit="%",
+        higher_is_worse=False,
+        threshold_good=config.TASK_COMPLIANCE.get("good"),
+        threshold_warning=config.TASK_COMPLIANCE.get("warning"),
+        target_line_value=config.TASK_COMPLIANCE.get("target"),
+        previous_value=prev_compliance,
+        max_value_override=100.0, # Compliance is typically 0-100%
+        value_format_str=".1f"
+    )
+
+    # --- Trend Chart ---
+    if monthly_compliance_series is not None and not monthly_compliance_series.empty:
+        result.trends["monthly_compliance"] = monthly_compliance_series
+        result.figures["task_compliance_trend"] = figure_spec(
+            "create_task_compliance_trend_themed",
+            data_series=monthly_compliance_series,
+            date_index=monthly_compliance_series.index
+            # Optional: forecast_series, disruption_points_dates can be passed if available
+        )
+    elif monthly_compliance_series is not None and "task_compliance_trend" not in result.notices:
+        result.notices["task_compliance_trend"] = notice("info", "no_data_for_trend", detail=" (Post-resampling).")
+
+    # --- Actionable Insights ---
+    try:
+        result.insights = insights.generate_task_compliance_insights(
+            df_for_insights,
+            avg_compliance,
+            monthly_compliance_series # Pass the resampled Series
+        )
+    except Exception as e:
+        logger.error(f"Error generating task compliance insights: {e}")
+        result.notices["insights"] = notice("warning", "error_generating_insights", detail=f": {e}") # Add this key
+    return result
+
+def _missing_trend_notice(missing_cols: List[str]) -> Dict[str, Any]:
+    return notice("warning", "no_data_task_compliance", detail=(f" Missing: {', '.join(missing_cols)}" if missing_cols else ""))
+
+def compute(dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    """Pure computation step: KPIs, monthly trend and figure specs. No Streamlit calls."""
+    result = PanelResult(panel_name="task_compliance_panel", title_key=TITLE_KEY)
+    df_tasks_filtered = dataframes.get("tasks", pd.DataFrame())
+    if df_tasks_filtered.empty:
+        return result
+    result.has_data = True
 
     avg_compliance: Optional[float] = None # Initialize for broader scope
-    trend_data_for_insights: Optional[pd.Series] = None # Initialize
+    monthly_compliance_series: Optional[pd.Series] = None # Initialize
 
-    if not df_tasks_filtered.empty:
-        col1, col2 = st_container.columns([1, 2]) # Layout: 1/3 for gauge, 2/3 for trend
+    task_compliance_col_actual = config.COLUMN_MAP.get("task_compliance_rate")
+    task_date_col_actual = config.COLUMN_MAP.get("task_date")
+    missing_cols = schema_registry.missing_columns("tasks", ["task_date", "task_compliance_rate"], df_tasks_filtered) # Logged once at ingest
+    if "task_compliance_rate" not in missing_cols:
+        avg_compliance = retention_tiers.aggregate_column(df_tasks_filtered, task_compliance_col_actual, "mean") # Weighted over tiers
+
+    if not missing_cols and df_tasks_filtered[task_compliance_col_actual].notna().any():
+
+        # Monthly average for a cleaner trend for create_task_compliance_trend_themed, aggregated straight
+        # from the shared (read-only) filtered frame
+        try:
+            df_monthly = monthly_aggregate(df_tasks_filtered, task_date_col_actual, {
+                task_compliance_col_actual: (task_compliance_col_actual, 'mean')
+            })
+            if not df_monthly.empty:
+                monthly_compliance_series = df_monthly.set_index(task_date_col_actual)[task_compliance_col_actual]
+            else:
+                result.notices["task_compliance_trend"] = notice("info", "no_data_for_trend", detail=" (After NA drop).")
+        except Exception as e:
+            logger.error(f"Error preparing task compliance trend: {e}")
+            result.notices["task_compliance_trend"] = notice("warning", "error_processing_trend_data", detail=f": {e}") # Add this key to TEXT_STRINGS
+    else:
+        result.notices["task_compliance_trend"] = _missing_trend_notice(missing_cols)
 
-        # --- Metric Card & Gauge ---
-        task_compliance_col_actual = config.COLUMN_MAP.get("task_compliance_rate")
-        
-        if task_compliance_col_actual and task_compliance_col_actual in df_tasks_filtered.columns:
-            avg_compliance = df_tasks_filtered[task_compliance_col_actual].mean()
+    return _assemble_result(result, avg_compliance, monthly_compliance_series, df_tasks_filtered)
+
+def compute_sql(backend: Any, filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    """Same as `compute`, but filters and aggregations run in the embedded query backend (query_backend.SqlQueryBackend)."""
+    result = PanelResult(panel_name="task_compliance_panel", title_key=TITLE_KEY)
+    if backend.row_count("tasks", filters) == 0:
+        return result
+    result.has_data = True
+
+    task_compliance_col_actual = config.COLUMN_MAP.get("task_compliance_rate")
+    task_date_col_actual = config.COLUMN_MAP.get("task_date")
+    df_kpis = backend.aggregate("tasks", filters, {"avg_compliance": (task_compliance_col_actual, "avg")})
+    avg_compliance = float(df_kpis["avg_compliance"].iloc[0]) if "avg_compliance" in df_kpis.columns and pd.notna(df_kpis["avg_compliance"].iloc[0]) else None
+
+    monthly_compliance_series: Optional[pd.Series] = None
+    if task_date_col_actual in backend.columns("tasks") and avg_compliance is not None:
+        df_monthly = backend.aggregate("tasks", filters, {"monthly_avg": (task_compliance_col_actual, "avg")},
+                                       monthly_date_col=task_date_col_actual)
+        if not df_monthly.empty: # Fill empty months with NaN like resample('M') does
+            monthly_compliance_series = df_monthly.set_index(task_date_col_actual)["monthly_avg"].resample('M').mean().rename(task_compliance_col_actual)
         else:
-            logger.warning(f"Task compliance column '{task_compliance_col_actual}' not found.")
-            avg_compliance = None # Explicitly None if col missing
+            result.notices["task_compliance_trend"] = notice("info", "no_data_for_trend", detail=" (After NA drop).")
+    else:
+        available_cols = backend.columns("tasks")
+        result.notices["task_compliance_trend"] = _missing_trend_notice(
+            [key for key in ("task_date", "task_compliance_rate") if config.COLUMN_MAP.get(key) not in available_cols])
 
-        prev_compliance = get_dummy_prev_val(avg_compliance, 0.05, True) if avg_compliance is not None else None
+    return _assemble_result(result, avg_compliance, monthly_compliance_series, pd.DataFrame())
+
+def render_result(st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    """Thin render step: lays out a PanelResult produced by `compute`."""
+    st_container.header(_(result.title_key))
+
+    if result.has_data:
+        col1, col2 = st_container.columns([1, 2]) # Layout: 1/3 for gauge, 2/3 for trend
 
         with col1:
-            viz.display_metric_card(
-                col1, # Pass the specific column container
-                label_key="task_compliance_rate_metric_card",
-                value=avg_compliance,
-                lang_code=lang_code,
-                unit="%",
-                higher_is_better=True,
-                target_value=config.TASK_COMPLIANCE.get("target"),
-                threshold_good=config.TASK_COMPLIANCE.get("good"),
-                threshold_warning=config.TASK_COMPLIANCE.get("warning"),
-                previous_value=prev_compliance,
-                help_text_key="task_compliance_help",
-                value_format_str=".1f"
-            )
-            col1.plotly_chart(viz.create_kpi_gauge(
-                value=avg_compliance,
-                title_key="task_compliance_rate_gauge",
-                lang_code=lang_code,
-                unit="%",
-                higher_is_worse=False,
-                threshold_good=config.TASK_COMPLIANCE.get("good"),
-                threshold_warning=config.TASK_COMPLIANCE.get("warning"),
-                target_line_value=config.TASK_COMPLIANCE.get("target"),
-                previous_value=prev_compliance,
-                max_value_override=100.0, # Compliance is typically 0-100%
-                value_format_str=".1f"
-            ), use_container_width=True)
-
-        # --- Trend Chart ---
+            viz.display_metric_card(col1, lang_code=lang_code, **result.cards["task_compliance_rate"])
+            col1.plotly_chart(viz.build_figure(result.figures["task_compliance_gauge"], lang_code), use_container_width=True)
+
         with col2:
-            task_date_col_actual = config.COLUMN_MAP.get("task_date")
-            if task_date_col_actual and task_compliance_col_actual and \
-               all(c in df_tasks_filtered.columns for c in [task_date_col_actual, task_compliance_col_actual]) and \
-               df_tasks_filtered[task_compliance_col_actual].notna().any():
-                
-                tasks_trend_df_prep = df_tasks_filtered[[task_date_col_actual, task_compliance_col_actual]].copy()
-                if not pd.api.types.is_datetime64_any_dtype(tasks_trend_df_prep[task_date_col_actual]):
-                    try:
-                        tasks_trend_df_prep[task_date_col_actual] = pd.to_datetime(tasks_trend_df_prep[task_date_col_actual], errors='coerce')
-                    except Exception as e:
-                        logger.error(f"Error converting date column for task compliance trend: {e}")
-                        tasks_trend_df_prep[task_date_col_actual] = pd.NaT
-                
-                tasks_trend_df_prep.dropna(subset=[task_date_col_actual, task_compliance_col_actual], inplace=True)
-                tasks_trend_df_prep.sort_values(by=task_date_col_actual, inplace=True)
-
-                if not tasks_trend_df_prep.empty:
-                    # Resample to monthly average for a cleaner trend for create_task_compliance_trend_themed
-                    # This assumes create_task_compliance_trend_themed is adapted from your plot_task_compliance_score
-                    try:
-                        monthly_compliance_series = tasks_trend_df_prep.set_index(task_date_col_actual)[task_compliance_col_actual].resample('M').mean()
-                        trend_data_for_insights = monthly_compliance_series # For insights
-
-                        if not monthly_compliance_series.empty:
-                             # Ensure you have `create_task_compliance_trend_themed` in `visualizations.py`
-                            fig_trend = viz.create_task_compliance_trend_themed(
-                                data_series=monthly_compliance_series,
-                                date_index=monthly_compliance_series.index,
-                                lang_code=lang_code
-                                # Optional: forecast_series, disruption_points_dates can be passed if available
-                            )
-                            col2.plotly_chart(fig_trend, use_container_width=True)
-                        else:
-                            col2.info(_("no_data_for_trend") + f" (Post-resampling).")
-                    except Exception as e:
-                        logger.error(f"Error preparing or plotting task compliance trend: {e}")
-                        col2.warning(_("error_processing_trend_data", error_message=str(e))) # Add this key to TEXT_STRINGS
-                else:
-                    col2.info(_("no_data_for_trend") + f" (After NA drop).")
-            else:
-                missing_cols = [col_key for col_key, actual_col in [("task_date",task_date_col_actual), ("task_compliance_rate",task_compliance_col_actual)] if not (actual_col and actual_col in df_tasks_filtered.columns)]
-                col2.warning(_("no_data_task_compliance") + (f" Missing: {', '.join(missing_cols)}" if missing_cols else ""))
-        
-        # --- Actionable Insights ---
-        try:
-            action_insights = insights.generate_task_compliance_insights(
-                df_tasks_filtered,
-                avg_compliance,
-                trend_data_for_insights, # Pass the resampled Series
-                lang_code
-            )
-            if action_insights:
-                st_container.markdown("---") # Use st_container for insights section
-                st_container.subheader(_("actionable_insights_title"))
-                for insight_item in action_insights:
-                    st_container.markdown(f"💡 {insight_item}")
-        except Exception as e:
-            logger.error(f"Error generating task compliance insights: {e}")
-            st_container.warning(_("error_generating_insights", error_message=str(e))) # Add this key
+            if "task_compliance_trend" in result.figures:
+                col2.plotly_chart(viz.build_figure(result.figures["task_compliance_trend"], lang_code), use_container_width=True)
+            elif "task_compliance_trend" in result.notices:
+                render_notice(col2, result.notices["task_compliance_trend"], _)
 
+        if "insights" in result.notices:
+            render_notice(st_container, result.notices["insights"], _)
+        render_insights(st_container, result.insights, _)
     else:
         st_container.info(_("no_data_available"))
-    st_container.markdown("---")
\ No newline at end of file
+    st_container.markdown("---")
+
+def render(st_container: Any, df_tasks_filtered: pd.DataFrame, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    render_result(st_container, compute({"tasks": df_tasks_filtered}, {}, lang_code), lang_code, _)
@@ -4,136 +4,147 @@ import pandas as pd
 import config
 import visualizations as viz
 import insights
-from utils import get_dummy_prev_val # Optional, if used
+import schema_registry
+from panel_results import PanelResult, figure_spec, notice, render_notice, render_insights
+from utils import get_dummy_prev_val, monthly_aggregate # Optional, if used
 from typing import Callable, Any, Optional, List, Dict # Add relevant types
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Adjust the signature based on what this specific panel needs
-# For example, engagement_panel might need df_engagement_filtered AND df_psych_safety_filtered
-def render(st_container: Any,
-           df_panel_main_filtered: pd.DataFrame, # Primary DataFrame for this panel
-           # ... add other specific DataFrames if this panel uses multiple sources ...
-           # e.g. df_auxiliary_filtered: pd.DataFrame,
-           # For downtime_panel, it also receives `selected_shifts_list: List[str]`
-           lang_code: str,
-           _: Callable[[str, Optional[str]], str]):
+# Every panel declares its data sources and is split in two steps:
+#   compute(dataframes, filters, lang_code) -> PanelResult   (pure pandas, no Streamlit calls)
+#   render_result(st_container, result, lang_code, _)        (thin layout of the PanelResult)
+# `dataframes` holds the DATA_SOURCES below, keyed by the DATA_SOURCE_MAP keys of pages/dashboard_page.py.
+# `filters` are the sidebar selections, for panels that need them as context (e.g. downtime_panel uses filters["shift"]).
+# Add the panel name to panel_registry.PANEL_ORDER to place it on the dashboard.
+
+DATA_SOURCES = ["your_data_source_key"] # e.g. ["engagement", "psych_safety"]; shared sources are loaded once
+TITLE_KEY = "your_panel_localization_title_key" # e.g., "safety_pulse_title"
+
+def compute(dataframes: Dict[str, pd.DataFrame], filters: Dict[str, List[str]], lang_code: str) -> PanelResult:
+    panel_title_key = TITLE_KEY
+    result = PanelResult(panel_name="your_panel_name_panel", title_key=panel_title_key)
+
+    df_panel_main_filtered = dataframes.get("your_data_source_key", pd.DataFrame()) # Primary DataFrame for this panel
+    # ... add other specific DataFrames if this panel uses multiple sources ...
+    # e.g. df_auxiliary_filtered = dataframes.get("psych_safety", pd.DataFrame())
+    if df_panel_main_filtered.empty:
+        return result
+    result.has_data = True
+
+    # --- METRIC 1 (Example) ---
+    # Columns were mapped to their COLUMN_MAP headers and validated at ingest (schema_registry.py, with the source's
+    # entry in config.SOURCE_SCHEMAS): ask the registry which are missing instead of probing and logging per render.
+    # metric1_actual_col = config.COLUMN_MAP.get("your_metric1_conceptual_key")
+    # metric1_value: Optional[float] = None
+    # if not schema_registry.missing_columns("your_data_source_key", ["your_metric1_conceptual_key"], df_panel_main_filtered):
+    #     metric1_value = df_panel_main_filtered[metric1_actual_col].mean() # or .sum(), .max() etc.
+    #
+    # prev_metric1 = get_dummy_prev_val(metric1_value, ...)
+    # result.kpis["your_metric1"] = metric1_value
+    # result.previous_kpis["your_metric1"] = ... # Only a real previous-period value (the API and exports publish it)
+    #
+    # result.cards["your_metric1"] = dict( # viz.display_metric_card kwargs, without container and lang_code
+    #     label_key="your_metric1_card_label_key",
+    #     value=metric1_value,
+    #     # ... other card params ...
+    # )
+    # result.figures["your_metric1_gauge"] = figure_spec( # viz.create_kpi_gauge kwargs, without lang_code
+    #     "create_kpi_gauge",
+    #     value=metric1_value,
+    #     title_key="your_metric1_gauge_title_key",
+    #     # ... other gauge params from config ...
+    # )
+
+
+    # --- CHART 1 (Example: Trend) ---
+    # date_col = config.COLUMN_MAP.get("date") # or a specific date column for this panel
+    # value_col_for_trend = config.COLUMN_MAP.get("your_trend_value_col_key")
+    #
+    # if not schema_registry.missing_columns("your_data_source_key", ["date", "your_trend_value_col_key"], df_panel_main_filtered) and \
+    #    df_panel_main_filtered[value_col_for_trend].notna().any():
+    #
+    #    # Filtered frames are shared between views: never modify them in place or copy them for a subset,
+    #    # aggregate straight from them (utils.monthly_aggregate handles date conversion and empty months)
+    #    agg_trend_df = monthly_aggregate(df_panel_main_filtered, date_col, {
+    #        "AggValue": (value_col_for_trend, 'mean') # Or 'sum', etc.
+    #    })
+    #
+    #    if not agg_trend_df.empty:
+    #        result.trends["your_trend"] = agg_trend_df # Also used for insights
+    #
+    #        map_for_trend = {"your_trend_trace_label_key": "AggValue"}
+    #        # Generic create_trend_chart or YOUR SPECIFIC THEMED TREND CHART
+    #        result.figures["your_trend_chart"] = figure_spec(
+    #             "create_trend_chart",
+    #             df=agg_trend_df, date_col=date_col, value_cols_map=map_for_trend,
+    #             title_key="your_chart_title_key",
+    #             y_axis_title_key="your_y_axis_key", x_axis_title_key="month_axis_label"
+    #        )
+    #    else:
+    #        result.notices["your_trend_chart"] = notice("info", "no_data_for_trend", detail=" (Post-processing).")
+    # else:
+    #    result.notices["your_trend_chart"] = notice("warning", "no_data_for_trend_required_cols_missing") # Add this key
+
 
-    panel_title_key = "your_panel_localization_title_key" # e.g., "safety_pulse_title"
-    st_container.header(_(panel_title_key))
+    # --- SPECIFIC PLOT EXAMPLE (e.g., Downtime Pie) in downtime_panel.py ---
+    # cause_col = config.COLUMN_MAP.get("downtime_cause")
+    # duration_col = config.COLUMN_MAP.get("downtime_duration")
+    # if cause_col and duration_col and all(c in df_panel_main_filtered.columns for c in [cause_col, duration_col]):
+    #     result.figures["downtime_cause_pie"] = figure_spec(
+    #         "create_downtime_causes_pie_themed",
+    #         downtime_events_df=df_panel_main_filtered,
+    #         cause_col=cause_col,
+    #         duration_col=duration_col
+    #     )
+    # else:
+    #     result.notices["downtime_cause_pie"] = notice("warning", "no_data_downtime_cause")
 
-    # Initialize variables for insights if they are calculated here
-    # insight_metric1: Optional[float] = None
-    # insight_trend_df: pd.DataFrame = pd.DataFrame()
 
-    if not df_panel_main_filtered.empty:
+    # --- Actionable Insights ---
+    # try:
+    #     result.insights = insights.generate_your_panel_insights(
+    #         df_panel_main_filtered,
+    #         result.kpis.get("your_metric1"),
+    #         result.trends.get("your_trend", pd.DataFrame()),
+    #         # ... other necessary data for this panel's insights (no lang_code: insights stay localization keys) ...
+    #     )
+    # except Exception as e:
+    #     logger.error(f"Error generating insights for {panel_title_key}: {e}")
+    #     result.notices["insights"] = notice("warning", "error_generating_insights", detail=f": {e}")
+
+    return result
+
+def render_result(st_container: Any, result: PanelResult, lang_code: str, _: Callable[[str, Optional[str]], str]):
+    st_container.header(_(result.title_key))
+
+    if result.has_data:
         # --- LAYOUT COLUMNS (Adjust as needed) ---
         # col_kpi1, col_kpi2, col_chart1 = st_container.columns([1, 1, 2])
 
-        # --- METRIC 1 (Example) ---
         # with col_kpi1:
-        #     metric1_actual_col = config.COLUMN_MAP.get("your_metric1_conceptual_key")
-        #     metric1_value: Optional[float] = None
-        #     if metric1_actual_col and metric1_actual_col in df_panel_main_filtered.columns:
-        #         metric1_value = df_panel_main_filtered[metric1_actual_col].mean() # or .sum(), .max() etc.
-        #     else:
-        #         logger.warning(f"Column for metric1 '{metric1_actual_col}' not found.")
-            
-        #     prev_metric1 = get_dummy_prev_val(metric1_value, ...)
-
-        #     viz.display_metric_card(
-        #         col_kpi1,
-        #         label_key="your_metric1_card_label_key",
-        #         value=metric1_value,
-        #         lang_code=lang_code,
-        #         # ... other card params ...
-        #     )
-        #     col_kpi1.plotly_chart(viz.create_kpi_gauge(
-        #         value=metric1_value,
-        #         title_key="your_metric1_gauge_title_key",
-        #         lang_code=lang_code,
-        #         # ... other gauge params from config ...
-        #     ), use_container_width=True)
-        #     insight_metric1 = metric1_value # Store for insights
-
-
-        # --- CHART 1 (Example: Trend) ---
+        #     viz.display_metric_card(col_kpi1, lang_code=lang_code, **result.cards["your_metric1"])
+        #     col_kpi1.plotly_chart(viz.build_figure(result.figures["your_metric1_gauge"], lang_code), use_container_width=True)
+
         # with col_chart1:
-        #     date_col = config.COLUMN_MAP.get("date") # or a specific date column for this panel
-        #     value_col_for_trend = config.COLUMN_MAP.get("your_trend_value_col_key")
-        #
-        #     if date_col and value_col_for_trend and \
-        #        all(c in df_panel_main_filtered.columns for c in [date_col, value_col_for_trend]) and \
-        #        df_panel_main_filtered[value_col_for_trend].notna().any():
-        #
-        #        trend_df_prep = df_panel_main_filtered[[date_col, value_col_for_trend]].copy()
-        #        # Date conversion, NA drop, sort (as in stability_panel.py)
-        #        # ...
-        #
-        #        if not trend_df_prep.empty:
-        #            agg_trend_df = trend_df_prep.groupby(pd.Grouper(key=date_col, freq='M')).agg(
-        #                AggValue=(value_col_for_trend, 'mean') # Or 'sum', etc.
-        #            ).reset_index()
-        #            insight_trend_df = agg_trend_df # For insights
-        #
-        #            map_for_trend = {"your_trend_trace_label_key": "AggValue"}
-        #            # Call generic create_trend_chart or YOUR SPECIFIC THEMED TREND CHART
-        #            col_chart1.plotly_chart(viz.create_trend_chart(
-        #                 df=agg_trend_df, date_col=date_col, value_cols_map=map_for_trend,
-        #                 title_key="your_chart_title_key", lang_code=lang_code,
-        #                 y_axis_title_key="your_y_axis_key", x_axis_title_key="month_axis_label"
-        #            ), use_container_width=True)
-        #        else:
-        #            col_chart1.info(_("no_data_for_trend") + " (Post-processing).")
-        #     else:
-        #        col_chart1.warning(_("no_data_for_trend_required_cols_missing")) # Add this key
-
-
-        # --- SPECIFIC PLOT EXAMPLE (e.g., Downtime Pie) in downtime_panel.py ---
-        # if panel_name_key == "downtime_panel":
-        #     cause_col = config.COLUMN_MAP.get("downtime_cause")
-        #     duration_col = config.COLUMN_MAP.get("downtime_duration")
-        #     if cause_col and duration_col and all(c in df_panel_main_filtered.columns for c in [cause_col, duration_col]):
-        #         # Aggregate data for pie
-        #         downtime_by_cause = df_panel_main_filtered.groupby(cause_col)[duration_col].sum().reset_index()
-        #         downtime_by_cause = downtime_by_cause[downtime_by_cause[duration_col] > 0].sort_values(by=duration_col, ascending=False).head(7) # Top 7 + Other
-        #
-        #         if not downtime_by_cause.empty:
-        #             # ** YOU MUST HAVE create_downtime_pie_themed (adapted from your plot_downtime_causes_pie) in viz.py **
-        #             fig_pie = viz.create_downtime_pie_themed( # Hypothetical call signature
-        #                 downtime_summary_df=downtime_by_cause, # Pass the aggregated df
-        #                 cause_col_name_in_df=cause_col,     # Pass the actual column name used in aggregation
-        #                 duration_col_name_in_df=duration_col, # Pass the actual column name
-        #                 lang_code=lang_code
-        #                 # title_key will be handled by create_downtime_pie_themed itself
-        #             )
-        #             st_container.plotly_chart(fig_pie, use_container_width=True)
-        #         else:
-        #             st_container.info(_("no_data_for_plot") + " (Downtime by Cause).")
-        #     else:
-        #         st_container.warning(_("no_data_downtime_cause"))
-
-
-        # --- Actionable Insights ---
-        # try:
-        #     action_insights = insights.generate_your_panel_insights(
-        #         df_panel_main_filtered,
-        #         insight_metric1,
-        #         insight_trend_df,
-        #         # ... other necessary data for this panel's insights ...
-        #         lang_code
-        #     )
-        #     if action_insights:
-        #         st_container.markdown("---")
-        #         st_container.subheader(_("actionable_insights_title"))
-        #         for insight_item in action_insights:
-        #             st_container.markdown(f"💡 {insight_item}")
-        # except Exception as e:
-        #     logger.error(f"Error generating insights for {panel_title_key}: {e}")
-        #     st_container.warning(_("error_generating_insights", error_message=str(e)))
-
-        pass # Placeholder if no specific logic implemented yet for a panel
+        #     if "your_trend_chart" in result.figures:
+        #         col_chart1.plotly_chart(viz.build_figure(result.figures["your_trend_chart"], lang_code), use_container_width=True)
+        #     elif "your_trend_chart" in result.notices:
+        #         render_notice(col_chart1, result.notices["your_trend_chart"], _)
+
+        if "insights" in result.notices:
+            render_notice(st_container, result.notices["insights"], _)
+        render_insights(st_container, result.insights, _)
     else:
         st_container.info(_("no_data_available"))
-    st_container.markdown("---")
\ No newline at end of file
+    st_container.markdown("---")
+
+# Legacy positional entry point, for callers outside the registry: DataFrame arguments in DATA_SOURCES
+# order (e.g. engagement_panel: df_engagement, df_psych_safety; downtime_panel also receives
+# `selected_shifts_list: List[str]`).
+def render(st_container: Any,
+           df_panel_main_filtered: pd.DataFrame, # Primary DataFrame for this panel
+           lang_code: str,
+           _: Callable[[str, Optional[str]], str]):
+    render_result(st_container, compute({"your_data_source_key": df_panel_main_filtered}, {}, lang_code), lang_code, _)
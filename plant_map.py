@@ -0,0 +1,118 @@
+# plant_map.py
+"""
+Plant map: the facility layout of config.FACILITY_CONFIG (outline, WORK_AREAS rectangles, ENTRY_EXIT_POINTS) and
+the per-area KPIs drawn on it.
+
+The geometry of a facility config is computed once and cached: area bounds and centers as arrays, and the layout
+as Plotly shape dicts, which every spatial figure (plant map, worker density heatmap, distribution map) copies
+instead of rebuilding. Per-area KPIs are aggregated from small tables and joined onto the areas by name:
+  - occupancy: location samples per snapshot falling inside each area (one vectorized point-in-rectangle test
+    over all samples), or per Zone when the samples have no coordinates,
+  - downtime: merged downtime minutes of downtime_engine, per work area group,
+  - incidents: incidents of the safety source, per work area.
+"""
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+
+logger = logging.getLogger(__name__)
+
+AREA_COL = "area" # Area name column of the per-area KPI table (see area_kpis)
+OUTLINE_COLOR = "#7F8C8D" # Facility outline, as the neutral gray of the dark theme
+AREA_LINE_COLOR = "#BDC3C7"
+AREA_FILL_COLOR = "rgba(189, 195, 199, 0.08)" # Areas without a KPI value
+
+class FacilityGeometry:
+    """Layout of one facility config: area arrays and Plotly shapes, computed once."""
+
+    def __init__(self, facility_config: Dict[str, Any]):
+        self.width = float(facility_config.get(config.COLUMN_MAP["facility_width_key"], 100))
+        self.height = float(facility_config.get(config.COLUMN_MAP["facility_height_key"], 60))
+        areas = facility_config.get(config.COLUMN_MAP["facility_work_areas_key"], {}) or {}
+        self.area_names: List[str] = []
+        bounds = []
+        for area_name, area_def in areas.items():
+            try:
+                (x0, y0), (x1, y1) = area_def["coords"]
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Work area '{area_name}' has no [(x0, y0), (x1, y1)] coords; left off the plant map.")
+                continue
+            self.area_names.append(str(area_name))
+            bounds.append((min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)))
+        self.bounds = np.array(bounds, dtype="float64").reshape(-1, 4) # x0, y0, x1, y1 per area
+        self.centers = np.column_stack([(self.bounds[:, 0] + self.bounds[:, 2]) / 2, (self.bounds[:, 1] + self.bounds[:, 3]) / 2])
+        points = facility_config.get(config.COLUMN_MAP["facility_entry_exit_key"], []) or []
+        points = [point for point in points if len(point.get("coords") or ()) == 2]
+        self.entry_names = [str(point.get("name", "")) for point in points]
+        self.entry_coords = np.array([point["coords"] for point in points], dtype="float64").reshape(-1, 2)
+        self._outline_shape = dict(type="rect", x0=0, y0=0, x1=self.width, y1=self.height, layer="below",
+                                   line=dict(color=OUTLINE_COLOR, width=2), fillcolor="rgba(0, 0, 0, 0)")
+        self._area_shapes = [dict(type="rect", x0=x0, y0=y0, x1=x1, y1=y1, layer="below",
+                                  line=dict(color=AREA_LINE_COLOR, width=1, dash="dot"), fillcolor=AREA_FILL_COLOR)
+                             for x0, y0, x1, y1 in self.bounds.tolist()]
+
+    def shapes(self, fill_colors: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """Layout shapes (outline, then one rectangle per area), areas filled with `fill_colors` where given."""
+        if fill_colors is None:
+            return [self._outline_shape] + self._area_shapes # Plotly copies shape dicts into the figure
+        return [self._outline_shape] + [shape if fill is None else dict(shape, fillcolor=fill)
+                                        for shape, fill in zip(self._area_shapes, fill_colors)]
+
+    def locate(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Index of the first area containing each point (-1: none), for all points at once."""
+        inside = ((x[:, None] >= self.bounds[:, 0]) & (x[:, None] <= self.bounds[:, 2]) &
+                  (y[:, None] >= self.bounds[:, 1]) & (y[:, None] <= self.bounds[:, 3])) # points x areas
+        return np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+
+# facility config (as JSON) -> geometry, per process
+_GEOMETRIES: Dict[str, FacilityGeometry] = {}
+_GEOMETRIES_LOCK = threading.Lock()
+
+def get_facility_geometry(facility_config: Optional[Dict[str, Any]] = None) -> FacilityGeometry:
+    """Geometry of the facility config (default config.FACILITY_CONFIG), computed once per distinct config."""
+    facility_config = config.FACILITY_CONFIG if facility_config is None else facility_config
+    config_key = json.dumps(facility_config, sort_keys=True, default=str)
+    with _GEOMETRIES_LOCK:
+        geometry = _GEOMETRIES.get(config_key)
+        if geometry is None:
+            geometry = _GEOMETRIES[config_key] = FacilityGeometry(facility_config)
+        return geometry
+
+def _occupancy(geometry: FacilityGeometry, df_spatial: pd.DataFrame) -> np.ndarray:
+    """Average location samples per snapshot in each area (NaN for all areas without samples)."""
+    x_col, y_col = config.COLUMN_MAP["worker_x_coord"], config.COLUMN_MAP["worker_y_coord"]
+    zone_col, time_col = config.COLUMN_MAP["spatial_zone"], config.COLUMN_MAP["spatial_timestamp"]
+    if df_spatial.empty:
+        return np.full(len(geometry.area_names), np.nan)
+    if x_col in df_spatial.columns and y_col in df_spatial.columns:
+        area_ids = geometry.locate(df_spatial[x_col].to_numpy(dtype="float64"), df_spatial[y_col].to_numpy(dtype="float64"))
+    elif zone_col in df_spatial.columns:
+        area_ids = pd.Categorical(df_spatial[zone_col].astype(str), categories=geometry.area_names).codes
+    else:
+        return np.full(len(geometry.area_names), np.nan)
+    snapshots = df_spatial[time_col].nunique() if time_col in df_spatial.columns else 1
+    return np.bincount(area_ids[area_ids >= 0], minlength=len(geometry.area_names)) / max(snapshots, 1)
+
+def area_kpis(geometry: FacilityGeometry, df_spatial: pd.DataFrame, df_safety: pd.DataFrame,
+              downtime_by_area: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    One row per area of the geometry, in its order: AREA_COL and one column per config.PLANT_MAP_KPIS key (NaN where
+    a source has no value for the area). downtime_by_area: merged minutes per work area (DowntimeAggregates.area_totals).
+    """
+    area_col, incidents_col = config.COLUMN_MAP["work_area"], config.COLUMN_MAP["incidents"]
+    df_areas = pd.DataFrame({AREA_COL: geometry.area_names})
+    df_areas["occupancy"] = _occupancy(geometry, df_spatial)
+    df_areas["downtime"] = (downtime_by_area.reindex(geometry.area_names).to_numpy(dtype="float64")
+                            if downtime_by_area is not None else np.nan)
+    if not df_safety.empty and area_col in df_safety.columns and incidents_col in df_safety.columns:
+        per_area = df_safety.groupby(df_safety[area_col].astype(str), observed=True)[incidents_col].sum()
+        df_areas["incidents"] = per_area.reindex(geometry.area_names).to_numpy(dtype="float64")
+    else:
+        df_areas["incidents"] = np.nan
+    return df_areas
@@ -0,0 +1,93 @@
+# precompute.py
+"""
+Nightly batch job: materializes every panel's KPIs, trends and figure JSON for the default
+(no filter) view and for each single-site view, in every language of config.TEXT_STRINGS.
+Results go to config.PRECOMPUTED_STORE_DIR and are read first by pages/dashboard_page.render.
+
+Usage (e.g. from cron, in the app's working directory):
+    python precompute.py [--workers 4] [--langs EN ES] [--store-dir precomputed]
+"""
+import argparse
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import config
+import precomputed_store
+import panel_registry
+from panel_results import PanelResult
+from utils import get_unique_options_from_dfs_list
+
+logger = logging.getLogger(__name__)
+
+# Set once per worker process by _init_worker so the raw frames are pickled once per worker, not once per task.
+_WORKER_RAW_DFS: Dict[str, pd.DataFrame] = {}
+
+def compute_view(raw_dfs: Dict[str, pd.DataFrame], filter_selections: Dict[str, List[str]],
+                 lang_code: str) -> Dict[str, PanelResult]:
+    """Runs every headless panel `compute` for one filter view. Same filtering code as the dashboard."""
+    from pages import dashboard_page
+    filtered_dfs = dashboard_page.filter_dataframes(raw_dfs, filter_selections)
+    results = {}
+    for panel_name_key, panel_spec in panel_registry.get_panel_specs(compute_only=True).items():
+        try:
+            results[panel_name_key] = panel_spec.compute(filtered_dfs, filter_selections, lang_code)
+        except Exception as e:
+            logger.error(f"Error computing panel '{panel_name_key}' for filters {filter_selections}: {e}", exc_info=True)
+    return results
+
+def _init_worker(raw_dfs: Dict[str, pd.DataFrame]):
+    global _WORKER_RAW_DFS
+    _WORKER_RAW_DFS = raw_dfs
+
+def _materialize_view(view_key: str, filter_selections: Dict[str, List[str]], lang_codes: List[str],
+                      data_fingerprint: str, store_dir: Optional[str]) -> Tuple[str, int]:
+    """Worker task: computes and writes one view in all languages. Returns (view_key, panels written)."""
+    panels_written = 0
+    for lang_code in lang_codes:
+        view_results = compute_view(_WORKER_RAW_DFS, filter_selections, lang_code)
+        precomputed_store.save_view(view_key, lang_code, view_results, data_fingerprint, store_dir)
+        panels_written += len(view_results)
+    return view_key, panels_written
+
+def run(workers: int, lang_codes: List[str], store_dir: Optional[str] = None) -> int:
+    """Loads all sources once, then fans the views out over a process pool. Returns the number of views written."""
+    from pages import dashboard_page
+    started = time.perf_counter()
+    data_fingerprint = precomputed_store.current_data_fingerprint()
+    compute_panels = list(panel_registry.get_panel_specs(compute_only=True).values())
+    raw_dfs = dashboard_page.load_raw_dataframes(panel_registry.required_sources(compute_panels)) # Only what the panels read
+
+    sites = get_unique_options_from_dfs_list([df for df in raw_dfs.values() if not df.empty], "site")
+    views = [(precomputed_store.DEFAULT_VIEW_KEY, {})] + \
+            [(f"site={site}", {"site": [site]}) for site in sites]
+    logger.info(f"Precomputing {len(views)} views x {len(lang_codes)} languages with {workers} workers.")
+
+    views_written = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(raw_dfs,)) as pool:
+        futures = {pool.submit(_materialize_view, view_key, selections, lang_codes, data_fingerprint, store_dir): view_key
+                   for view_key, selections in views}
+        for future in as_completed(futures):
+            try:
+                view_key, panels_written = future.result()
+                views_written += 1
+                logger.info(f"Wrote view '{view_key}' ({panels_written} panel results).")
+            except Exception as e:
+                logger.error(f"Precomputation failed for view '{futures[future]}': {e}", exc_info=True)
+    logger.info(f"Precomputation finished: {views_written}/{len(views)} views in {time.perf_counter() - started:.1f}s.")
+    return views_written
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Materialize dashboard panel results for the default and single-site views.")
+    parser.add_argument("--workers", type=int, default=config.PRECOMPUTE_DEFAULT_WORKERS, help="Process pool size.")
+    parser.add_argument("--langs", nargs="+", default=list(config.TEXT_STRINGS.keys()), help="Language codes to render.")
+    parser.add_argument("--store-dir", default=config.PRECOMPUTED_STORE_DIR, help="Output directory for the artifacts.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    views_written = run(max(1, args.workers), args.langs, args.store_dir)
+    return 0 if views_written else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
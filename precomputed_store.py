@@ -0,0 +1,143 @@
+# precomputed_store.py
+import os
+import json
+import hashlib
+import functools
+import logging
+import numpy as np
+import pandas as pd
+from io import StringIO
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+import config
+from panel_results import PanelResult, figure_spec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VIEW_KEY = "default"
+
+def view_key_for_filters(filter_selections: Dict[str, List[str]]) -> Optional[str]:
+    """Returns the store key for the views we precompute (no filters, or exactly one site), else None."""
+    active = {k: v for k, v in filter_selections.items() if v}
+    if not active:
+        return DEFAULT_VIEW_KEY
+    if list(active.keys()) == ["site"] and len(active["site"]) == 1:
+        return f"site={active['site'][0]}"
+    return None
+
+def source_files_fingerprint(file_paths: List[str]) -> str:
+    """Cheap fingerprint of the source files (path, size, mtime). Missing files are part of the fingerprint too."""
+    hasher = hashlib.sha1()
+    for path in sorted(file_paths):
+        try:
+            stat_result = os.stat(path)
+            hasher.update(f"{path}|{stat_result.st_size}|{stat_result.st_mtime_ns}".encode())
+        except OSError:
+            hasher.update(f"{path}|missing".encode())
+    return hasher.hexdigest()
+
+def current_data_fingerprint() -> str:
+    """
+    Fingerprint of every file in config.ALL_DATA_FILE_CONSTANTS, in the version utils.load_data_main serves: while a
+    changed file is reloaded in the background it stays the fingerprint of the previous version.
+    """
+    from utils import served_source_fingerprint # Deferred: utils imports this module's fingerprint helper lazily too
+    paths = [getattr(config, name) for name in config.ALL_DATA_FILE_CONSTANTS if getattr(config, name, None)]
+    hasher = hashlib.sha1()
+    for path in sorted(paths):
+        hasher.update(served_source_fingerprint(path).encode())
+    return hasher.hexdigest()
+
+def _artifact_path(view_key: str, lang_code: str, store_dir: Optional[str] = None) -> str:
+    view_hash = hashlib.sha1(view_key.encode("utf-8")).hexdigest()[:16] # Site names may contain any character
+    return os.path.join(store_dir or config.PRECOMPUTED_STORE_DIR, f"{view_hash}.{lang_code}.json")
+
+def json_default(obj: Any):
+    """json.dump `default` for the numpy / pandas scalars of panel results (also used by api_server.py)."""
+    if isinstance(obj, np.integer): return int(obj)
+    if isinstance(obj, np.floating): return float(obj)
+    if isinstance(obj, (pd.Timestamp, datetime)): return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# --- (De)serialization of PanelResult ---
+def serialize_panel_result(result: PanelResult, lang_code: str) -> Dict[str, Any]:
+    """Converts a PanelResult into a JSON-able dict. Figure specs are rendered to figure JSON in `lang_code`."""
+    trends_serialized = {}
+    for trend_key, trend_obj in result.trends.items():
+        if isinstance(trend_obj, pd.Series):
+            trends_serialized[trend_key] = {"kind": "series", "json": trend_obj.to_json(orient="split", date_format="iso")}
+        elif isinstance(trend_obj, pd.DataFrame):
+            trends_serialized[trend_key] = {"kind": "frame", "json": trend_obj.to_json(orient="split", date_format="iso")}
+    import visualizations as viz # Batch side only: keeps plotly out of the dashboard's startup imports
+    return {
+        "panel_name": result.panel_name, "title_key": result.title_key, "has_data": result.has_data,
+        "kpis": result.kpis, "previous_kpis": result.previous_kpis,
+        "trends": trends_serialized, "cards": result.cards,
+        "figures_json": {slot: viz.build_figure(spec, lang_code).to_json() for slot, spec in result.figures.items()},
+        "notices": result.notices, "insights": result.insights,
+    }
+
+def deserialize_panel_result(data: Dict[str, Any]) -> PanelResult:
+    """Inverse of serialize_panel_result. Figures come back as `figure_from_json` specs."""
+    trends = {}
+    for trend_key, trend_data in data.get("trends", {}).items():
+        trends[trend_key] = pd.read_json(StringIO(trend_data["json"]), orient="split",
+                                         typ="series" if trend_data["kind"] == "series" else "frame")
+    return PanelResult(
+        panel_name=data["panel_name"], title_key=data["title_key"], has_data=data.get("has_data", False),
+        kpis=data.get("kpis", {}), previous_kpis=data.get("previous_kpis", {}),
+        trends=trends, cards=data.get("cards", {}),
+        figures={slot: figure_spec("figure_from_json", figure_json=fig_json) for slot, fig_json in data.get("figures_json", {}).items()},
+        notices=data.get("notices", {}), insights=data.get("insights", []),
+    )
+
+# --- Writing ---
+def save_view(view_key: str, lang_code: str, panel_results: Dict[str, PanelResult], data_fingerprint: str,
+              store_dir: Optional[str] = None) -> str:
+    """Writes one artifact per (view, language). The write is atomic so readers never see a partial file."""
+    target_path = _artifact_path(view_key, lang_code, store_dir)
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    payload = {
+        "view_key": view_key, "lang_code": lang_code, "data_fingerprint": data_fingerprint,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "panels": {name: serialize_panel_result(res, lang_code) for name, res in panel_results.items()},
+    }
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, default=json_default)
+    os.replace(tmp_path, target_path)
+    return target_path
+
+# --- Reading ---
+@functools.lru_cache(maxsize=64)
+def _read_artifact(path: str, mtime_ns: int) -> Optional[Dict[str, Any]]:
+    # mtime_ns is part of the cache key so a rewritten artifact is picked up.
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read precomputed artifact '{path}': {e}")
+        return None
+
+def load_panel_result(view_key: str, panel_name: str, lang_code: str, data_fingerprint: str,
+                      store_dir: Optional[str] = None) -> Optional[PanelResult]:
+    """Returns the precomputed PanelResult, or None if missing or built from different source data."""
+    path = _artifact_path(view_key, lang_code, store_dir)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    artifact = _read_artifact(path, mtime_ns)
+    if not artifact or artifact.get("data_fingerprint") != data_fingerprint or artifact.get("view_key") != view_key:
+        return None
+    panel_data = artifact.get("panels", {}).get(panel_name)
+    if panel_data is None:
+        return None
+    try:
+        result = deserialize_panel_result(panel_data)
+        result.lang_code = lang_code # Its figures were rendered in this language
+        return result
+    except Exception as e:
+        logger.warning(f"Could not deserialize precomputed result for '{panel_name}' ({view_key}): {e}")
+        return None
@@ -0,0 +1,217 @@
+# query_backend.py
+"""
+Optional embedded analytical backend (DuckDB if installed, otherwise SQLite from the standard library).
+The CSV sources are loaded into a local database file once per source-file change; sidebar filters and
+panel aggregations are then pushed down as SQL so only small aggregate frames enter Python. A changed source is
+loaded into a staging table and swapped in with its fingerprint in one transaction, so queries of other sessions
+see either the old or the new version of a table, never a missing or half-loaded one.
+Enabled with config.DATA_BACKEND = "duckdb" or "sqlite" (default "pandas" keeps the in-memory path).
+Sources are loaded in full even with config.TIER_STORE_DIR set: the database aggregates the full history, which
+equals the count-weighted aggregations of the retention tiers served to the pandas path (retention_tiers.py).
+"""
+import os
+import threading
+import logging
+import pandas as pd
+from typing import Dict, List, Optional, Tuple, Any
+
+import config
+import date_normalization
+import schema_registry
+from precomputed_store import source_files_fingerprint
+
+logger = logging.getLogger(__name__)
+
+SOURCE_META_TABLE = "_vitalsigns_source_meta"
+STAGING_SUFFIX = "__staging" # Table a changed source is loaded into before it replaces the served one
+
+def _quote_ident(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+class SqlQueryBackend:
+    """Thin wrapper over one embedded database connection. Safe to share between Streamlit sessions."""
+
+    def __init__(self, db_path: str, engine: str = "duckdb"):
+        self.engine = engine
+        if engine == "duckdb":
+            try:
+                import duckdb
+                self._conn = duckdb.connect(db_path)
+            except ImportError:
+                logger.warning("duckdb is not installed; falling back to the SQLite query backend.")
+                self.engine = "sqlite"
+        if self.engine == "sqlite":
+            import sqlite3
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock() # SQLite connections must not be used concurrently
+        self._sync_lock = threading.Lock() # One session (re)loads changed sources, the others wait for it
+        self._table_columns: Dict[str, List[str]] = {}
+        self._execute(f"CREATE TABLE IF NOT EXISTS {SOURCE_META_TABLE} (source_key TEXT PRIMARY KEY, fingerprint TEXT)")
+
+    # --- Low level ---
+    def _execute(self, sql: str, params: Optional[List[Any]] = None) -> pd.DataFrame:
+        params = params or []
+        if self.engine == "duckdb":
+            cursor = self._conn.cursor() # DuckDB cursors are independent connections to the same database
+            cursor.execute(sql, params)
+            return cursor.df() if cursor.description else pd.DataFrame()
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            rows = cursor.fetchall()
+            self._conn.commit()
+            columns = [d[0] for d in cursor.description] if cursor.description else []
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def _month_expr(self, date_col: str) -> str:
+        if self.engine == "duckdb":
+            return f"strftime(date_trunc('month', CAST({_quote_ident(date_col)} AS TIMESTAMP)), '%Y-%m')"
+        return f"strftime('%Y-%m', {_quote_ident(date_col)})"
+
+    # --- Loading ---
+    def sync_sources(self, source_map: Dict[str, Tuple[str, Optional[str]]]) -> None:
+        """(Re)loads every source whose CSV changed since the last sync. source_map is dashboard_page.DATA_SOURCE_MAP."""
+        with self._sync_lock:
+            self._sync_sources_locked(source_map)
+
+    def _sync_sources_locked(self, source_map: Dict[str, Tuple[str, Optional[str]]]) -> None:
+        known = self._execute(f"SELECT source_key, fingerprint FROM {SOURCE_META_TABLE}")
+        known_fingerprints = dict(zip(known["source_key"], known["fingerprint"])) if not known.empty else {}
+        for source_key, (file_const_name, date_col_key) in source_map.items():
+            file_path = getattr(config, file_const_name, None)
+            if not file_path or not os.path.exists(file_path):
+                continue
+            fingerprint = source_files_fingerprint([file_path])
+            if known_fingerprints.get(source_key) != fingerprint:
+                date_col_actual = config.COLUMN_MAP.get(date_col_key) if date_col_key else None
+                self._load_csv(source_key, file_path, date_col_actual)
+                self._swap_in(source_key, fingerprint)
+                self._table_columns.pop(source_key, None)
+            if source_key not in self._table_columns:
+                self._table_columns[source_key] = self._load_columns(source_key)
+
+    def _load_csv(self, source_key: str, file_path: str, date_col_actual: Optional[str]) -> None:
+        """
+        Loads the file into the staging table of the source (the served table is left as it is). Both engines load
+        the same normalized chunks: COLUMN_MAP headers, dates parsed with the cached format of date_normalization
+        (the engines' own CSV sniffing would read "1/6/2023" day-first) and stripped strings.
+        """
+        logger.info(f"Loading '{file_path}' into the {self.engine} backend as table '{source_key}'.")
+        staging_name = source_key + STAGING_SUFFIX
+        table = _quote_ident(staging_name)
+        # Same header mapping as the validated frames of utils.load_data_main, so queries use COLUMN_MAP names
+        renames = schema_registry.header_renames(file_path, list(pd.read_csv(file_path, nrows=0).columns))
+        self._execute(f"DROP TABLE IF EXISTS {table}") # Left over by an interrupted load
+        # Chunked load keeps peak memory bounded for large files
+        for chunk in pd.read_csv(file_path, chunksize=100_000):
+            chunk = chunk.rename(columns=renames)
+            if date_col_actual and date_col_actual in chunk.columns:
+                chunk[date_col_actual] = date_normalization.parse_dates(chunk[date_col_actual], file_path, date_col_actual)
+            for col in chunk.select_dtypes(include='object').columns:
+                chunk[col] = chunk[col].str.strip()
+            if self.engine == "duckdb":
+                cursor = self._conn.cursor()
+                cursor.register("_chunk", chunk) # Dates stay TIMESTAMP columns
+                exists = cursor.execute("SELECT count(*) FROM information_schema.tables WHERE table_name = ?",
+                                        [staging_name]).fetchone()[0]
+                cursor.execute(f"INSERT INTO {table} BY NAME SELECT * FROM _chunk" if exists
+                               else f"CREATE TABLE {table} AS SELECT * FROM _chunk")
+                cursor.unregister("_chunk")
+                continue
+            if date_col_actual and date_col_actual in chunk.columns:
+                chunk[date_col_actual] = chunk[date_col_actual].dt.strftime('%Y-%m-%d %H:%M:%S')
+            with self._lock:
+                chunk.to_sql(staging_name, self._conn, if_exists='append', index=False)
+
+    def _swap_in(self, source_key: str, fingerprint: str) -> None:
+        """Replaces the served table by its staging table and records its fingerprint, in one transaction."""
+        table = _quote_ident(source_key)
+        statements = [(f"DROP TABLE IF EXISTS {table}", []),
+                      (f"ALTER TABLE {_quote_ident(source_key + STAGING_SUFFIX)} RENAME TO {table}", []),
+                      (f"DELETE FROM {SOURCE_META_TABLE} WHERE source_key = ?", [source_key]),
+                      (f"INSERT INTO {SOURCE_META_TABLE} VALUES (?, ?)", [source_key, fingerprint])]
+        if self.engine == "duckdb":
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN TRANSACTION")
+            try:
+                for sql, params in statements:
+                    cursor.execute(sql, params)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def _load_columns(self, source_key: str) -> List[str]:
+        return list(self._execute(f"SELECT * FROM {_quote_ident(source_key)} LIMIT 0").columns)
+
+    def columns(self, source_key: str) -> List[str]:
+        """Actual column names of a loaded source (empty if the source isn't loaded)."""
+        return self._table_columns.get(source_key, [])
+
+    # --- Queries ---
+    def _where_clause(self, source_key: str, selections: Dict[str, List[str]]) -> Tuple[str, List[Any]]:
+        """Same semantics as utils.apply_all_filters_to_df: string comparison, filters on missing columns ignored."""
+        table_cols = self.columns(source_key)
+        clauses, params = [], []
+        for concept_key, selected_opts_list in selections.items():
+            actual_col = config.COLUMN_MAP.get(concept_key)
+            if actual_col and selected_opts_list and actual_col in table_cols:
+                placeholders = ", ".join("?" for _ in selected_opts_list)
+                clauses.append(f"CAST({_quote_ident(actual_col)} AS TEXT) IN ({placeholders})")
+                params.extend(str(opt) for opt in selected_opts_list)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def aggregate(self, source_key: str, selections: Dict[str, List[str]], measures: Dict[str, Tuple[str, str]],
+                  monthly_date_col: Optional[str] = None) -> pd.DataFrame:
+        """
+        measures: output alias -> (actual column, 'sum' | 'avg' | 'count' | 'min' | 'max'). Measures on missing columns are skipped.
+        With monthly_date_col, returns one row per month (column `monthly_date_col`, month-end timestamps like
+        pd.Grouper(freq='M')); otherwise a single row.
+        """
+        table_cols = self.columns(source_key)
+        select_parts = [f"{agg.upper()}({_quote_ident(col)}) AS {_quote_ident(alias)}"
+                        for alias, (col, agg) in measures.items() if col in table_cols]
+        if not select_parts or (monthly_date_col and monthly_date_col not in table_cols):
+            return pd.DataFrame()
+        where_sql, params = self._where_clause(source_key, selections)
+        if monthly_date_col:
+            month_expr = self._month_expr(monthly_date_col)
+            null_guard = f"{_quote_ident(monthly_date_col)} IS NOT NULL"
+            where_sql = f"{where_sql} AND {null_guard}" if where_sql else f" WHERE {null_guard}"
+            sql = (f"SELECT {month_expr} AS _month, {', '.join(select_parts)} FROM {_quote_ident(source_key)}"
+                   f"{where_sql} GROUP BY _month ORDER BY _month")
+            df_agg = self._execute(sql, params)
+            if df_agg.empty:
+                return df_agg
+            df_agg[monthly_date_col] = pd.to_datetime(df_agg.pop("_month"), format="%Y-%m") + pd.offsets.MonthEnd(0)
+            return df_agg[[monthly_date_col] + [c for c in df_agg.columns if c != monthly_date_col]]
+        return self._execute(f"SELECT {', '.join(select_parts)} FROM {_quote_ident(source_key)}{where_sql}", params)
+
+    def row_count(self, source_key: str, selections: Dict[str, List[str]]) -> int:
+        if source_key not in self._table_columns:
+            return 0
+        where_sql, params = self._where_clause(source_key, selections)
+        df_count = self._execute(f"SELECT COUNT(*) AS n FROM {_quote_ident(source_key)}{where_sql}", params)
+        return int(df_count["n"].iloc[0]) if not df_count.empty else 0
+
+    def distinct_values(self, column_conceptual_key: str) -> List[str]:
+        """Filter dropdown options across all loaded sources (SQL counterpart of utils.get_unique_options_from_dfs_list)."""
+        actual_col = config.COLUMN_MAP.get(column_conceptual_key)
+        if not actual_col:
+            return []
+        options = set()
+        for source_key, table_cols in self._table_columns.items():
+            if actual_col in table_cols:
+                col_sql = _quote_ident(actual_col)
+                df_opts = self._execute(f"SELECT DISTINCT CAST({col_sql} AS TEXT) AS v FROM {_quote_ident(source_key)} WHERE {col_sql} IS NOT NULL")
+                options.update(df_opts["v"].astype(str).str.strip())
+        return sorted(options)
@@ -0,0 +1,256 @@
+# retention_tiers.py
+"""
+Retention tiers of the dated sources of config.RETENTION_POLICIES: rows of a source's recent window are served as
+they are, older rows as daily and then monthly rollups, so the frames utils.load_data_main serves (and every scan
+over them) stop growing with the length of the history.
+
+Tiers are compacted from the source CSV into config.TIER_STORE_DIR, one CSV and one manifest per source, once per
+version of the file and of its policy:
+  - cutoffs count back from the newest date in the file: the raw window starts at a day boundary and the monthly
+    tier ends at a month boundary, so no day or month is split across two rollups,
+  - rollups group by the period and the config.TIER_DIMENSION_KEYS columns of the source, keeping per numeric column
+    the mean of its values and, under count_header, how many values that mean stands for (raw rows count 1 per
+    value); other columns (IDs, free text) are kept on raw rows only and are empty on rollups,
+  - TIER_COL holds the tier of each row; the date column holds the day / first day of the month of a rollup.
+utils.read_csv_source reads the compacted file instead of the source when its manifest matches the source's
+fingerprint (compacting first when it does not) and validates it as the source. Aggregations spanning the tiers
+weight each row by its counts (weighted_aggregate, aggregate_column), as utils.monthly_aggregate, the KPI cards and
+the driver / drill-down engines do, so means, sums and counts equal those over the full history.
+The SQL query backend (query_backend.py) keeps loading the full source files: its aggregations run in the database,
+so they already equal the weighted ones and the two backends show the same KPIs.
+Sources are compacted lazily by the first load after a change (the background refresh of utils.load_data_main for
+a served source), or ahead of time by the maintenance job:
+    python retention_tiers.py [--watch] [--interval 3600] [--store-dir data_tiers]
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from precomputed_store import source_files_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+TIER_COL = "Retention Tier" # Tier of each served row: TIER_RAW, TIER_DAILY or TIER_MONTHLY
+TIER_RAW, TIER_DAILY, TIER_MONTHLY = "raw", "daily", "monthly"
+WEIGHTED_AGGREGATIONS = ("mean", "sum", "count") # Exact over rollups when weighted by the counts
+
+_COMPACT_LOCKS: Dict[str, threading.Lock] = {} # source key -> lock, so one thread per process compacts a source
+_COMPACT_LOCKS_LOCK = threading.Lock()
+
+def count_header(header: str) -> str:
+    """Header of the column holding how many values each row's `header` value stands for."""
+    return f"{header}{config.TIER_COUNT_SUFFIX}"
+
+def is_tiered(df: pd.DataFrame) -> bool:
+    return TIER_COL in df.columns
+
+def value_counts(df: pd.DataFrame, header: str) -> pd.Series:
+    """Values each row of `header` stands for: its count column in a tiered frame, else 1 per non-missing value."""
+    counts_col = count_header(header)
+    if counts_col in df.columns:
+        return df[counts_col].fillna(0)
+    return df[header].notna().astype(np.int64)
+
+def optimize_tier_dtypes(df: pd.DataFrame) -> Dict[str, Tuple[str, str]]:
+    """Compact dtypes of the tier columns, in place (like utils.optimize_dtypes): the tier as a category, counts downcast."""
+    if not is_tiered(df):
+        return {}
+    converted = {}
+    tier_cols = [TIER_COL] + [col for col in df.columns if str(col).endswith(config.TIER_COUNT_SUFFIX)]
+    for col in tier_cols:
+        dtype_before = str(df[col].dtype)
+        df[col] = df[col].astype("category") if col == TIER_COL else pd.to_numeric(df[col].fillna(0), downcast="integer")
+        if str(df[col].dtype) != dtype_before:
+            converted[col] = (dtype_before, str(df[col].dtype))
+    return converted
+
+def weighted_aggregate(df: pd.DataFrame, keys: Any, measures: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+    """
+    df.groupby(keys).agg(**measures) for a tiered frame (output name -> (actual column, aggregation)): mean, sum and
+    count weight each row by its counts; other aggregations apply to the rows as they are (exact for the raw tier only).
+    """
+    grouped_frames = {}
+    for out_name, (col, agg_func) in measures.items():
+        if agg_func not in WEIGHTED_AGGREGATIONS:
+            grouped_frames[out_name] = df[col].groupby(keys, observed=True).agg(agg_func)
+            continue
+        counts = value_counts(df, col)
+        totals = (pd.to_numeric(df[col], errors="coerce").fillna(0) * counts).groupby(keys, observed=True).sum()
+        count_totals = counts.groupby(keys, observed=True).sum()
+        if agg_func == "sum":
+            grouped_frames[out_name] = totals
+        elif agg_func == "count":
+            grouped_frames[out_name] = count_totals
+        else:
+            grouped_frames[out_name] = totals / count_totals.where(count_totals > 0)
+    return pd.DataFrame(grouped_frames)
+
+def aggregate_column(df: pd.DataFrame, col: str, agg_func: str) -> float:
+    """df[col].agg(agg_func) over all rows, weighted by the counts for a tiered frame (as weighted_aggregate)."""
+    if not is_tiered(df) or agg_func not in WEIGHTED_AGGREGATIONS:
+        return df[col].agg(agg_func)
+    counts = value_counts(df, col)
+    count_total = float(counts.sum())
+    if agg_func == "count":
+        return count_total
+    total = float((pd.to_numeric(df[col], errors="coerce").fillna(0) * counts).sum())
+    if agg_func == "sum":
+        return total
+    return total / count_total if count_total > 0 else float("nan")
+
+# --- Compaction ---
+def _rollup(rows: pd.DataFrame, periods: pd.Series, date_col: str, numeric_cols: List[str],
+            dimension_cols: List[str]) -> pd.DataFrame:
+    """Rows grouped by period and dimensions: mean and count per numeric column."""
+    if rows.empty:
+        return pd.DataFrame(columns=[date_col] + dimension_cols + numeric_cols + [count_header(col) for col in numeric_cols])
+    grouped = rows[numeric_cols].groupby([periods.rename(date_col)] + [rows[col] for col in dimension_cols], observed=True, dropna=False)
+    sums, counts = grouped.sum(), grouped.count()
+    means = sums / counts.where(counts > 0)
+    return pd.concat([means, counts.astype(np.int32).add_suffix(config.TIER_COUNT_SUFFIX)], axis=1).reset_index()
+
+def tier_frame(df: pd.DataFrame, date_col: str, policy: Dict[str, int]) -> pd.DataFrame:
+    """
+    The tiers of a validated frame (typed `date_col`): rows of the last policy["raw_days"] days as they are, daily
+    rollups back to policy["daily_days"] days (from the start of that month), monthly rollups before. Rows without
+    a date stay raw. Rollups group by the config.TIER_DIMENSION_KEYS columns only.
+    """
+    month_key_cols = [col for col in df.columns if str(col).endswith(config.MONTH_KEY_SUFFIX)]
+    columns = [col for col in df.columns if col not in month_key_cols]
+    dimension_cols = [config.COLUMN_MAP[key] for key in config.TIER_DIMENSION_KEYS
+                      if config.COLUMN_MAP.get(key) in columns and config.COLUMN_MAP[key] != date_col]
+    numeric_cols = [col for col in columns if col != date_col and col not in dimension_cols
+                    and pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+    dates = df[date_col]
+    newest = dates.max()
+    is_raw, is_daily = np.ones(len(df), dtype=bool), np.zeros(len(df), dtype=bool)
+    if not pd.isna(newest):
+        raw_start = (newest - pd.Timedelta(days=policy["raw_days"])).normalize()
+        daily_start = (newest - pd.Timedelta(days=policy["daily_days"])).to_period("M").to_timestamp()
+        is_raw = (dates.isna() | (dates >= raw_start)).to_numpy()
+        is_daily = ~is_raw & (dates >= daily_start).to_numpy()
+    is_monthly = ~is_raw & ~is_daily
+
+    raw = df.loc[is_raw, columns].copy()
+    for col in numeric_cols:
+        raw[count_header(col)] = raw[col].notna().astype(np.int32)
+    daily = _rollup(df[is_daily], dates[is_daily].dt.normalize(), date_col, numeric_cols, dimension_cols)
+    monthly = _rollup(df[is_monthly], dates[is_monthly].dt.to_period("M").dt.to_timestamp(), date_col, numeric_cols, dimension_cols)
+    tier_parts = [part.assign(**{TIER_COL: tier}) for part, tier in [(raw, TIER_RAW), (daily, TIER_DAILY), (monthly, TIER_MONTHLY)]
+                  if not part.empty]
+    tiers = pd.concat(tier_parts, ignore_index=True) if tier_parts else raw.assign(**{TIER_COL: TIER_RAW})
+    return tiers[columns + [count_header(col) for col in numeric_cols] + [TIER_COL]].sort_values(date_col, kind="stable", ignore_index=True)
+
+def source_policy(file_path: str) -> Optional[Tuple[str, Dict[str, int], str]]:
+    """(source key, policy, actual date column) of the file's tiered source; None if it has no policy."""
+    from pages.dashboard_page import DATA_SOURCE_MAP # Deferred: the dashboard page loads data through utils
+    for source_key, (file_const_name, date_col_key) in DATA_SOURCE_MAP.items():
+        if getattr(config, file_const_name, None) == file_path and source_key in config.RETENTION_POLICIES:
+            if not config.COLUMN_MAP.get(date_col_key or ""):
+                logger.warning(f"Source '{source_key}' has a retention policy but no date column; served in full.")
+                return None
+            return source_key, config.RETENTION_POLICIES[source_key], config.COLUMN_MAP[date_col_key]
+    return None
+
+def _store_paths(store_dir: str, source_key: str) -> Tuple[str, str]:
+    return os.path.join(store_dir, f"{source_key}.tiers.csv"), os.path.join(store_dir, f"{source_key}.manifest.json")
+
+def _read_manifest(manifest_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+def _is_current(manifest: Optional[Dict[str, Any]], fingerprint: str, policy: Dict[str, int]) -> bool:
+    return manifest is not None and manifest.get("fingerprint") == fingerprint and manifest.get("policy") == policy
+
+def compact_source(file_path: str, source_key: str, policy: Dict[str, int], date_col: str, fingerprint: str,
+                   store_dir: str) -> str:
+    """Reads and validates the full source, writes its tiers and then its manifest (each replaced atomically)."""
+    import schema_registry
+    started = time.perf_counter()
+    df = pd.read_csv(file_path)
+    for col in df.columns: # Same string cleanup as utils.read_csv_source
+        if df[col].dtype == 'object' and df[col].notna().any():
+            df[col] = df[col].astype(str).str.strip()
+    df, _report = schema_registry.validate_frame(df, file_path, fingerprint, [date_col])
+    if date_col not in df.columns:
+        raise ValueError(f"date column '{date_col}' missing")
+    tiers = tier_frame(df, date_col, policy)
+    tiers_path, manifest_path = _store_paths(store_dir, source_key)
+    os.makedirs(store_dir, exist_ok=True)
+    tiers.to_csv(tiers_path + ".tmp", index=False)
+    os.replace(tiers_path + ".tmp", tiers_path)
+    tier_rows = tiers[TIER_COL].value_counts().to_dict()
+    manifest = {"version": MANIFEST_VERSION, "source": file_path, "fingerprint": fingerprint, "policy": policy,
+                "rows_in": len(df), "rows_out": len(tiers), "tier_rows": tier_rows, "compacted_at": time.time()}
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    logger.info(f"Compacted '{file_path}' into tiers: {len(df)} rows -> {len(tiers)} ({tier_rows}) "
+                f"in {time.perf_counter() - started:.1f}s.")
+    return tiers_path
+
+def tiered_source_path(file_path: str, fingerprint: str, store_dir: Optional[str] = None) -> Optional[str]:
+    """
+    Path of the compacted tiers of the file's version `fingerprint`, compacting them first if the store holds none
+    (or an older version / policy). None for files without a policy, or when compaction fails (the source is then
+    served in full).
+    """
+    store_dir = store_dir or config.TIER_STORE_DIR
+    tiered_source = source_policy(file_path) if store_dir else None
+    if tiered_source is None or not os.path.exists(file_path): # A missing file is reported by the caller's read
+        return None
+    source_key, policy, date_col = tiered_source
+    tiers_path, manifest_path = _store_paths(store_dir, source_key)
+    if _is_current(_read_manifest(manifest_path), fingerprint, policy):
+        return tiers_path
+    with _COMPACT_LOCKS_LOCK:
+        compact_lock = _COMPACT_LOCKS.setdefault(source_key, threading.Lock())
+    with compact_lock: # Other processes may compact the same version concurrently, which is harmless
+        if _is_current(_read_manifest(manifest_path), fingerprint, policy): # Compacted while we waited?
+            return tiers_path
+        try:
+            return compact_source(file_path, source_key, policy, date_col, fingerprint, store_dir)
+        except Exception as e:
+            logger.error(f"Compacting '{file_path}' into tiers failed ({e}); serving its full history.", exc_info=True)
+            return None
+
+# --- Maintenance Job ---
+def compact_all(store_dir: str) -> int:
+    """Compacts every tiered source whose file or policy changed since its last compaction. Returns the source count."""
+    from pages.dashboard_page import DATA_SOURCE_MAP
+    compacted = 0
+    for source_key in config.RETENTION_POLICIES:
+        file_path = getattr(config, DATA_SOURCE_MAP.get(source_key, ("", None))[0], None)
+        if file_path and os.path.exists(file_path) and tiered_source_path(file_path, source_files_fingerprint([file_path]), store_dir):
+            compacted += 1
+    return compacted
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact the dated sources into raw / daily / monthly retention tiers.")
+    parser.add_argument("--store-dir", default=config.TIER_STORE_DIR or "data_tiers", help="Tier store directory (config.TIER_STORE_DIR).")
+    parser.add_argument("--watch", action="store_true", help="Keep running and recompact sources whose files change.")
+    parser.add_argument("--interval", type=float, default=config.TIER_MAINTENANCE_INTERVAL_S, help="Seconds between checks with --watch.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    sources_current = compact_all(args.store_dir)
+    logger.info(f"Tier store '{args.store_dir}' is current: {sources_current} sources.")
+    while args.watch:
+        time.sleep(args.interval)
+        compact_all(args.store_dir) # Only sources whose fingerprint changed are recompacted
+    return 0 if sources_current else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
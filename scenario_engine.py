@@ -0,0 +1,164 @@
+# scenario_engine.py
+"""
+Scenario modeling: projected impact of changing the drivers of config.SCENARIO_DRIVERS (overtime, unfilled shifts,
+hires) on the outcome KPIs of config.SCENARIO_OUTCOMES, from relationships fitted on the existing data.
+
+The sources of config.SCENARIO_METRICS are reduced to the same monthly (group x month x metric) cube as the driver
+analysis (drivers_engine.DriverAnalysis). Per outcome, a least-squares fit over the group-months where the outcome
+and its drivers are all present, each group's own mean removed, gives one coefficient per driver. The models are
+fitted once per data fingerprint on all groups, and the site baselines are cached per filter combination, so a
+scenario only computes the change: (driver baselines x % change) @ coefficients, for all sites in one product.
+"""
+import logging
+import threading
+import warnings
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from drivers_engine import DriverAnalysis, load_metric_sources, VARIANCE_EPSILON
+from precomputed_store import current_data_fingerprint
+from utils import compute_filter_mask
+
+logger = logging.getLogger(__name__)
+
+PROJECTED_SUFFIX = "_projected" # Projection column of an outcome, next to its baseline column (see project)
+ALL_SITES_LABEL = "*" # Baseline row when the sources share no site column
+
+def _within_groups(values: np.ndarray, group_ids: np.ndarray) -> np.ndarray:
+    """Rows of `values` minus the mean of their group's rows."""
+    counts = np.bincount(group_ids)
+    sums = np.stack([np.bincount(group_ids, weights=values[:, col], minlength=len(counts)) for col in range(values.shape[1])], axis=1)
+    return values - (sums / np.maximum(counts, 1)[:, None])[group_ids]
+
+def _unit_bounds(metric_key: str) -> Tuple[float, float]:
+    lower, upper = config.UNIT_RANGES.get(config.COLUMN_UNITS.get(metric_key, ""), (None, None))
+    return (-np.inf if lower is None else lower), (np.inf if upper is None else upper)
+
+def project(baseline: pd.DataFrame, coefficients: pd.DataFrame, changes_pct: Dict[str, float]) -> pd.DataFrame:
+    """
+    Outcomes of the baseline's sites after changing drivers by `changes_pct` (driver key -> % of its baseline):
+    the site column, each outcome's baseline and its projection (outcome + PROJECTED_SUFFIX), clipped to the
+    outcome's unit range. Drivers without a baseline at a site are left unchanged there.
+    """
+    drivers = [key for key in coefficients.columns if key in config.SCENARIO_DRIVERS]
+    outcomes = list(coefficients.index)
+    change = np.array([changes_pct.get(driver_key, 0.0) / 100.0 for driver_key in drivers])
+    driver_deltas = np.nan_to_num(baseline[drivers].to_numpy(dtype="float64") * change) # sites x drivers
+    outcome_deltas = driver_deltas @ coefficients[drivers].to_numpy(dtype="float64").T # sites x outcomes
+    lower, upper = np.array([_unit_bounds(outcome_key) for outcome_key in outcomes]).reshape(-1, 2).T
+    projected = np.clip(baseline[outcomes].to_numpy(dtype="float64") + outcome_deltas, lower, upper)
+    df_projection = baseline[[config.COLUMN_MAP["site"]] + outcomes].copy()
+    for position, outcome_key in enumerate(outcomes):
+        df_projection[f"{outcome_key}{PROJECTED_SUFFIX}"] = projected[:, position]
+    return df_projection
+
+class ScenarioModel:
+    """Outcome models fitted on one version of the data, with the site baselines per filter combination."""
+
+    def __init__(self, analysis: DriverAnalysis):
+        self.analysis = analysis
+        self.drivers = [key for key in config.SCENARIO_DRIVERS if key in analysis.metrics]
+        self.outcomes = [key for key in config.SCENARIO_OUTCOMES if key in analysis.metrics]
+        self.coefficients = self._fit()
+        self._baselines: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fit(self) -> pd.DataFrame:
+        """
+        Outcome x driver coefficients (0 for drivers left out of an outcome's model), with the observations and R² of
+        each model. Drivers seen least often with the outcome are dropped until config.SCENARIO_MIN_OBSERVATIONS
+        complete group-months remain; outcomes without any such model are left out.
+        """
+        cube = self.analysis.cube
+        values = cube.reshape(-1, cube.shape[2])
+        group_ids = np.repeat(np.arange(cube.shape[0]), cube.shape[1])
+        position = {metric_key: i for i, metric_key in enumerate(self.analysis.metrics)}
+        models = {}
+        for outcome_key in self.outcomes:
+            outcome = values[:, position[outcome_key]]
+            drivers = list(self.drivers)
+            while drivers:
+                driver_values = values[:, [position[driver_key] for driver_key in drivers]]
+                complete = ~np.isnan(driver_values).any(axis=1) & ~np.isnan(outcome)
+                if complete.sum() >= config.SCENARIO_MIN_OBSERVATIONS + len(drivers):
+                    break
+                overlaps = (~np.isnan(driver_values) & ~np.isnan(outcome)[:, None]).sum(axis=0)
+                drivers.pop(int(np.argmin(overlaps)))
+            if not drivers:
+                continue
+            x = _within_groups(driver_values[complete], group_ids[complete])
+            y = _within_groups(outcome[complete][:, None], group_ids[complete])[:, 0]
+            fitted, *_ = np.linalg.lstsq(x, y, rcond=None)
+            total_variance = float((y ** 2).sum())
+            r_squared = 1.0 - float(((y - x @ fitted) ** 2).sum()) / total_variance if total_variance > VARIANCE_EPSILON else np.nan
+            model = dict.fromkeys(self.drivers, 0.0)
+            model.update(zip(drivers, fitted))
+            models[outcome_key] = {**model, "observations": int(complete.sum()), "r_squared": r_squared}
+        return pd.DataFrame.from_dict(models, orient="index", columns=self.drivers + ["observations", "r_squared"])
+
+    def baseline(self, selections: Dict[str, List[str]]) -> pd.DataFrame:
+        """
+        Per site of the selections: each driver and outcome averaged over its last config.SCENARIO_BASELINE_MONTHS
+        months with data (columns: site header, then metric keys). Cached per selection.
+        """
+        selection_key = tuple(sorted((k, tuple(sorted(v))) for k, v in selections.items() if v))
+        with self._lock:
+            cached = self._baselines.get(selection_key)
+            if cached is not None:
+                self._baselines.move_to_end(selection_key)
+                return cached
+        groups, cube = self.analysis.groups, self.analysis.cube
+        group_mask = compute_filter_mask(groups, selections) if self.analysis.dimension_cols else None
+        if group_mask is not None:
+            groups, cube = groups[group_mask], cube[group_mask]
+        metric_keys = self.drivers + self.outcomes
+        recent_means = np.full((cube.shape[0], len(metric_keys)), np.nan)
+        for column, metric_key in enumerate(metric_keys):
+            metric_cube = cube[:, :, self.analysis.metrics.index(metric_key)]
+            months_with_data = np.flatnonzero(~np.isnan(metric_cube).all(axis=0))
+            if len(months_with_data):
+                last_month = months_with_data[-1]
+                with warnings.catch_warnings(): # Groups without any recent value stay NaN
+                    warnings.simplefilter("ignore", category=RuntimeWarning)
+                    recent_means[:, column] = np.nanmean(metric_cube[:, max(0, last_month - config.SCENARIO_BASELINE_MONTHS + 1):last_month + 1], axis=1)
+        df_groups = pd.DataFrame(recent_means, columns=metric_keys)
+        site_col = config.COLUMN_MAP["site"]
+        if site_col in groups.columns:
+            df_groups[site_col] = groups[site_col].astype(str).to_numpy()
+            df_baseline = df_groups.groupby(site_col, sort=True)[metric_keys].mean().reset_index()
+        else:
+            df_baseline = df_groups[metric_keys].mean().to_frame().T
+            df_baseline.insert(0, site_col, ALL_SITES_LABEL)
+        with self._lock:
+            self._baselines[selection_key] = df_baseline
+            while len(self._baselines) > config.SHARED_FILTERED_VIEWS_MAX_ENTRIES:
+                self._baselines.popitem(last=False)
+        return df_baseline
+
+# data fingerprint -> scenario model (None without a driver and an outcome), per process
+_MODELS: Dict[str, Optional[ScenarioModel]] = {}
+_MODELS_LOCK = threading.Lock()
+
+def get_scenario_model() -> Optional[ScenarioModel]:
+    """Scenario model of the current data, refitted when any source file changes."""
+    fingerprint = current_data_fingerprint()
+    with _MODELS_LOCK:
+        if fingerprint in _MODELS:
+            return _MODELS[fingerprint]
+        model = None
+        source_frames = load_metric_sources(config.SCENARIO_METRICS)
+        try:
+            model = ScenarioModel(DriverAnalysis(source_frames)) if source_frames else None
+        except ValueError as e:
+            logger.warning(f"Scenario model skipped: {e}")
+        if model is not None and not (model.drivers and model.outcomes):
+            model = None
+        if model is not None:
+            logger.info(f"Fitted scenario models of {list(model.coefficients.index)} on drivers {model.drivers}.")
+        _MODELS.clear() # Only the current data is kept
+        _MODELS[fingerprint] = model
+        return model
@@ -0,0 +1,200 @@
+# schema_registry.py
+"""
+Schema registry of the data sources: every CSV is validated once per file version, at ingest (utils.read_csv_source),
+against config.SOURCE_SCHEMAS. Validation
+  - maps file headers to the COLUMN_MAP header of their conceptual key (the header itself, the key, or an alias of
+    config.COLUMN_ALIASES, case-insensitively), so panels and engines always find the columns under COLUMN_MAP names,
+  - parses date columns (date_normalization.py) and coerces numeric ones (config.COLUMN_UNITS), setting values that
+    do not parse or fall outside config.UNIT_RANGES to NaT / NaN, and adds the month key column of each date and
+    month column,
+  - records what it found in a ValidationReport, cached per (file, fingerprint).
+Panels ask missing_columns() instead of probing the frame's columns and logging on every render.
+"""
+import logging
+import threading
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+import config
+import date_normalization
+
+logger = logging.getLogger(__name__)
+
+REPORTS_PER_FILE = 2 # The served version and the one being reloaded (see utils.load_data_main)
+
+def canonical_headers() -> Dict[str, str]:
+    """Conceptual key -> COLUMN_MAP header, including the engagement radar dimensions."""
+    headers = {key: header for key, header in config.COLUMN_MAP.items() if isinstance(header, str)}
+    headers.update(config.COLUMN_MAP.get("engagement_radar_dims_cols", {}))
+    return headers
+
+class ValidationReport:
+    """What validation found in one version of a source file."""
+
+    def __init__(self, file_path: str, fingerprint: str, source_keys: List[str], rows: int):
+        self.file_path = file_path
+        self.fingerprint = fingerprint
+        self.source_keys = source_keys
+        self.rows = rows
+        self.present: List[str] = [] # Conceptual keys found in the file
+        self.renamed: Dict[str, str] = {} # File header -> COLUMN_MAP header
+        self.unmapped: List[str] = [] # File headers of no conceptual key
+        self.missing_required: List[str] = []
+        self.missing_optional: List[str] = []
+        self.invalid_values: Dict[str, int] = {} # COLUMN_MAP header -> values that did not parse
+        self.out_of_range: Dict[str, int] = {} # COLUMN_MAP header -> values outside the unit's range
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing_required
+
+    def summary(self) -> str:
+        parts = [f"{self.rows} rows"]
+        if self.renamed:
+            parts.append(f"renamed {self.renamed}")
+        if self.missing_required:
+            parts.append(f"missing required {self.missing_required}")
+        if self.missing_optional:
+            parts.append(f"missing optional {self.missing_optional}")
+        if self.invalid_values:
+            parts.append(f"unparseable values {self.invalid_values}")
+        if self.out_of_range:
+            parts.append(f"out-of-range values {self.out_of_range}")
+        return ", ".join(parts)
+
+def _schema_keys(source_keys: List[str]) -> Tuple[List[str], List[str]]:
+    """(required, optional) conceptual keys of the sources read from one file."""
+    required: List[str] = []
+    optional: List[str] = []
+    for source_key in source_keys:
+        schema = config.SOURCE_SCHEMAS.get(source_key, {})
+        required += [key for key in schema.get("required", []) if key not in required]
+        optional += [key for key in schema.get("optional", []) if key not in optional]
+    return required, [key for key in optional if key not in required]
+
+def _source_keys_for_file(file_path: str) -> List[str]:
+    from pages.dashboard_page import DATA_SOURCE_MAP # Deferred: the dashboard page loads data through utils
+    return [key for key, (file_const_name, _date_col_key) in DATA_SOURCE_MAP.items()
+            if getattr(config, file_const_name, None) == file_path]
+
+def _header_mapping(columns: List[str], schema_keys: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    """(file header -> COLUMN_MAP header for the columns to rename, file headers matching no conceptual key)."""
+    headers = canonical_headers()
+    candidates: Dict[str, str] = {} # Lower-cased accepted header -> COLUMN_MAP header
+    for key in list(dict.fromkeys(schema_keys + list(headers))): # The source's own keys win on a clash
+        if key not in headers:
+            continue
+        for accepted in [headers[key], key] + config.COLUMN_ALIASES.get(key, []):
+            candidates.setdefault(accepted.strip().lower(), headers[key])
+    renames: Dict[str, str] = {}
+    unmapped: List[str] = []
+    taken = set(columns)
+    for col in columns:
+        target = candidates.get(str(col).strip().lower())
+        if target is None:
+            unmapped.append(col)
+        elif target != col and target not in taken: # Never overwrite a column already under that header
+            renames[col] = target
+            taken.add(target)
+    return renames, unmapped
+
+def header_renames(file_path: str, columns: List[str]) -> Dict[str, str]:
+    """File header -> COLUMN_MAP header for a file read outside read_csv_source (the SQL query backend)."""
+    required, optional = _schema_keys(_source_keys_for_file(file_path))
+    return _header_mapping(columns, required + optional)[0]
+
+def _validate_column(df: pd.DataFrame, key: str, header: str, report: ValidationReport):
+    unit = config.COLUMN_UNITS.get(key)
+    if unit is None:
+        return
+    values = df[header]
+    if unit == "month": # Text months stay as they are; their month key holds the real month
+        parsed = date_normalization.parse_months(values, f"'{header}' of '{report.file_path}'")
+        df[date_normalization.month_key_header(header)] = parsed
+    elif unit == "date":
+        parsed = date_normalization.parse_dates(values, report.file_path, header)
+        df[date_normalization.month_key_header(header)] = date_normalization.month_starts(parsed)
+    else:
+        parsed = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors="coerce")
+    given = values.notna()
+    if values.dtype == object: # Blank cells come back as "nan" strings from the string cleanup in read_csv_source
+        given &= ~values.astype(str).isin(config.MISSING_VALUE_MARKERS)
+    invalid_count = int((parsed.isna() & given).sum())
+    if invalid_count:
+        report.invalid_values[header] = invalid_count
+    lower, upper = config.UNIT_RANGES.get(unit, (None, None))
+    if unit not in ("date", "month") and (lower is not None or upper is not None):
+        outside = ((parsed < lower) if lower is not None else False) | ((parsed > upper) if upper is not None else False)
+        outside_count = int(outside.sum())
+        if outside_count:
+            report.out_of_range[header] = outside_count
+            parsed = parsed.mask(outside)
+    if parsed is not values and unit != "month":
+        df[header] = parsed
+
+def validate_frame(df: pd.DataFrame, file_path: str, fingerprint: str,
+                   date_cols_actual_names: Optional[List[str]] = None) -> Tuple[pd.DataFrame, ValidationReport]:
+    """
+    Validates a freshly read frame of `file_path` in place of its raw headers: returns the frame under COLUMN_MAP
+    headers with typed date / numeric columns, and the report (also cached, see get_report). Date columns asked for
+    by the caller are parsed even when the file belongs to no schema.
+    """
+    source_keys = _source_keys_for_file(file_path)
+    required, optional = _schema_keys(source_keys)
+    report = ValidationReport(file_path, fingerprint, source_keys, len(df))
+    renames, report.unmapped = _header_mapping(list(df.columns), required + optional)
+    if renames:
+        df = df.rename(columns=renames)
+        report.renamed = renames
+
+    headers = canonical_headers()
+    report.present = [key for key, header in headers.items() if header in df.columns]
+    report.missing_required = [key for key in required if key not in report.present]
+    report.missing_optional = [key for key in optional if key not in report.present]
+    for key in report.present:
+        _validate_column(df, key, headers[key], report)
+    for date_col in date_cols_actual_names or []:
+        if date_col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+            df[date_col] = date_normalization.parse_dates(df[date_col], file_path, date_col)
+            df[date_normalization.month_key_header(date_col)] = date_normalization.month_starts(df[date_col])
+
+    if source_keys and not report.ok:
+        logger.warning(f"Source '{file_path}' ({', '.join(source_keys)}) failed validation: {report.summary()}.")
+    elif report.missing_optional or report.invalid_values or report.out_of_range:
+        logger.warning(f"Source '{file_path}' validated with issues: {report.summary()}.")
+    else:
+        logger.info(f"Source '{file_path}' validated: {report.summary()}.")
+    _store_report(report)
+    return df, report
+
+# file path -> reports of its latest versions, oldest first, per process
+_REPORTS: Dict[str, List[ValidationReport]] = {}
+_REPORTS_LOCK = threading.Lock()
+
+def _store_report(report: ValidationReport):
+    with _REPORTS_LOCK:
+        reports = [cached for cached in _REPORTS.get(report.file_path, []) if cached.fingerprint != report.fingerprint]
+        _REPORTS[report.file_path] = (reports + [report])[-REPORTS_PER_FILE:]
+
+def get_report(source_key: str) -> Optional[ValidationReport]:
+    """Report of the version of the source's file being served, or None if it was not validated in this process."""
+    from pages.dashboard_page import DATA_SOURCE_MAP
+    from utils import served_source_fingerprint
+    file_path = getattr(config, DATA_SOURCE_MAP.get(source_key, ("", None))[0], None)
+    if not file_path:
+        return None
+    fingerprint = served_source_fingerprint(file_path)
+    with _REPORTS_LOCK:
+        return next((report for report in _REPORTS.get(file_path, []) if report.fingerprint == fingerprint), None)
+
+def missing_columns(source_key: str, conceptual_keys: List[str], df: Optional[pd.DataFrame] = None) -> List[str]:
+    """
+    The conceptual keys the source lacks, from its validation report. Without a report (frames attached from the
+    data plane were validated by the publishing process) the validated frame's headers are checked instead.
+    """
+    report = get_report(source_key)
+    if report is not None:
+        return [key for key in conceptual_keys if key not in report.present]
+    headers = canonical_headers()
+    available = set(df.columns) if df is not None else set()
+    return [key for key in conceptual_keys if headers.get(key) not in available]
@@ -0,0 +1,65 @@
+# test_api_server.py
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+import api_server
+from pages import dashboard_page
+from panel_results import PanelResult
+
+def _get(path, query_string="", headers=None):
+    """Status, headers and body of one GET through the ASGI app (no HTTP client needed)."""
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "root_path": "", "query_string": query_string.encode(), "server": ("test", 80), "client": ("test", 1),
+             "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(api_server.app(scope, receive, send))
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return start["status"], {key.decode(): value.decode() for key, value in start["headers"]}, body
+
+@pytest.fixture
+def computed(monkeypatch):
+    """Panel results of a fake compute, and how often it ran."""
+    calls = []
+
+    def compute_panel_results(filter_selections, lang_code, panel_names, data_fingerprint, source_fingerprints=None):
+        calls.append(filter_selections)
+        result = PanelResult(panel_name=panel_names[0], title_key="title", has_data=True)
+        result.kpis["kpi"] = np.float32(4.8857145)
+        return {panel_name: result for panel_name in panel_names}
+
+    monkeypatch.setattr(dashboard_page, "compute_panel_results", compute_panel_results)
+    monkeypatch.setattr(api_server, "_data_fingerprint", lambda: "fingerprint-1")
+    monkeypatch.setattr(api_server, "_RESPONSES", api_server.ResponseCache(8))
+    return calls
+
+def test_kpis_etag_is_hash_of_body_and_numbers_are_rounded(computed):
+    panel_name = next(iter(api_server.panel_registry.get_panel_specs(compute_only=True)))
+    status, headers, body = _get("/api/kpis", f"panel={panel_name}")
+    assert status == 200
+    assert headers["etag"] == '"' + api_server.hashlib.sha1(body).hexdigest()[:24] + '"'
+    assert json.loads(body)["panels"][panel_name]["kpis"]["kpi"] == 4.8857
+
+def test_matching_if_none_match_gets_304_from_the_cached_body(computed):
+    panel_name = next(iter(api_server.panel_registry.get_panel_specs(compute_only=True)))
+    _status, headers, _body = _get("/api/kpis", f"panel={panel_name}")
+    status, revalidated_headers, body = _get("/api/kpis", f"panel={panel_name}", {"If-None-Match": headers["etag"]})
+    assert status == 304 and body == b""
+    assert revalidated_headers["etag"] == headers["etag"]
+    assert len(computed) == 1 # Computed once, revalidation served from the cache
+
+def test_other_filters_or_stale_etag_get_a_full_response(computed):
+    panel_name = next(iter(api_server.panel_registry.get_panel_specs(compute_only=True)))
+    status, _headers, _body = _get("/api/kpis", f"panel={panel_name}&site=Plant%20A", {"If-None-Match": '"stale"'})
+    assert status == 200
+    assert computed == [{"site": ["Plant A"]}]
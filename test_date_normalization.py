@@ -0,0 +1,30 @@
+# test_date_normalization.py
+import logging
+
+import pandas as pd
+
+import config
+import date_normalization
+
+def test_months_with_a_year_are_kept():
+    months = date_normalization.parse_months(pd.Series(["2023-01", "Enero 2022", "Sept. 2021", "nope"]))
+    assert months.tolist()[:3] == [pd.Timestamp("2023-01-01"), pd.Timestamp("2022-01-01"), pd.Timestamp("2021-09-01")]
+    assert pd.isna(months.iloc[3])
+
+def test_bare_month_names_take_the_year_of_other_rows(caplog):
+    with caplog.at_level(logging.WARNING, logger=date_normalization.__name__):
+        months = date_normalization.parse_months(pd.Series(["Mar 2024", "Feb", "Nov", "Feb"]), "'Month' of 'test.csv'")
+    assert months.tolist() == [pd.Timestamp("2024-03-01"), pd.Timestamp("2024-02-01"), pd.Timestamp("2023-11-01"),
+                               pd.Timestamp("2024-02-01")]
+    assert "Inferred the year of 2 month name(s)" in caplog.text and "2024-03" in caplog.text
+
+def test_bare_month_names_only_use_the_configured_year(monkeypatch, caplog):
+    monkeypatch.setattr(config, "MONTH_DEFAULT_YEAR", 2021)
+    with caplog.at_level(logging.WARNING, logger=date_normalization.__name__):
+        months = date_normalization.parse_months(pd.Series(["Jan", "Dic"]))
+    assert months.tolist() == [pd.Timestamp("2021-01-01"), pd.Timestamp("2021-12-01")]
+    assert "config.MONTH_DEFAULT_YEAR (2021)" in caplog.text
+
+def test_bare_month_names_without_any_year_stay_unparsed(monkeypatch):
+    monkeypatch.setattr(config, "MONTH_DEFAULT_YEAR", None)
+    assert date_normalization.parse_months(pd.Series(["Jan", "Feb"])).isna().all()
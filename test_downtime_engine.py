@@ -0,0 +1,50 @@
+# test_downtime_engine.py
+import numpy as np
+import pandas as pd
+
+import config
+from downtime_engine import DowntimeAggregates, merge_overlapping_intervals
+
+def _merge(group_ids, starts, ends):
+    merged = merge_overlapping_intervals(np.array(group_ids, dtype=np.int64), np.array(starts, dtype="float64"), np.array(ends, dtype="float64"))
+    return [list(array) for array in merged]
+
+def test_merge_unions_overlapping_and_nested_intervals():
+    assert _merge([0, 0, 0, 0], [0, 5, 6, 20], [10, 8, 12, 25]) == [[0, 0], [0, 20], [12, 25]]
+
+def test_merge_joins_touching_intervals_but_not_disjoint_ones():
+    assert _merge([0, 0], [0, 10], [10, 15]) == [[0], [0], [15]] # [0, 10) and [10, 15) touch: one downtime
+    assert _merge([0, 0], [0, 11], [10, 15]) == [[0, 0], [0, 11], [10, 15]]
+
+def test_merge_never_joins_intervals_of_different_groups():
+    assert _merge([1, 0, 1, 0], [0, 5, 3, 0], [4, 9, 6, 5]) == [[0, 1], [0, 0], [9, 6]]
+
+def test_merge_accepts_unsorted_input_and_empty_arrays():
+    assert _merge([0, 0, 0], [30, 0, 5], [40, 10, 35]) == [[0], [0], [40]]
+    assert _merge([], [], []) == [[], [], []]
+
+def _aggregates(events):
+    date_col, duration_col = config.COLUMN_MAP["downtime_date"], config.COLUMN_MAP["downtime_duration"]
+    shift_col = config.COLUMN_MAP["downtime_shift"]
+    aggregates = DowntimeAggregates(date_col=date_col, duration_col=duration_col, cause_col=None, shift_col=shift_col,
+                                    dimension_cols=[shift_col], interval_minutes=60)
+    assert aggregates.add_events(pd.DataFrame(events, columns=[date_col, duration_col, shift_col]))
+    return aggregates
+
+def test_shift_filter_applies_to_the_shift_of_downtime_column():
+    aggregates = _aggregates([("2024-01-01 06:00", 30, "Morning"), ("2024-01-01 22:00", 45, "Night")])
+    assert aggregates.summary({"shift": ["Night"]})["total_minutes"] == 45
+    assert aggregates.summary({})["total_minutes"] == 75
+
+def test_total_before_period_leaves_out_the_latest_period():
+    aggregates = _aggregates([("2024-01-01 06:00", 30, "Morning"), ("2024-01-03 06:00", 20, "Morning"),
+                              ("2024-01-03 10:00", 15, "Morning")])
+    assert aggregates.total_before_period({}, 24 * 60) == 30
+    assert aggregates.total_before_period({"shift": ["Night"]}, 24 * 60) is None
+
+def test_group_totals_are_merged_minutes_under_the_filter_headers():
+    aggregates = _aggregates([("2024-01-01 06:00", 30, "Morning"), ("2024-01-01 06:10", 30, "Morning"), # Overlap: 40 min
+                              ("2024-01-01 22:00", 45, "Night")])
+    per_group = aggregates.group_totals().set_index(config.COLUMN_MAP["shift"]) # Log has only "Shift Of Downtime"
+    assert per_group[config.COLUMN_MAP["downtime_duration"]].to_dict() == {"Morning": 40, "Night": 45}
+    assert per_group[config.COLUMN_MAP["downtime_duration"]].sum() == aggregates.summary({})["total_minutes"]
@@ -0,0 +1,41 @@
+# test_query_backend.py
+import pandas as pd
+import pytest
+
+import config
+import schema_registry
+from query_backend import SqlQueryBackend
+
+DATE_COL = config.COLUMN_MAP["date"]
+SITE_COL = config.COLUMN_MAP["site"]
+HIRES_COL = config.COLUMN_MAP["hires"]
+SOURCE_MAP = {"stability": ("STABILITY_DATA_FILE", "date")}
+
+@pytest.fixture
+def stability_file(tmp_path, monkeypatch):
+    """Month-first dates ("1/6/2023" is January 6th, "6/1/2023" June 1st) and padded site names, as in the sample."""
+    rows = [("Site A", f"{month}/1/2023", 2.5, 10 * month) for month in range(1, 7)] + [(" Site B ", "1/6/2023", 4.0, 7)]
+    path = tmp_path / "stability_data.csv"
+    pd.DataFrame(rows, columns=["site", "date", "rotation_rate", "hires"]).to_csv(path, index=False)
+    monkeypatch.setattr(config, "STABILITY_DATA_FILE", str(path))
+    return str(path)
+
+def _pandas_monthly_hires(file_path, selections):
+    df, _report = schema_registry.validate_frame(pd.read_csv(file_path), file_path, "test", [DATE_COL])
+    df[SITE_COL] = df[SITE_COL].astype(str).str.strip()
+    for concept_key, options in selections.items():
+        df = df[df[config.COLUMN_MAP[concept_key]].isin(options)]
+    return df.set_index(DATE_COL)[HIRES_COL].resample("M").sum()
+
+@pytest.mark.parametrize("engine", ["duckdb", "sqlite"])
+@pytest.mark.parametrize("selections", [{}, {"site": ["Site B"]}])
+def test_monthly_trend_matches_pandas(stability_file, tmp_path, engine, selections):
+    if engine == "duckdb":
+        pytest.importorskip("duckdb")
+    backend = SqlQueryBackend(str(tmp_path / f"{engine}.db"), engine)
+    backend.sync_sources(SOURCE_MAP)
+    assert backend.engine == engine
+    df_monthly = backend.aggregate("stability", selections, {"hires": (HIRES_COL, "sum")}, monthly_date_col=DATE_COL)
+    expected = _pandas_monthly_hires(stability_file, selections)
+    assert df_monthly[DATE_COL].tolist() == expected.index.tolist()
+    assert df_monthly["hires"].tolist() == expected.tolist()
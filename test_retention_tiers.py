@@ -0,0 +1,51 @@
+# test_retention_tiers.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import retention_tiers
+
+DATE_COL = config.COLUMN_MAP["task_date"]
+VALUE_COL = config.COLUMN_MAP["task_compliance_rate"]
+SITE_COL = config.COLUMN_MAP["site"]
+POLICY = {"raw_days": 30, "daily_days": 120}
+
+@pytest.fixture
+def df_tasks():
+    rng = np.random.default_rng(7)
+    n_rows = 5000
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 400 * 24, n_rows), unit="h")
+    values = rng.uniform(50, 100, n_rows)
+    values[rng.random(n_rows) < 0.1] = np.nan # Missing values must not count
+    return pd.DataFrame({DATE_COL: dates, SITE_COL: rng.choice(["Plant A", "Plant B"], n_rows),
+                         "Task ID": [f"T{i}" for i in range(n_rows)], VALUE_COL: values})
+
+def test_tier_frame_splits_history_into_tiers(df_tasks):
+    tiers = retention_tiers.tier_frame(df_tasks, DATE_COL, POLICY)
+    assert set(tiers[retention_tiers.TIER_COL]) == {retention_tiers.TIER_RAW, retention_tiers.TIER_DAILY, retention_tiers.TIER_MONTHLY}
+    assert len(tiers) < len(df_tasks) / 3
+    counts_col = retention_tiers.count_header(VALUE_COL)
+    assert tiers[counts_col].sum() == df_tasks[VALUE_COL].notna().sum()
+
+def test_rollups_group_by_dimension_keys_only(df_tasks):
+    tiers = retention_tiers.tier_frame(df_tasks, DATE_COL, POLICY)
+    monthly = tiers[tiers[retention_tiers.TIER_COL] == retention_tiers.TIER_MONTHLY]
+    assert not monthly.duplicated([DATE_COL, SITE_COL]).any() # One rollup per month and site, IDs don't split them
+    assert monthly["Task ID"].isna().all()
+    raw = tiers[tiers[retention_tiers.TIER_COL] == retention_tiers.TIER_RAW]
+    assert raw["Task ID"].notna().all()
+
+def test_aggregate_column_matches_full_history(df_tasks):
+    tiers = retention_tiers.tier_frame(df_tasks, DATE_COL, POLICY)
+    assert retention_tiers.aggregate_column(tiers, VALUE_COL, "mean") == pytest.approx(df_tasks[VALUE_COL].mean())
+    assert retention_tiers.aggregate_column(tiers, VALUE_COL, "sum") == pytest.approx(df_tasks[VALUE_COL].sum())
+    assert retention_tiers.aggregate_column(tiers, VALUE_COL, "count") == df_tasks[VALUE_COL].count()
+    assert retention_tiers.aggregate_column(df_tasks, VALUE_COL, "mean") == pytest.approx(df_tasks[VALUE_COL].mean()) # Untiered
+
+def test_weighted_aggregate_matches_full_history_per_group(df_tasks):
+    tiers = retention_tiers.tier_frame(df_tasks, DATE_COL, POLICY)
+    measures = {"avg": (VALUE_COL, "mean"), "total": (VALUE_COL, "sum"), "n": (VALUE_COL, "count")}
+    weighted = retention_tiers.weighted_aggregate(tiers, [tiers[DATE_COL].dt.to_period("M"), tiers[SITE_COL]], measures)
+    expected = df_tasks.groupby([df_tasks[DATE_COL].dt.to_period("M"), df_tasks[SITE_COL]]).agg(**measures)
+    pd.testing.assert_frame_equal(weighted, expected, check_dtype=False, check_names=False)
@@ -1,8 +1,9 @@
 # ui_components.py
 import streamlit as st
 import config
-from typing import Callable, Dict, List, Any # For st_session_state typehint
+from typing import Callable, Dict, List, Any, Optional # For st_session_state typehint
 import pandas as pd # For List[pd.DataFrame] typehint
+from utils import data_as_of
 
 def display_language_selector(st_session_state: Any, _: Callable[[str, Optional[str]], str]) -> str: # Matched signature for _
     """Displays language selector and updates session state."""
@@ -50,8 +51,10 @@ def display_navigation(st_session_state: Any, _: Callable[[str, Optional[str]],
     return app_mode_selected
 
 
-def display_sidebar_filters(all_raw_dfs: List[pd.DataFrame], _: Callable[[str, Optional[str]], str]) -> Dict[str, List[str]]:
-    """Displays all multiselect filters in the sidebar and returns selections."""
+def display_sidebar_filters(all_raw_dfs: List[pd.DataFrame], _: Callable[[str, Optional[str]], str],
+                            options_provider: Optional[Callable[[str], List[str]]] = None) -> Dict[str, List[str]]:
+    """Displays all multiselect filters in the sidebar and returns selections.
+    options_provider (conceptual key -> options) replaces the DataFrame scan, e.g. the SQL query backend."""
     from utils import get_unique_options_from_dfs_list # Avoid circular import if utils imports config
 
     st.sidebar.header(_("filters_header"))
@@ -73,7 +76,7 @@ def display_sidebar_filters(all_raw_dfs: List[pd.DataFrame], _: Callable[[str, O
     
     selections: Dict[str, List[str]] = {}
     for key, label_loc_key in filter_keys_and_labels.items():
-        options = get_unique_options_from_dfs_list(all_raw_dfs, key)
+        options = options_provider(key) if options_provider else get_unique_options_from_dfs_list(all_raw_dfs, key)
         # Use unique keys for each multiselect widget
         selections[key] = st.sidebar.multiselect(
             _(label_loc_key), # Get localized label
@@ -101,4 +104,9 @@ def display_footer(_: Callable[[str, Optional[str]], str]):
     st.sidebar.markdown("---")
     st.sidebar.caption(f"{_(config.APP_TITLE_KEY)} {config.APP_VERSION}")
     st.sidebar.caption(_("Built with Streamlit, Plotly, and Pandas.")) # Removed bilingual hardcoding
-    st.sidebar.caption(_("Data Last Updated: (N/A for sample data)"))
\ No newline at end of file
+    as_of, refreshing = data_as_of()
+    if as_of is None:
+        st.sidebar.caption(_("data_as_of_unavailable"))
+    else:
+        refreshing_note = f" · {_('data_refreshing')}" if refreshing else ""
+        st.sidebar.caption(_("data_as_of").format(timestamp=as_of.strftime("%Y-%m-%d %H:%M")) + refreshing_note)
\ No newline at end of file
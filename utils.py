@@ -1,19 +1,214 @@
 # utils.py
 import pandas as pd
 import streamlit as st
-from typing import List, Dict, Optional, Union, Any
+from typing import List, Dict, Optional, Union, Any, Tuple
+from datetime import datetime
 import numpy as np
+import logging
+import os
+import threading
 import config # For COLUMN_MAP, TEXT_STRINGS (error messages), DEFAULT_LANG
 
-@st.cache_data
+logger = logging.getLogger(__name__)
+
+# file path -> {"rows", "bytes_before", "bytes_after", "columns": {col: (dtype_before, dtype_after)}}, filled at ingest
+MEMORY_REPORTS: Dict[str, Dict[str, Any]] = {}
+
+def _to_numeric_logged(values: pd.Series, col: str) -> pd.Series:
+    """pd.to_numeric(errors='coerce'), logging how many given values were not numbers (they become missing)."""
+    numeric_col = pd.to_numeric(values, errors='coerce')
+    if not pd.api.types.is_numeric_dtype(values):
+        given = values.notna() & ~values.astype(str).isin(config.MISSING_VALUE_MARKERS)
+        coerced_count = int((numeric_col.isna() & given).sum())
+        if coerced_count:
+            logger.warning(f"Column '{col}': {coerced_count} non-numeric values set to missing.")
+    return numeric_col
+
+def optimize_dtypes(df: pd.DataFrame, type_hints: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Converts columns in place to compact dtypes driven by config.COLUMN_TYPE_HINTS (conceptual key -> hint).
+    A hint applies to the COLUMN_MAP header of the key, or to a column named like the key itself.
+    Returns {column: (dtype_before, dtype_after)} for the converted columns.
+    """
+    type_hints = type_hints if type_hints is not None else config.COLUMN_TYPE_HINTS
+    converted = {}
+    for conceptual_key, hint in type_hints.items():
+        for col in {config.COLUMN_MAP.get(conceptual_key), conceptual_key}:
+            if not isinstance(col, str) or col not in df.columns:
+                continue
+            dtype_before = str(df[col].dtype)
+            try:
+                if hint == "category":
+                    if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                        df[col] = df[col].astype("category")
+                elif hint == "float":
+                    df[col] = _to_numeric_logged(df[col], col).astype(np.float64)
+                elif hint == "int":
+                    numeric_col = _to_numeric_logged(df[col], col)
+                    if numeric_col.isna().any() or (numeric_col % 1 != 0).any():
+                        df[col] = numeric_col.astype(np.float64) # Gaps / fractions
+                    else:
+                        df[col] = pd.to_numeric(numeric_col, downcast='integer')
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Could not convert column '{col}' to {hint}: {e}")
+                continue
+            if str(df[col].dtype) != dtype_before:
+                converted[col] = (dtype_before, str(df[col].dtype))
+    return converted
+
+def get_memory_reports() -> Dict[str, Dict[str, Any]]:
+    """Per-source memory before/after dtype optimization (only sources loaded in this process)."""
+    return dict(MEMORY_REPORTS)
+
 def load_data_main(file_path_str: str, date_cols_actual_names: Optional[List[str]] = None) -> pd.DataFrame:
-    """Loads and minimally cleans data from a CSV file."""
+    """
+    Loads and minimally cleans data from a CSV file. Callers must not modify the returned frame: it is shared by
+    all sessions of the process, and with config.DATA_PLANE_DIR set it is memory-mapped from the host-wide
+    data plane (see data_plane.py), which also picks up changed source files.
+
+    Without the data plane, the first load of a file is synchronous. When the file changes afterwards, the last
+    good snapshot keeps being served while a background thread reads the new version and swaps it in
+    (config.DATA_REFRESH_IN_BACKGROUND); see served_source_fingerprint for the version being served.
+    """
+    if config.DATA_PLANE_DIR:
+        import data_plane
+        return data_plane.load_source(file_path_str, date_cols_actual_names, loader=read_csv_source)
+    date_cols_key = tuple(date_cols_actual_names or ())
+    snapshot = _revalidated_snapshot(file_path_str)
+    if snapshot is not None and date_cols_key in snapshot.frames:
+        return snapshot.frames[date_cols_key]
+    # First load of this file (or of these date columns): read now, with the fingerprint taken before the read
+    fingerprint, modified_at = _file_version(file_path_str)
+    df = read_csv_source(file_path_str, date_cols_actual_names)
+    with _SNAPSHOT_LOCK:
+        snapshot = _SNAPSHOTS.get(file_path_str)
+        if snapshot is not None and snapshot.fingerprint == fingerprint:
+            snapshot.frames[date_cols_key] = df
+        else:
+            _SNAPSHOTS[file_path_str] = _SourceSnapshot(fingerprint, modified_at, {date_cols_key: df})
+    return df
+
+# --- Source Snapshots (stale-while-revalidate) ---
+class _SourceSnapshot:
+    """One version of a source file as served by load_data_main, in every date-column variant loaded so far."""
+
+    def __init__(self, fingerprint: str, modified_at: Optional[datetime], frames: Dict[Tuple[str, ...], pd.DataFrame]):
+        self.fingerprint = fingerprint
+        self.modified_at = modified_at
+        self.frames = frames
+        self.failed_fingerprint: Optional[str] = None # Version whose reload failed; retried once the file changes again
+
+# file path -> snapshot being served, per process. Replaced as a whole by the refresh thread, so readers see
+# either the old or the new version of a file, never a mix of both.
+_SNAPSHOTS: Dict[str, _SourceSnapshot] = {}
+_REFRESHING: set = set() # File paths with a reload in progress
+_SNAPSHOT_LOCK = threading.Lock()
+
+def _modified_at(file_path_str: str) -> Optional[datetime]:
+    try:
+        return datetime.fromtimestamp(os.stat(file_path_str).st_mtime)
+    except OSError:
+        return None
+
+def _file_version(file_path_str: str) -> Tuple[str, Optional[datetime]]:
+    from precomputed_store import source_files_fingerprint
+    return source_files_fingerprint([file_path_str]), _modified_at(file_path_str)
+
+def _revalidated_snapshot(file_path_str: str) -> Optional[_SourceSnapshot]:
+    """Snapshot served for the file (None before its first load); starts a reload when the file has changed since."""
+    snapshot = _SNAPSHOTS.get(file_path_str)
+    if snapshot is None:
+        return None
+    fingerprint, _modified_at = _file_version(file_path_str)
+    if fingerprint in (snapshot.fingerprint, snapshot.failed_fingerprint):
+        return snapshot
+    with _SNAPSHOT_LOCK:
+        if file_path_str in _REFRESHING:
+            return snapshot
+        _REFRESHING.add(file_path_str)
+    if config.DATA_REFRESH_IN_BACKGROUND:
+        threading.Thread(target=_refresh_snapshot, args=(file_path_str,), name="data-refresh", daemon=True).start()
+        return snapshot
+    _refresh_snapshot(file_path_str)
+    return _SNAPSHOTS.get(file_path_str)
+
+def _refresh_snapshot(file_path_str: str):
+    """Reads the current version of the file in every loaded date-column variant, then swaps the snapshot."""
+    try:
+        with _SNAPSHOT_LOCK: # load_data_main adds date-column variants to the served snapshot under the lock
+            old_snapshot = _SNAPSHOTS[file_path_str]
+            old_frames = dict(old_snapshot.frames)
+        fingerprint, modified_at = _file_version(file_path_str)
+        frames = {date_cols_key: read_csv_source(file_path_str, list(date_cols_key) or None) for date_cols_key in old_frames}
+        if any(df.empty for df in frames.values()) and not any(df.empty for df in old_frames.values()):
+            logger.warning(f"Reload of '{file_path_str}' gave no rows; still serving the version of {old_snapshot.modified_at}.")
+            old_snapshot.failed_fingerprint = fingerprint
+            return
+        with _SNAPSHOT_LOCK:
+            _SNAPSHOTS[file_path_str] = _SourceSnapshot(fingerprint, modified_at, frames)
+        logger.info(f"Swapped in the new version of '{file_path_str}' (modified {modified_at}).")
+    except Exception as e:
+        logger.error(f"Background reload of '{file_path_str}' failed: {e}", exc_info=True)
+    finally:
+        with _SNAPSHOT_LOCK:
+            _REFRESHING.discard(file_path_str)
+
+def served_source_fingerprint(file_path_str: str) -> str:
+    """
+    precomputed_store.source_files_fingerprint of the version of the file that load_data_main serves: the file
+    itself before its first load, the last good snapshot while a changed file is reloaded. Caches built on loaded
+    frames key on this, so they never store old data under the new file's fingerprint.
+    """
+    snapshot = _revalidated_snapshot(file_path_str)
+    if snapshot is not None:
+        return snapshot.fingerprint
+    from precomputed_store import source_files_fingerprint
+    return source_files_fingerprint([file_path_str])
+
+def data_as_of() -> Tuple[Optional[datetime], bool]:
+    """
+    (Modification time of the newest source version being served or None without any source file, whether a reload
+    is in progress). Sources without a snapshot are served in their current version (not loaded yet, or read through
+    the data plane or the SQL query backend, which both follow the file), so their file's own time counts.
+    """
+    paths = [getattr(config, name) for name in config.ALL_DATA_FILE_CONSTANTS if getattr(config, name, None)]
+    with _SNAPSHOT_LOCK:
+        snapshots = dict(_SNAPSHOTS)
+        refreshing = bool(_REFRESHING)
+    modified_times = []
+    for path in paths:
+        snapshot = snapshots.get(path)
+        modified_at = snapshot.modified_at if snapshot is not None else _modified_at(path)
+        if modified_at is not None:
+            modified_times.append(modified_at)
+    return (max(modified_times) if modified_times else None), refreshing
+
+def read_csv_source(file_path_str: str, date_cols_actual_names: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Uncached CSV read, cleaning, schema validation (schema_registry.validate_frame: COLUMN_MAP headers, typed date
+    and numeric columns) and dtype optimization behind load_data_main. Errors are shown and give an empty frame.
+    With config.TIER_STORE_DIR set, sources of config.RETENTION_POLICIES are read from their retention tiers.
+    """
+    import retention_tiers
+    import schema_registry
+    from precomputed_store import source_files_fingerprint
     try:
-        df = pd.read_csv(file_path_str, parse_dates=date_cols_actual_names if date_cols_actual_names else False)
+        fingerprint = source_files_fingerprint([file_path_str]) # Taken before the read, like load_data_main's
+        # Sources with a retention policy are read from their compacted tiers (see retention_tiers.py)
+        read_path = retention_tiers.tiered_source_path(file_path_str, fingerprint) or file_path_str
+        df = pd.read_csv(read_path) # Dates are parsed by the validation, under their COLUMN_MAP headers
         for col in df.columns: # Iterate over actual columns in the loaded DataFrame
             if df[col].dtype == 'object' and df[col].notna().any(): # Check if column is of object type
                 try: df[col] = df[col].astype(str).str.strip() # Ensure string conversion before strip
                 except AttributeError: pass # Handles non-string objects if any slip through
+        df, _report = schema_registry.validate_frame(df, file_path_str, fingerprint, date_cols_actual_names)
+        bytes_before = int(df.memory_usage(deep=True).sum())
+        converted_cols = optimize_dtypes(df)
+        converted_cols.update(retention_tiers.optimize_tier_dtypes(df))
+        bytes_after = int(df.memory_usage(deep=True).sum())
+        MEMORY_REPORTS[file_path_str] = {"rows": len(df), "bytes_before": bytes_before, "bytes_after": bytes_after, "columns": converted_cols}
+        logger.info(f"Loaded '{read_path}': {len(df)} rows, {bytes_before / 1024:.1f} KiB -> {bytes_after / 1024:.1f} KiB "
+                    f"({bytes_before / max(bytes_after, 1):.1f}x) after dtype optimization of {len(converted_cols)} columns.")
         return df
     except FileNotFoundError:
         # Using direct lookup for error messages as _ might not be available here easily if config fails
@@ -49,21 +244,76 @@ def get_unique_options_from_dfs_list(dfs_list_input: List[pd.DataFrame], column_
             all_options_set.update(options)
     return sorted(list(all_options_set))
 
-def apply_all_filters_to_df(df_to_filter: pd.DataFrame, selections: Dict[str, List[str]]) -> pd.DataFrame:
-    """Applies selected filters to a DataFrame."""
-    if df_to_filter.empty: return df_to_filter.copy()
-    df_filtered = df_to_filter.copy() # Work on a copy
+def compute_filter_mask(df_to_filter: pd.DataFrame, selections: Dict[str, List[str]]) -> Optional[np.ndarray]:
+    """Combined boolean row mask for the selections, or None when no selection applies to this DataFrame."""
+    combined_mask: Optional[np.ndarray] = None
     for concept_key, selected_opts_list in selections.items():
         actual_col_in_df = config.COLUMN_MAP.get(concept_key)
-        if actual_col_in_df and selected_opts_list and actual_col_in_df in df_filtered.columns:
-            # Robust filtering: convert column to string for comparison with string selections
+        if actual_col_in_df and selected_opts_list and actual_col_in_df in df_to_filter.columns:
+            # Robust filtering: compare as strings, as unique options are collected as strings
             try:
-                # Ensure filter options are strings, as unique options are collected as strings
                 string_selected_opts = [str(opt) for opt in selected_opts_list]
-                df_filtered = df_filtered[df_filtered[actual_col_in_df].astype(str).isin(string_selected_opts)]
+                col_values = df_to_filter[actual_col_in_df]
+                if isinstance(col_values.dtype, pd.CategoricalDtype):
+                    # Match on the (few) categories, then look rows up by code: no per-row string conversion
+                    category_matches = np.asarray(col_values.cat.categories.astype(str).isin(string_selected_opts))
+                    codes = col_values.cat.codes.to_numpy()
+                    col_mask = np.where(codes >= 0, category_matches[codes], False)
+                else:
+                    col_mask = col_values.astype(str).isin(string_selected_opts).to_numpy()
+                combined_mask = col_mask if combined_mask is None else (combined_mask & col_mask)
             except Exception as e:
                 st.error(f"Error applying filter for '{concept_key}' on column '{actual_col_in_df}': {e}")
-    return df_filtered
+    return combined_mask
+
+def apply_all_filters_to_df(df_to_filter: pd.DataFrame, selections: Dict[str, List[str]]) -> pd.DataFrame:
+    """
+    Applies selected filters to a DataFrame.
+    No copy is made when no filter applies: the base frame itself is returned. Otherwise the rows are taken once
+    with the combined mask. Either way the result must be treated as read-only by consumers.
+    """
+    if df_to_filter.empty: return df_to_filter
+    row_mask = compute_filter_mask(df_to_filter, selections)
+    if row_mask is None or row_mask.all(): return df_to_filter
+    return df_to_filter[row_mask]
+
+def month_periods(df: pd.DataFrame, date_col: str) -> pd.Series:
+    """
+    Monthly periods of a date or month column, from its month key column (added at ingest, see date_normalization.py)
+    when present; otherwise the column is parsed here (frames that did not go through read_csv_source).
+    """
+    import date_normalization
+    month_key_col = date_normalization.month_key_header(date_col)
+    if month_key_col in df.columns:
+        return df[month_key_col].dt.to_period('M')
+    dates = df[date_col]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+    return dates.dt.to_period('M')
+
+def monthly_aggregate(df: pd.DataFrame, date_col: str, measures: Dict[str, tuple]) -> pd.DataFrame:
+    """
+    Monthly aggregation without copying the input: measures is output_name -> (actual column, 'sum' | 'mean' | ...).
+    Same shape as groupby(pd.Grouper(key=date_col, freq='M')): month-end dates in `date_col`, empty months in
+    between filled (0 for sums, NaN otherwise). Rows with an unparseable date are ignored. Frames served from
+    retention tiers are aggregated with their rollups weighted by the values they stand for.
+    """
+    import retention_tiers
+    months = month_periods(df, date_col)
+    if months.isna().all():
+        return pd.DataFrame()
+    if retention_tiers.is_tiered(df):
+        monthly = retention_tiers.weighted_aggregate(df, months, measures)
+    else:
+        monthly = df.groupby(months).agg(**{out_name: spec for out_name, spec in measures.items()})
+    full_range = pd.period_range(monthly.index.min(), monthly.index.max(), freq='M')
+    aggregated_dtypes = monthly.dtypes
+    monthly = monthly.reindex(full_range)
+    for out_name, (_col, agg_func) in measures.items():
+        if agg_func in ('sum', 'count', 'size'):
+            monthly[out_name] = monthly[out_name].fillna(0).astype(aggregated_dtypes[out_name])
+    monthly.insert(0, date_col, full_range.to_timestamp(how='end').normalize())
+    return monthly.reset_index(drop=True)
 
 def get_dummy_prev_val(curr_val: Optional[Union[int, float, np.number]],
                        factor: float = 0.1, is_percent: bool = False,
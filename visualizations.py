@@ -1,11 +1,16 @@
-import plotly.graph_objects as go
-import plotly.express as px
+import plotly
+import plotly.graph_objects as go # plotly.express (~0.6 s to import) is imported inside the spatial builders only
 import numpy as np
 import pandas as pd
+import functools
+import json
 import logging
-from typing import Dict, List, Optional, Any, Union
+import re
+import threading
+from typing import Dict, List, Optional, Any, Tuple, Union
 
 import config  # For TEXT_STRINGS, thresholds, FACILITY_CONFIG etc.
+import plant_map # Cached facility geometry of the spatial plots
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +33,19 @@ PLOTLY_TEMPLATE_DARK = "plotly_dark" # Base template
 EPSILON = 1e-9 # For float comparisons
 
 # --- Localization Helper ---
+# Figures of panel specs are first built as language-independent skeletons (see build_figure): with SKELETON_LANG,
+# _viz_loc records each string it is asked for and returns a placeholder, which is localized per language later.
+SKELETON_LANG = "_skeleton"
+_PLACEHOLDER = re.compile(r"@@viz(\d+)@@")
+_skeleton_build = threading.local() # .strings: (text_key, default, kwargs) per placeholder of the skeleton being built
+
 def _viz_loc(text_key: str, lang_code: str, default_text_override: Optional[str] = None, **kwargs) -> str:
+    if lang_code == SKELETON_LANG:
+        recorded_strings = getattr(_skeleton_build, "strings", None)
+        if recorded_strings is not None:
+            recorded_strings.append((text_key, default_text_override, kwargs))
+            return f"@@viz{len(recorded_strings) - 1}@@"
+        lang_code = config.DEFAULT_LANG
     lang_dict = config.TEXT_STRINGS.get(lang_code, config.TEXT_STRINGS.get(config.DEFAULT_LANG, {}))
     base_string = lang_dict.get(text_key, default_text_override if default_text_override is not None else lang_dict.get("translation_missing", "TR_VIZ: {key}").format(key=text_key)) # Clearer fallback
     if kwargs:
@@ -39,6 +56,76 @@ def _viz_loc(text_key: str, lang_code: str, default_text_override: Optional[str]
             return base_string # Return unformatted string
     return base_string
 
+def _localize_placeholders(text: str, recorded_strings: List[Tuple], lang_code: str) -> str:
+    """`text` with the skeleton placeholders in it localized (placeholders may nest through defaults and kwargs)."""
+    def localized(match: re.Match) -> str:
+        text_key, default_text_override, kwargs = recorded_strings[int(match.group(1))]
+        return _localize_placeholders(_viz_loc(text_key, lang_code, default_text_override, **kwargs), recorded_strings, lang_code)
+    return _PLACEHOLDER.sub(localized, text)
+
+def _layout_text(text: Optional[str]) -> Optional[str]:
+    """Text a builder inspects (not only displays): placeholders of a skeleton build resolve in the default language."""
+    recorded_strings = getattr(_skeleton_build, "strings", None)
+    if not text or recorded_strings is None:
+        return text
+    return _localize_placeholders(text, recorded_strings, config.DEFAULT_LANG)
+
+# --- Compact Figure Payloads (config.COMPACT_FIGURE_PAYLOADS) ---
+# Every figure is serialized to JSON and sent over the websocket on each render, so the builders below keep it small:
+# numbers rounded to display precision (float32 typed arrays where plotly >= 6 base64-encodes numpy arrays),
+# midnight dates as short date strings, one hovertemplate per trace type in the figure's template instead of one
+# per trace, and a template trimmed to the trace types used here.
+PLOTLY_BINARY_ARRAYS = int(plotly.__version__.split(".")[0]) >= 6
+TEMPLATE_TRACE_TYPES = ("scatter", "bar", "pie", "indicator", "histogram2d", "heatmap")
+
+def _format_decimals(format_str: str) -> Optional[int]:
+    """Decimals of a fixed-point format such as ".1f" (None for other formats)."""
+    match = re.fullmatch(r"[^.]*\.(\d+)f", format_str or "")
+    return int(match.group(1)) if match else None
+
+def _compact_numbers(values: Any, decimals: Optional[int] = None) -> Any:
+    """Numeric trace data rounded to `decimals`; a float32 array where plotly sends it as a binary typed array."""
+    if not config.COMPACT_FIGURE_PAYLOADS:
+        return values
+    array = pd.to_numeric(pd.Series(np.asarray(values)), errors='coerce').to_numpy(dtype="float64")
+    if decimals is not None:
+        array = np.round(array, decimals)
+    return array.astype(np.float32) if PLOTLY_BINARY_ARRAYS else array
+
+def _compact_dates(values: Any) -> Any:
+    """Dates without a time of day as "YYYY-MM-DD" strings (about half the size of full ISO timestamps)."""
+    if not config.COMPACT_FIGURE_PAYLOADS:
+        return values
+    try:
+        dates = pd.DatetimeIndex(values)
+    except (TypeError, ValueError):
+        return values
+    if dates.tz is not None or not (dates[dates.notna()] == dates[dates.notna()].normalize()).all():
+        return values
+    return [d.strftime("%Y-%m-%d") if pd.notna(d) else None for d in dates]
+
+@functools.lru_cache(maxsize=1)
+def _compact_dark_template() -> go.layout.Template:
+    """PLOTLY_TEMPLATE_DARK keeping only the trace-type defaults of TEMPLATE_TRACE_TYPES."""
+    import plotly.io as pio
+    base_template = pio.templates[PLOTLY_TEMPLATE_DARK]
+    template = go.layout.Template(layout=base_template.layout)
+    template.data.update({trace_type: base_template.data[trace_type] for trace_type in TEMPLATE_TRACE_TYPES})
+    return template
+
+def _share_hovertemplate(fig: go.Figure, trace_type: str, hovertemplate: str):
+    """
+    Applies one hovertemplate to all `trace_type` traces of the figure. Call after _apply_common_layout_settings.
+    Trace specifics come from the trace itself (%{fullData.name}, %{meta}), so it is stored once in the template.
+    """
+    if not config.COMPACT_FIGURE_PAYLOADS:
+        fig.update_traces(hovertemplate=hovertemplate, selector=dict(type=trace_type))
+        return
+    existing_defaults = fig.layout.template.data[trace_type]
+    trace_defaults = existing_defaults[0].to_plotly_json() if existing_defaults else {}
+    trace_defaults.pop("type", None)
+    fig.layout.template.data[trace_type] = [dict(trace_defaults, hovertemplate=hovertemplate)]
+
 # --- Common Layout ---
 def _apply_common_layout_settings(fig: go.Figure, title_text_localized: str,
                                  yaxis_title_localized: Optional[str] = None,
@@ -53,6 +140,7 @@ def _apply_common_layout_settings(fig: go.Figure, title_text_localized: str,
     legend_bg = "rgba(44, 62, 80, 0.85)" # Dark, slightly transparent legend bg
     legend_border_c = COLOR_NEUTRAL_GRAY_DARK_THEME
     legend_config = None
+    xaxis_title_text = _layout_text(xaxis_title_localized)
 
     if show_legend:
         legend_title_text = _viz_loc(legend_title_key, lang_code, "") if legend_title_key and lang_code else ""
@@ -64,7 +152,7 @@ def _apply_common_layout_settings(fig: go.Figure, title_text_localized: str,
         )
 
     fig.update_layout(
-        template=PLOTLY_TEMPLATE_DARK, # Base dark theme
+        template=_compact_dark_template() if config.COMPACT_FIGURE_PAYLOADS else PLOTLY_TEMPLATE_DARK, # Base dark theme
         title=dict(text=title_text_localized, x=0.5, font=dict(size=16, color=font_main_color)), # Slightly smaller default title
         paper_bgcolor=COLOR_PAPER_BG_DARK,
         plot_bgcolor=COLOR_PLOT_BG_DARK,
@@ -77,7 +165,7 @@ def _apply_common_layout_settings(fig: go.Figure, title_text_localized: str,
             linewidth=1.5, linecolor=axis_line_c,
             titlefont=dict(size=12, color=font_main_color),
             tickfont=dict(size=10, color=font_main_color),
-            rangemode='tozero' if xaxis_title_localized and any(kw.lower() in xaxis_title_localized.lower() for kw in ["time", "step", "month", "date"]) else 'normal'
+            rangemode='tozero' if xaxis_title_text and any(kw.lower() in xaxis_title_text.lower() for kw in ["time", "step", "month", "date"]) else 'normal'
         ),
         yaxis=dict(
             title_text=yaxis_title_localized, gridcolor=grid_c,
@@ -87,10 +175,8 @@ def _apply_common_layout_settings(fig: go.Figure, title_text_localized: str,
             tickfont=dict(size=10, color=font_main_color)
         ),
         hovermode="x unified", # Good default for time series
-        dragmode='pan' # Enable panning by default
-    )
-    fig.update_traces(
-        hoverlabel=dict(
+        dragmode='pan', # Enable panning by default
+        hoverlabel=dict( # Layout level: applies to every trace without repeating it per trace
             bgcolor="rgba(52, 73, 94, 0.95)", # Darker hover
             font_size=11, # Slightly smaller hover font
             font_color=COLOR_PRIMARY_TEXT_LIGHT,
@@ -116,6 +202,45 @@ def _get_no_data_pie_figure(title_text_localized: str, lang_code: Optional[str]
     fig.add_annotation(text=no_data_text, showarrow=False, xref="paper", yref="paper", x=0.5, y=0.5, font=dict(size=14, color=COLOR_PRIMARY_TEXT_LIGHT))
     return fig
 
+# --- Figure Specs ---
+def _build_skeleton(builder: Any, kwargs: Dict[str, Any]) -> Tuple[str, List[Tuple]]:
+    """(figure JSON with placeholders for its strings, the strings recorded per placeholder)."""
+    _skeleton_build.strings = []
+    try:
+        figure_json = builder(lang_code=SKELETON_LANG, **kwargs).to_json()
+        return figure_json, _skeleton_build.strings
+    finally:
+        _skeleton_build.strings = None
+
+def build_figure(spec: Dict[str, Any], lang_code: str) -> go.Figure:
+    """
+    Builds a figure from a panel figure spec ({"builder": name, "kwargs": {...}}, see panel_results.figure_spec).
+    The builder runs once per spec, for its skeleton; a language only substitutes its strings into the skeleton's
+    JSON. Skeleton and figure of the last language built are cached on the spec ("_skeleton", "_figure"), so a
+    language switch skips the builder's data preparation and a rerun in the same language rebuilds nothing.
+    """
+    builder = globals().get(spec.get("builder", ""))
+    if not callable(builder):
+        logger.error(f"Unknown figure builder '{spec.get('builder')}' in figure spec.")
+        return _get_no_data_figure(_viz_loc("no_data_for_plot", lang_code), lang_code=lang_code)
+    built_figure = spec.get("_figure")
+    if built_figure is not None and built_figure[0] == lang_code:
+        return built_figure[1]
+    if "_skeleton" not in spec:
+        spec["_skeleton"] = _build_skeleton(builder, spec.get("kwargs", {}))
+    skeleton_json, recorded_strings = spec["_skeleton"]
+    figure_json = _PLACEHOLDER.sub(lambda match: json.dumps(_localize_placeholders(match.group(0), recorded_strings, lang_code))[1:-1],
+                                   skeleton_json) # JSON-escaped, as the strings sit inside JSON string literals
+    import plotly.io as pio
+    fig = pio.from_json(figure_json, skip_invalid=True) # Validated already when the skeleton was built
+    spec["_figure"] = (lang_code, fig)
+    return fig
+
+def figure_from_json(figure_json: str, lang_code: str) -> go.Figure:
+    """Builder for figures that were already rendered to JSON (e.g. by precompute.py) in `lang_code`."""
+    import plotly.io as pio
+    return pio.from_json(figure_json)
+
 # --- Metric Card ---
 def display_metric_card(st_container, label_key: str, value: Optional[Union[int, float]], lang_code: str,
                         unit: str = "", higher_is_better: bool = True, target_value: Optional[float] = None,
@@ -265,24 +390,28 @@ def create_trend_chart(df: pd.DataFrame, date_col: str, value_cols_map: Dict[str
     if df.empty or date_col not in df.columns: return _get_no_data_figure(localized_title, lang_code=lang_code)
     localized_y_title = _viz_loc(y_axis_title_key, lang_code); localized_x_title = _viz_loc(x_axis_title_key, lang_code, default_x_title)
     fig = go.Figure(); palette = ACCESSIBLE_CATEGORICAL_PALETTE_DARK_BG
+    x_dates = _compact_dates(df[date_col]) # Shared by all traces of the chart
+    has_units = bool(value_col_units_map) and any(value_col_units_map.values())
     for i, (disp_key, actual_col) in enumerate(value_cols_map.items()):
         if actual_col in df.columns and df[actual_col].notna().any():
             unit = value_col_units_map.get(actual_col, "") if value_col_units_map else ""
             trace_name = _viz_loc(disp_key, lang_code)
-            fig.add_trace(go.Scatter(x=df[date_col], y=df[actual_col], mode='lines+markers', name=trace_name,
+            fig.add_trace(go.Scatter(x=x_dates, y=_compact_numbers(df[actual_col], 2), mode='lines+markers', name=trace_name,
                                      line=dict(color=palette[i % len(palette)], width=2.2), marker=dict(size=5),
-                                     hovertemplate=f'<b>{trace_name}</b><br>{localized_x_title}: %{{x|%Y-%m-%d}}<br>{localized_y_title}: %{{y:.2f}}{unit}<extra></extra>'))
+                                     meta=unit if has_units else None))
             if show_average_line and pd.notna(df[actual_col].mean()):
                 avg_val = df[actual_col].mean(); avg_lbl = _viz_loc("average_label", lang_code)
-                fig.add_hline(y=avg_val, line_dash="dot", line_color=COLOR_NEUTRAL_GRAY_DARK_THEME, width=1.5,
+                fig.add_hline(y=avg_val, line_dash="dot", line_color=COLOR_NEUTRAL_GRAY_DARK_THEME, line_width=1.5,
                               annotation_text=f"{avg_lbl} ({trace_name}): {avg_val:.2f}{unit}", annotation_position="bottom right",
                               annotation_font=dict(size=9, color=COLOR_SECONDARY_TEXT_LIGHT))
             if rolling_avg_window and df[actual_col].notna().sum() >= rolling_avg_window:
                 roll_mean = df[actual_col].rolling(window=rolling_avg_window, min_periods=1).mean(); roll_lbl = _viz_loc("period_rolling_avg_label", lang_code)
-                fig.add_trace(go.Scatter(x=df[date_col], y=roll_mean, mode='lines', name=f"{trace_name} ({rolling_avg_window}-{roll_lbl})",
-                                         line=dict(dash='longdashdot', color=palette[i % len(palette)], width=1.5), opacity=0.7))
+                fig.add_trace(go.Scatter(x=x_dates, y=_compact_numbers(roll_mean, 2), mode='lines', name=f"{trace_name} ({rolling_avg_window}-{roll_lbl})",
+                                         line=dict(dash='longdashdot', color=palette[i % len(palette)], width=1.5), opacity=0.7,
+                                         meta=unit if has_units else None))
     _apply_common_layout_settings(fig, localized_title, yaxis_title_localized=localized_y_title,
                                  xaxis_title_localized=localized_x_title, legend_title_key="legend_metrics_title", lang_code=lang_code)
+    _share_hovertemplate(fig, "scatter", f'<b>%{{fullData.name}}</b><br>{localized_x_title}: %{{x|%Y-%m-%d}}<br>{localized_y_title}: %{{y:.2f}}{"%{meta}" if has_units else ""}<extra></extra>')
     return fig
 
 # --- Bar Chart ---
@@ -294,22 +423,27 @@ def create_comparison_bar_chart(df: pd.DataFrame, category_col: str, value_cols_
     localized_x_title = _viz_loc(x_axis_title_key, lang_code, default_x_title); localized_y_title = _viz_loc(y_axis_title_key, lang_code)
     fig = go.Figure(); palette = ACCESSIBLE_CATEGORICAL_PALETTE_DARK_BG
     actual_fmt = data_label_format_str[data_label_format_str.find(":")+1:data_label_format_str.find("}")] if data_label_format_str.startswith("{") else data_label_format_str
+    label_decimals = _format_decimals(actual_fmt)
+    compact_labels = config.COMPACT_FIGURE_PAYLOADS # Labels formatted by plotly (texttemplate) instead of one string per bar
     for i, (disp_key, actual_col) in enumerate(value_cols_map.items()):
         if actual_col in df.columns and df[actual_col].notna().any():
             trace_name = _viz_loc(disp_key, lang_code)
-            fig.add_trace(go.Bar(name=trace_name, x=df[category_col], y=df[actual_col],
-                                 text=[f"{val:{actual_fmt}}" if pd.notna(val) else "" for val in df[actual_col]],
-                                 textposition='auto', marker_color=palette[i % len(palette)],
-                                 hovertemplate=f'<b>{trace_name}</b><br>{df[category_col].name}: %{{x}}<br>{localized_y_title}: %{{y:{actual_fmt}}}<extra></extra>'))
+            fig.add_trace(go.Bar(name=trace_name, x=df[category_col], y=_compact_numbers(df[actual_col], label_decimals),
+                                 text=None if compact_labels else [f"{val:{actual_fmt}}" if pd.notna(val) else "" for val in df[actual_col]],
+                                 texttemplate=f"%{{y:{actual_fmt}}}" if compact_labels else None,
+                                 textposition='auto', marker_color=palette[i % len(palette)]))
     if barmode == 'stack' and show_total_for_stacked and len(value_cols_map) > 1:
-        df['_Total_Stacked'] = df[[col for col in value_cols_map.values() if col in df.columns]].sum(axis=1, skipna=True)
-        fig.add_trace(go.Scatter(x=df[category_col], y=df['_Total_Stacked'], text=[f"{total:{actual_fmt}}" if pd.notna(total) else "" for total in df['_Total_Stacked']],
+        stacked_totals = df[[col for col in value_cols_map.values() if col in df.columns]].sum(axis=1, skipna=True) # Input frames may be shared: don't add columns to them
+        fig.add_trace(go.Scatter(x=df[category_col], y=_compact_numbers(stacked_totals, label_decimals),
+                                 text=None if compact_labels else [f"{total:{actual_fmt}}" if pd.notna(total) else "" for total in stacked_totals],
+                                 texttemplate=f"%{{y:{actual_fmt}}}" if compact_labels else None,
                                  mode='text', textposition='top center', textfont=dict(color=COLOR_PRIMARY_TEXT_LIGHT, size=10), showlegend=False, hoverinfo='skip'))
     _apply_common_layout_settings(fig, localized_title, yaxis_title_localized=localized_y_title,
                                  xaxis_title_localized=localized_x_title, legend_title_key="legend_categories_title", lang_code=lang_code)
+    _share_hovertemplate(fig, "bar", f'<b>%{{fullData.name}}</b><br>{df[category_col].name}: %{{x}}<br>{localized_y_title}: %{{y:{actual_fmt}}}<extra></extra>')
     fig.update_layout(barmode=barmode);
-    if barmode == 'stack': fig.update_traces(textfont=dict(color=COLOR_PRIMARY_TEXT_LIGHT), textangle=0, textposition='inside', insidetextanchor='middle')
-    else: fig.update_traces(textfont=dict(color=COLOR_PRIMARY_TEXT_LIGHT))
+    if barmode == 'stack': fig.update_traces(textfont=dict(color=COLOR_PRIMARY_TEXT_LIGHT), textangle=0, textposition='inside', insidetextanchor='middle', selector=dict(type='bar'))
+    else: fig.update_traces(textfont=dict(color=COLOR_PRIMARY_TEXT_LIGHT), selector=dict(type='bar'))
     return fig
 
 # --- Radar Chart ---
@@ -364,7 +498,8 @@ def create_pie_chart(df: pd.DataFrame, names_col: str, values_col: str, title_ke
     localized_title = _viz_loc(title_key, lang_code)
     if df.empty or names_col not in df.columns or values_col not in df.columns or df[values_col].sum() < EPSILON:
         return _get_no_data_pie_figure(localized_title, lang_code=lang_code)
-    fig = px.pie(df, names=names_col, values=values_col, hole=0.45, color_discrete_sequence=ACCESSIBLE_CATEGORICAL_PALETTE_DARK_BG)
+    fig = go.Figure(go.Pie(labels=df[names_col], values=df[values_col], hole=0.45, sort=False,
+                           marker=dict(colors=ACCESSIBLE_CATEGORICAL_PALETTE_DARK_BG)))
     fig.update_traces(textposition='outside', textinfo='percent+label', pull=[0.03]*len(df),
                       marker=dict(line=dict(color=COLOR_PLOT_BG_DARK, width=2.5)), opacity=0.9,
                       hoverlabel=dict(bgcolor=COLOR_PLOT_BG_DARK, font_color=COLOR_PRIMARY_TEXT_LIGHT, bordercolor=COLOR_NEUTRAL_GRAY_DARK_THEME),
@@ -390,15 +525,13 @@ def create_task_compliance_trend_themed(
     localized_compliance_label = _viz_loc(compliance_trace_key, lang_code)
     localized_x_title = _viz_loc(x_axis_key, lang_code); localized_y_title = _viz_loc(y_axis_key, lang_code)
 
-    fig.add_trace(go.Scatter(x=date_index, y=data_series, mode='lines+markers', name=localized_compliance_label,
-                             line=dict(color=palette[0 % len(palette)], width=2.2), marker=dict(size=5, symbol="circle"),
-                             hovertemplate=f'<b>{localized_compliance_label}</b><br>{localized_x_title}: %{{x|%Y-%m-%d}}<br>{localized_y_title}: %{{y:.1f}}%<extra></extra>'))
+    fig.add_trace(go.Scatter(x=_compact_dates(date_index), y=_compact_numbers(data_series, 1), mode='lines+markers', name=localized_compliance_label,
+                             line=dict(color=palette[0 % len(palette)], width=2.2), marker=dict(size=5, symbol="circle")))
     if forecast_series is not None and isinstance(forecast_series, pd.Series) and not forecast_series.empty and forecast_series.notna().any():
         localized_forecast_label = _viz_loc(forecast_trace_key, lang_code)
         fc_index = forecast_series.index if isinstance(forecast_series.index, pd.DatetimeIndex) and forecast_series.index.equals(date_index) else date_index # Check index compatibility
-        fig.add_trace(go.Scatter(x=fc_index, y=forecast_series, mode='lines', name=localized_forecast_label,
-                                 line=dict(color=palette[1 % len(palette)], dash='dashdot', width=1.8),
-                                 hovertemplate=f'<b>{localized_forecast_label}</b><br>{localized_x_title}: %{{x|%Y-%m-%d}}<br>{localized_y_title}: %{{y:.1f}}%<extra></extra>'))
+        fig.add_trace(go.Scatter(x=_compact_dates(fc_index), y=_compact_numbers(forecast_series, 1), mode='lines', name=localized_forecast_label,
+                                 line=dict(color=palette[1 % len(palette)], dash='dashdot', width=1.8)))
     if disruption_points_dates:
         for dp_date in disruption_points_dates:
             fig.add_vline(x=dp_date, line=dict(color=COLOR_WARNING_AMBER_DARK_THEME, width=1.5, dash="longdash"),
@@ -416,6 +549,7 @@ def create_task_compliance_trend_themed(
     _apply_common_layout_settings(fig, localized_title, yaxis_title_localized=localized_y_title,
                                  xaxis_title_localized=localized_x_title, yaxis_range=y_range,
                                  legend_title_key="legend_metrics_title", lang_code=lang_code)
+    _share_hovertemplate(fig, "scatter", f'<b>%{{fullData.name}}</b><br>{localized_x_title}: %{{x|%Y-%m-%d}}<br>{localized_y_title}: %{{y:.1f}}%<extra></extra>')
     return fig
 
 # ==============================================================================
@@ -444,11 +578,31 @@ def create_collaboration_trend_themed(data_series: pd.Series, date_index: pd.Ind
     return _get_no_data_figure(_viz_loc(title_key, lang_code), lang_code=lang_code)
 
 def create_oee_trends_themed(df: pd.DataFrame, date_col:str, oee_metrics_map:Dict[str,str], lang_code:str,
-                             title_key:str="oee_trends_chart_title", **kwargs):
-    logger.critical(f"STUB: `create_oee_trends_themed`. Implement by adapting `plot_operational_efficiency`.")
-    # This one is a multi-line trend like `create_trend_chart` but specifically for OEE components.
-    # You can use `create_trend_chart` directly if it fits, or adapt your `plot_operational_efficiency`.
-    return _get_no_data_figure(_viz_loc(title_key, lang_code), lang_code=lang_code)
+                             title_key:str="oee_trends_chart_title", target_value: Optional[float] = None,
+                             intraday: bool = False, **kwargs):
+    """OEE component lines (%) per bucket (oee_engine rollups). Overall OEE is drawn thicker, with its target line."""
+    localized_title = _viz_loc(title_key, lang_code)
+    if df.empty or date_col not in df.columns or not any(col in df.columns and df[col].notna().any() for col in oee_metrics_map.values()):
+        return _get_no_data_figure(localized_title, lang_code=lang_code)
+    fig = go.Figure(); palette = ACCESSIBLE_CATEGORICAL_PALETTE_DARK_BG
+    x_dates = _compact_dates(df[date_col])
+    for i, (disp_key, actual_col) in enumerate(oee_metrics_map.items()):
+        if actual_col in df.columns and df[actual_col].notna().any():
+            is_overall = i == len(oee_metrics_map) - 1 # The map lists overall OEE last
+            fig.add_trace(go.Scatter(x=x_dates, y=_compact_numbers(df[actual_col], 1), mode='lines', name=_viz_loc(disp_key, lang_code),
+                                     line=dict(color=palette[i % len(palette)], width=3 if is_overall else 1.6)))
+    if target_value is not None:
+        fig.add_hline(y=target_value, line_dash="dash", line_color=COLOR_POSITIVE_GREEN_DARK_THEME, line_width=1.5,
+                      annotation_text=f"{_viz_loc('target_label', lang_code, 'Target')}: {target_value:.0f}%", annotation_position="bottom right",
+                      annotation_font=dict(size=9, color=COLOR_SECONDARY_TEXT_LIGHT))
+    localized_x_title = _viz_loc("date_label", lang_code); localized_y_title = _viz_loc("percentage_label", lang_code)
+    _apply_common_layout_settings(fig, localized_title, yaxis_title_localized=localized_y_title, xaxis_title_localized=localized_x_title,
+                                  legend_title_key="legend_metrics_title", lang_code=lang_code)
+    y_min = np.nanmin([df[col].min() for col in oee_metrics_map.values() if col in df.columns])
+    fig.update_yaxes(range=[max(0.0, min(y_min, target_value or 100.0) - 5.0), 101.0])
+    date_format = "%Y-%m-%d %H:%M" if intraday else "%Y-%m-%d"
+    _share_hovertemplate(fig, "scatter", f'<b>%{{fullData.name}}</b><br>{localized_x_title}: %{{x|{date_format}}}<br>{localized_y_title}: %{{y:.1f}}%<extra></extra>')
+    return fig
 
 def create_wellbeing_trend_themed(data_series: pd.Series, date_index: pd.Index, lang_code: str,
                                   title_key:str="wellbeing_psych_safety_trend_title", **kwargs): # Combine this for multiple lines
@@ -461,14 +615,43 @@ def create_psych_safety_trend_themed(data_series: pd.Series, date_index: pd.Inde
     return _get_no_data_figure(_viz_loc(title_key, lang_code), lang_code=lang_code)
 
 def create_downtime_interval_plot_themed(df:pd.DataFrame, date_col:str, value_col:str, lang_code:str,
-                                         title_key:str="downtime_interval_plot_title", **kwargs): # Bar chart
-    logger.critical(f"STUB: `create_downtime_interval_plot_themed`. Implement by adapting `plot_downtime_trend` (which is a bar chart).")
-    return _get_no_data_figure(_viz_loc(title_key, lang_code), lang_code=lang_code)
+                                         title_key:str="downtime_interval_plot_title", bar_minutes: Optional[float] = None,
+                                         threshold_warning: Optional[float] = None, **kwargs): # Bar chart
+    """Downtime minutes per interval (pre-aggregated, e.g. downtime_engine.DowntimeAggregates.interval_totals)."""
+    localized_title = _viz_loc(title_key, lang_code)
+    if bar_minutes:
+        localized_title += f" ({bar_minutes:g} {_viz_loc('minutes_unit_short', lang_code, 'min')})"
+    if df.empty or date_col not in df.columns or value_col not in df.columns or df[value_col].sum() < EPSILON:
+        return _get_no_data_figure(localized_title, lang_code=lang_code)
+
+    values = df[value_col].to_numpy(dtype="float64")
+    bar_colors = COLOR_WARNING_AMBER_DARK_THEME
+    if threshold_warning is not None: # Only intervals above the warning level stand out
+        bar_colors = np.where(values > threshold_warning, COLOR_CRITICAL_RED_DARK_THEME, COLOR_WARNING_AMBER_DARK_THEME).tolist()
+    fig = go.Figure(go.Bar(x=_compact_dates(df[date_col]), y=_compact_numbers(values, 1), marker_color=bar_colors,
+                           name=_viz_loc("downtime_duration_label", lang_code)))
+    localized_x_title = _viz_loc("date_label", lang_code)
+    localized_y_title = f"{_viz_loc('downtime_duration_label', lang_code)} ({_viz_loc('minutes_unit_short', lang_code, 'min')})"
+    _apply_common_layout_settings(fig, localized_title, yaxis_title_localized=localized_y_title,
+                                  xaxis_title_localized=localized_x_title, show_legend=False, lang_code=lang_code)
+    fig.update_layout(bargap=0.1)
+    _share_hovertemplate(fig, "bar", f'{localized_x_title}: %{{x|%Y-%m-%d %H:%M}}<br>{localized_y_title}: %{{y:.1f}}<extra></extra>')
+    return fig
 
 def create_downtime_causes_pie_themed(downtime_events_df: pd.DataFrame, cause_col: str, duration_col:str, lang_code: str,
-                                      title_key:str="downtime_by_cause_pie_title", **kwargs): # Adapt your plot_downtime_causes_pie
-    logger.critical(f"STUB: `create_downtime_causes_pie_themed`. Implement by adapting `plot_downtime_causes_pie`.")
-    return _get_no_data_pie_figure(_viz_loc(title_key, lang_code), lang_code=lang_code)
+                                      title_key:str="downtime_by_cause_pie_title", top_n: Optional[int] = None, **kwargs):
+    """Downtime share per cause. Accepts raw events or a pre-aggregated Pareto frame; causes past top_n are combined."""
+    localized_title = _viz_loc(title_key, lang_code)
+    if downtime_events_df.empty or cause_col not in downtime_events_df.columns or duration_col not in downtime_events_df.columns:
+        return _get_no_data_pie_figure(localized_title, lang_code=lang_code)
+    per_cause = downtime_events_df.groupby(cause_col, observed=True, sort=False)[duration_col].sum().sort_values(ascending=False)
+    if top_n is not None and len(per_cause) > top_n:
+        # Labelled with the number of causes combined, so the slice is not merged with a cause named "Other"
+        other_label = _viz_loc("other_causes_label", lang_code, "Other ({count})", count=len(per_cause) - top_n)
+        per_cause = pd.concat([per_cause.iloc[:top_n], pd.Series([per_cause.iloc[top_n:].sum()], index=[other_label], name=duration_col)])
+    df_pie = per_cause.rename_axis(cause_col).reset_index()
+    df_pie[duration_col] = _compact_numbers(df_pie[duration_col], 1)
+    return create_pie_chart(df_pie, cause_col, duration_col, title_key, lang_code)
 
 def create_team_cohesion_trend_themed(data_series: pd.Series, date_index: pd.Index, lang_code: str,
                                       title_key:str = "collaboration_multitrend_chart_title", **kwargs):
@@ -480,39 +663,105 @@ def create_perceived_workload_trend_themed(data_series: pd.Series, date_index: p
     logger.critical(f"STUB: `create_perceived_workload_trend_themed`. Implement by adapting `plot_perceived_workload`.")
     return _get_no_data_figure(_viz_loc(title_key, lang_code), lang_code=lang_code)
 
+# --- Correlation Heatmap ---
+def create_correlation_heatmap_themed(matrix_df: pd.DataFrame, lang_code: str, title_key: str = "drivers_heatmap_title",
+                                      lag_months: int = 0, **kwargs):
+    """Correlation matrix (-1..1) of drivers_engine; with lag_months the columns are the metrics that many months later."""
+    localized_title = _viz_loc(title_key, lang_code)
+    if lag_months:
+        localized_title += f" ({_viz_loc('drivers_heatmap_lag_suffix', lang_code, months=lag_months)})"
+    if matrix_df.empty or matrix_df.isna().all().all():
+        return _get_no_data_figure(localized_title, lang_code=lang_code)
+    values = [_compact_numbers(matrix_row, 2) for matrix_row in matrix_df.to_numpy(dtype="float64")]
+    fig = go.Figure(go.Heatmap(z=values, x=list(matrix_df.columns), y=list(matrix_df.index), zmin=-1.0, zmax=1.0, zmid=0.0,
+                               colorscale="RdBu", reversescale=True, text=values, texttemplate="%{text:.2f}", textfont=dict(size=9),
+                               colorbar=dict(title=_viz_loc("correlation_label", lang_code), tickfont_size=9), hoverongaps=False))
+    localized_y_title = _viz_loc("drivers_leading_axis", lang_code)
+    localized_x_title = _viz_loc("drivers_following_axis" if lag_months else "drivers_leading_axis", lang_code)
+    _apply_common_layout_settings(fig, localized_title, yaxis_title_localized=localized_y_title,
+                                  xaxis_title_localized=localized_x_title, show_legend=False, lang_code=lang_code)
+    fig.update_layout(hovermode="closest", height=max(420, 40 * len(matrix_df) + 160))
+    fig.update_xaxes(showgrid=False, tickangle=-35); fig.update_yaxes(showgrid=False, autorange="reversed")
+    _share_hovertemplate(fig, "heatmap", f'{localized_y_title}: %{{y}}<br>{localized_x_title}: %{{x}}<br>'
+                                         f'{_viz_loc("correlation_label", lang_code)}: %{{z:.2f}}<extra></extra>')
+    return fig
+
+
+# --- Spatial Plots ---
+# The facility layout (outline, work areas, entry / exit points) comes from plant_map.get_facility_geometry, which
+# computes it once per facility config: figures copy its shapes instead of rebuilding them.
+def _add_facility_layout(fig: go.Figure, geometry: plant_map.FacilityGeometry, lang_code: str,
+                         fill_colors: Optional[List[Optional[str]]] = None):
+    """Facility shapes (areas filled with `fill_colors` where given), entry / exit markers and 1:1 axes over the facility."""
+    fig.update_layout(shapes=geometry.shapes(fill_colors))
+    if len(geometry.entry_names):
+        fig.add_trace(go.Scatter(x=geometry.entry_coords[:, 0], y=geometry.entry_coords[:, 1], mode="markers+text",
+                                 text=geometry.entry_names, textposition="top center", textfont=dict(size=9, color=COLOR_SECONDARY_TEXT_LIGHT),
+                                 marker=dict(symbol="triangle-up", size=11, color=COLOR_WARNING_AMBER_DARK_THEME),
+                                 name=_viz_loc("plant_map_entry_label", lang_code), hoverinfo="text", showlegend=False))
+    fig.update_xaxes(range=[0, geometry.width], showgrid=False, zeroline=False)
+    fig.update_yaxes(range=[0, geometry.height], showgrid=False, zeroline=False, scaleanchor="x", scaleratio=1)
+
+def create_plant_map_themed(area_df: pd.DataFrame, value_col: str, facility_config_dict: dict, lang_code: str,
+                            title_key: str = "plant_map_chart_title", value_label_key: str = "value_label",
+                            colorscale: str = "Blues", value_format_str: str = ".1f", **kwargs):
+    """
+    Work areas of the facility layout filled by a per-area KPI (plant_map.area_kpis). Values are joined onto the
+    cached area shapes by area name; areas without a value keep the plain fill.
+    """
+    from plotly.colors import sample_colorscale
+    localized_title = _viz_loc(title_key, lang_code)
+    geometry = plant_map.get_facility_geometry(facility_config_dict)
+    if area_df.empty or value_col not in area_df.columns or not geometry.area_names:
+        return _get_no_data_figure(localized_title, lang_code=lang_code)
+    values = area_df.set_index(plant_map.AREA_COL)[value_col].reindex(geometry.area_names).to_numpy(dtype="float64")
+    has_value = ~np.isnan(values)
+    if not has_value.any():
+        return _get_no_data_figure(localized_title, lang_code=lang_code)
+    low, high = float(values[has_value].min()), float(values[has_value].max())
+    scaled = (values[has_value] - low) / (high - low) if high - low > EPSILON else np.full(int(has_value.sum()), 0.5)
+    fill_colors: List[Optional[str]] = [None] * len(values)
+    for position, color in zip(np.flatnonzero(has_value), sample_colorscale(colorscale, scaled.tolist())):
+        fill_colors[position] = color.replace("rgb(", "rgba(").replace(")", ", 0.75)")
+
+    localized_value_label = _viz_loc(value_label_key, lang_code)
+    fig = go.Figure(go.Scatter( # Area labels at the centers; the markers carry the colorbar and the hover
+        x=geometry.centers[:, 0], y=geometry.centers[:, 1], mode="markers+text", text=geometry.area_names,
+        textfont=dict(size=10, color=COLOR_PRIMARY_TEXT_LIGHT), customdata=_compact_numbers(values, 2),
+        marker=dict(size=8, color=_compact_numbers(values, 2), colorscale=colorscale, cmin=low, cmax=high, showscale=True,
+                    colorbar=dict(title=localized_value_label, tickfont_size=9)),
+        name=localized_value_label, showlegend=False))
+    _apply_common_layout_settings(fig, localized_title, xaxis_title_localized=_viz_loc("x_coordinate_label", lang_code),
+                                  yaxis_title_localized=_viz_loc("y_coordinate_label", lang_code), show_legend=False, lang_code=lang_code)
+    fig.update_layout(hovermode="closest", dragmode=False)
+    _add_facility_layout(fig, geometry, lang_code, fill_colors)
+    fig.data[0].hovertemplate = f'<b>%{{text}}</b><br>{localized_value_label}: %{{customdata:{value_format_str}}}<extra></extra>'
+    return fig
 
-# SPATIAL PLOTS - THESE REQUIRE YOUR FULL, ADAPTED CODE
-# They also need facility_config_dict which contains facility_size_tuple.
 def create_worker_density_heatmap_themed(
     team_positions_df: pd.DataFrame, # This should be the filtered spatial data
-    facility_config_dict: dict, # Contains facility_size, work_areas, entry_exit from config.FACILITY_CONFIG
+    facility_config_dict: dict, # config.FACILITY_CONFIG (size, work areas, entry / exit points)
     lang_code: str,
     title_key: str = "worker_density_heatmap_figure_title",
-    x_col_name: str = "worker_x_coord", # Conceptual key, resolved by panel
-    y_col_name: str = "worker_y_coord"  # Conceptual key, resolved by panel
+    x_col_name: str = "worker_x_coord", # Actual column name, resolved by panel
+    y_col_name: str = "worker_y_coord"  # Actual column name, resolved by panel
 ):
-    """
-    ADAPT YOUR `plot_worker_density_heatmap` HERE.
-    It needs to extract facility_size from facility_config_dict.
-    And use lang_code, _viz_loc, _apply_common_layout_settings, theme colors.
-    """
-    logger.critical(f"FUNCTION `create_worker_density_heatmap_themed` IS A STUB. YOU MUST IMPLEMENT IT FULLY.")
+    """Density of worker location samples over the facility layout."""
     localized_title = _viz_loc(title_key, lang_code, "Worker Density Heatmap")
-    facility_size = facility_config_dict.get("FACILITY_SIZE", (100,60)) # Example fallback
+    geometry = plant_map.get_facility_geometry(facility_config_dict)
     if team_positions_df.empty or x_col_name not in team_positions_df.columns or y_col_name not in team_positions_df.columns:
         return _get_no_data_figure(localized_title, lang_code=lang_code)
 
+    import plotly.express as px
     fig = px.density_heatmap(team_positions_df, x=x_col_name, y=y_col_name,
-                             nbinsx=int(facility_size[0]/max(1,facility_size[0]/25)), # Dynamic binning based on size
-                             nbinsy=int(facility_size[1]/max(1,facility_size[1]/20)),
+                             nbinsx=int(geometry.width/max(1,geometry.width/25)), # Dynamic binning based on size
+                             nbinsy=int(geometry.height/max(1,geometry.height/20)),
                              color_continuous_scale="Inferno") # Good for dark themes
     _apply_common_layout_settings(fig, localized_title,
                                   xaxis_title_localized=_viz_loc("x_coordinate_label", lang_code),
                                   yaxis_title_localized=_viz_loc("y_coordinate_label", lang_code))
-    fig.update_layout(xaxis_range=[0, facility_size[0]], yaxis_range=[0, facility_size[1]],
-                      coloraxis_colorbar=dict(title=_viz_loc("density_label", lang_code, "Density"), tickfont_size=9))
-    # Add shapes for work areas, entry/exit from facility_config_dict here
-    # ... (logic from your original plot_worker_density_heatmap for shapes)
+    fig.update_layout(coloraxis_colorbar=dict(title=_viz_loc("density_label", lang_code, "Density"), tickfont_size=9))
+    _add_facility_layout(fig, geometry, lang_code)
     return fig
 
 def create_spatial_distribution_map_themed(
@@ -528,13 +777,9 @@ def create_spatial_distribution_map_themed(
     zone_col_actual: Optional[str] = None, # Actual column name for zone (hover)
     selected_step_for_title: Optional[int] = None # If showing snapshot
 ):
-    """
-    ADAPT YOUR `plot_worker_distribution` HERE.
-    Extract facility_size, MINUTES_PER_INTERVAL from facility_config_dict.
-    """
-    logger.critical(f"FUNCTION `create_spatial_distribution_map_themed` IS A STUB. YOU MUST IMPLEMENT IT FULLY.")
+    """Worker locations over the facility layout; with selected_step_for_title, the snapshot's time is in the title."""
     base_title = _viz_loc(title_key, lang_code, "Worker Distribution")
-    facility_size = facility_config_dict.get("FACILITY_SIZE", (100,60))
+    geometry = plant_map.get_facility_geometry(facility_config_dict)
     localized_title = base_title
     if selected_step_for_title is not None:
         mpi = facility_config_dict.get("MINUTES_PER_INTERVAL", 2)
@@ -550,6 +795,7 @@ def create_spatial_distribution_map_themed(
     if zone_col_actual and zone_col_actual in team_positions_df.columns and color_col_actual != zone_col_actual : hover_data_list['Zone'] = team_positions_df[zone_col_actual]
 
 
+    import plotly.express as px
     fig = px.scatter(team_positions_df, x=x_col_name, y=y_col_name,
                      color=color_col_actual if color_col_actual and color_col_actual in team_positions_df.columns else None,
                      hover_name=worker_id_col_actual if worker_id_col_actual and worker_id_col_actual in team_positions_df.columns else None,
@@ -560,7 +806,5 @@ def create_spatial_distribution_map_themed(
                                   yaxis_title_localized=_viz_loc("y_coordinate_label", lang_code),
                                   show_legend=bool(color_col_actual) # Only show legend if coloring by a column
                                   )
-    fig.update_layout(xaxis_range=[0, facility_size[0]], yaxis_range=[0, facility_size[1]])
-    # Add shapes for work areas, entry/exit from facility_config_dict here
-    # ... (logic from your original plot_worker_distribution for shapes)
-    return fig
\ No newline at end of file
+    _add_facility_layout(fig, geometry, lang_code)
+    return fig
@@ -0,0 +1,334 @@
+# wallboard.py
+"""
+Wallboard (kiosk) mode for shop-floor TVs: a fixed filter set, panels rotating full screen, and server-side push
+of what changed instead of page reloads. Served by api_server.py:
+
+    GET /wallboard?site=Plant%20A&panel=oee_panel&panel=downtime_panel&rotate=20&lang=ES   the page
+    GET /api/wallboard/state?<same parameters>      cards and full figures, loaded once by the page
+    GET /api/wallboard/events?<same parameters>     server-sent events with the changes
+
+One Board per (filters, panels, language) is shared by every screen showing it. Boards without a connected screen
+are dropped after config.WALLBOARD_IDLE_TTL_S, or least recently used first beyond config.WALLBOARD_MAX_BOARDS, so
+arbitrary URLs cannot grow the process. While a screen is connected, the
+board's refresher polls the per-source file fingerprints every config.WALLBOARD_REFRESH_S seconds and recomputes
+only the panels watching a changed source (PanelSpec.watched_sources), re-filtering only the changed sources. The
+new figures are diffed against those on screen: appended points are sent as Plotly.extendTraces, changed values
+(gauge needles, card texts) as restyles and text updates, and a figure is only redrawn when its traces change shape.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import pandas as pd
+from plotly.offline import get_plotlyjs_version
+from starlette.concurrency import run_in_threadpool
+
+import config
+import precomputed_store
+import panel_registry
+from pages import dashboard_page
+from panel_results import localize_insight
+
+logger = logging.getLogger(__name__)
+
+# --- Figure Diffs ---
+def _appended_points(old_trace: Dict[str, Any], new_trace: Dict[str, Any]) -> Optional[int]:
+    """Points appended to old_trace's x / y to get new_trace's (oldest ones dropped to keep its length), else None."""
+    old_x, old_y, new_x, new_y = (trace.get(axis) for trace in (old_trace, new_trace) for axis in ("x", "y"))
+    if not all(isinstance(values, list) for values in (old_x, old_y, new_x, new_y)) or len(new_x) != len(new_y) or not new_x:
+        return None # Binary typed arrays (plotly >= 6) and 1-axis traces are restyled instead
+    for appended in range(1, min(len(new_x) - 1, config.WALLBOARD_MAX_EXTEND_POINTS) + 1): # At least one point kept
+        kept = len(new_x) - appended
+        if kept <= len(old_x) and new_x[:kept] == old_x[len(old_x) - kept:] and new_y[:kept] == old_y[len(old_y) - kept:]:
+            return appended
+    return None
+
+def figure_updates(old_fig: Dict[str, Any], new_fig: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Plotly.js calls turning figure JSON old_fig into new_fig: "extend" (extendTraces), "restyle" per trace and
+    "relayout" for changed layout entries. None when the traces changed shape and the figure must be redrawn.
+    """
+    old_traces, new_traces = old_fig.get("data", []), new_fig.get("data", [])
+    if [trace.get("type") for trace in old_traces] != [trace.get("type") for trace in new_traces]:
+        return None
+    updates: List[Dict[str, Any]] = []
+    for trace_index, (old_trace, new_trace) in enumerate(zip(old_traces, new_traces)):
+        changed_keys = sorted(key for key in set(old_trace) | set(new_trace) if old_trace.get(key) != new_trace.get(key))
+        if not changed_keys:
+            continue
+        appended = _appended_points(old_trace, new_trace) if set(changed_keys) <= {"x", "y"} else None
+        if appended is not None:
+            updates.append({"op": "extend", "trace": trace_index, "x": new_trace["x"][-appended:], "y": new_trace["y"][-appended:],
+                            "max_points": len(new_trace["x"])})
+        else:
+            updates.append({"op": "restyle", "trace": trace_index, "update": {key: [new_trace.get(key)] for key in changed_keys}})
+    old_layout, new_layout = old_fig.get("layout", {}), new_fig.get("layout", {})
+    changed_layout = {key: new_layout.get(key) for key in set(old_layout) | set(new_layout) if old_layout.get(key) != new_layout.get(key)}
+    if changed_layout:
+        updates.append({"op": "relayout", "update": changed_layout})
+    return updates
+
+def panel_updates(old_panel: Optional[Dict[str, Any]], new_panel: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Changes between two panel states (see Board._build_panels); None if nothing the screen shows changed."""
+    if old_panel is None or old_panel["has_data"] != new_panel["has_data"] or set(old_panel["figures"]) != set(new_panel["figures"]) \
+            or {slot: card["label"] for slot, card in old_panel["cards"].items()} != {slot: card["label"] for slot, card in new_panel["cards"].items()}:
+        return {"replace": new_panel}
+    updates: Dict[str, Any] = {}
+    changed_cards = {slot: card["text"] for slot, card in new_panel["cards"].items() if old_panel["cards"][slot]["text"] != card["text"]}
+    if changed_cards:
+        updates["cards"] = changed_cards
+    figure_changes = {}
+    for slot, new_fig in new_panel["figures"].items():
+        figure_ops = figure_updates(old_panel["figures"][slot], new_fig)
+        if figure_ops is None:
+            figure_changes[slot] = {"react": new_fig}
+        elif figure_ops:
+            figure_changes[slot] = {"ops": figure_ops}
+    if figure_changes:
+        updates["figures"] = figure_changes
+    if old_panel["insights"] != new_panel["insights"]:
+        updates["insights"] = new_panel["insights"]
+    return updates or None
+
+def card_text(card: Dict[str, Any]) -> str:
+    """Card value as viz.display_metric_card shows it."""
+    value = card.get("value")
+    if value is None or pd.isna(value):
+        return "-"
+    value_format = card.get("value_format_str", ".1f") if isinstance(value, float) and value % 1 != 0 else ".0f"
+    return f"{value:{value_format}}{card.get('unit', '')}"
+
+# --- Boards ---
+class Board:
+    """Panels of one wallboard view as shown on screen, and the screens (event queues) subscribed to its changes."""
+
+    def __init__(self, filter_selections: Dict[str, List[str]], panel_names: List[str], lang_code: str):
+        self.filter_selections = filter_selections
+        self.panel_names = panel_names
+        self.lang_code = lang_code
+        self.version = 0 # 0: not built yet; +1 per update message
+        self.panels: Dict[str, Dict[str, Any]] = {}
+        self.source_fingerprints: Dict[str, str] = {}
+        self.subscribers: List[asyncio.Queue] = []
+        self.last_used = time.monotonic() # Last request for the board or last screen leaving it (see get_board)
+        self._lock = asyncio.Lock()
+        self._refresher: Optional[asyncio.Task] = None
+
+    def _build_panels(self, panel_names: List[str], source_fingerprints: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Worker thread: computes the panels and renders their cards and figures to JSON."""
+        import visualizations as viz # Only boards render figures; keeps plotly figures out of the API import path
+        text_strings = config.TEXT_STRINGS.get(self.lang_code, config.TEXT_STRINGS[config.DEFAULT_LANG])
+        results = dashboard_page.compute_panel_results(self.filter_selections, self.lang_code, panel_names,
+                                                       precomputed_store.current_data_fingerprint(), source_fingerprints)
+        return {panel_name_key: {
+            "title": text_strings.get(result.title_key, result.title_key), "has_data": result.has_data,
+            "cards": {slot: {"label": text_strings.get(card["label_key"], card["label_key"]), "text": card_text(card)}
+                      for slot, card in result.cards.items()} if result.has_data else {},
+            "figures": {slot: json.loads(viz.build_figure(spec, self.lang_code).to_json())
+                        for slot, spec in result.figures.items()} if result.has_data else {},
+            "insights": [localize_insight(insight_item, lambda key: text_strings.get(key, key))
+                         for insight_item in result.insights] if result.has_data else []
+        } for panel_name_key, result in results.items()}
+
+    async def ensure_built(self):
+        async with self._lock:
+            if self.version == 0:
+                source_fingerprints = dashboard_page.current_source_fingerprints()
+                self.panels = await run_in_threadpool(self._build_panels, self.panel_names, source_fingerprints)
+                self.source_fingerprints = source_fingerprints
+                self.version = 1
+
+    def state(self) -> Dict[str, Any]:
+        return {"version": self.version, "order": [name for name in self.panel_names if name in self.panels], "panels": self.panels}
+
+    async def refresh(self) -> Optional[Dict[str, Any]]:
+        """Recomputes the panels watching a changed source. Returns the update message, or None if nothing changed."""
+        async with self._lock:
+            source_fingerprints = await run_in_threadpool(dashboard_page.current_source_fingerprints)
+            changed_sources = {key for key, fingerprint in source_fingerprints.items() if self.source_fingerprints.get(key) != fingerprint}
+            self.source_fingerprints = source_fingerprints
+            panel_specs = panel_registry.get_panel_specs(compute_only=True)
+            stale_panels = [name for name in self.panel_names if changed_sources & set(panel_specs[name].watched_sources)]
+            if not stale_panels:
+                return None
+            rebuilt_panels = await run_in_threadpool(self._build_panels, stale_panels, source_fingerprints)
+            message_panels = {}
+            for panel_name_key, new_panel in rebuilt_panels.items():
+                updates = panel_updates(self.panels.get(panel_name_key), new_panel)
+                if updates is not None:
+                    message_panels[panel_name_key] = updates
+                self.panels[panel_name_key] = new_panel
+            if not message_panels:
+                return None
+            self.version += 1
+            logger.info(f"Wallboard {self.filter_selections}: sources {sorted(changed_sources)} changed, pushing {sorted(message_panels)}.")
+            return {"version": self.version, "panels": message_panels}
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=config.WALLBOARD_QUEUE_MAX)
+        self.subscribers.append(queue)
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.ensure_future(self._refresh_loop())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+            self.last_used = time.monotonic()
+
+    async def _refresh_loop(self):
+        while self.subscribers: # Stops with the last screen; the next subscriber starts it again
+            await asyncio.sleep(config.WALLBOARD_REFRESH_S)
+            try:
+                message = await self.refresh()
+            except Exception as e:
+                logger.error(f"Wallboard refresh failed for {self.filter_selections}: {e}", exc_info=True)
+                continue
+            for queue in list(self.subscribers) if message else []:
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull: # Screen too far behind: dropped, it reconnects and reloads the state
+                    self.unsubscribe(queue)
+
+# (filters, panels, language) -> board, per process, least recently used first. Only touched from the event loop thread.
+_BOARDS: "OrderedDict[Tuple, Board]" = OrderedDict()
+
+def _drop_idle_boards(keep_key: Tuple) -> None:
+    """Drops boards without screens: expired ones, then the least recently used ones beyond config.WALLBOARD_MAX_BOARDS."""
+    now = time.monotonic()
+    idle_keys = [key for key, board in _BOARDS.items() if not board.subscribers and key != keep_key]
+    for key in idle_keys:
+        if now - _BOARDS[key].last_used > config.WALLBOARD_IDLE_TTL_S:
+            del _BOARDS[key]
+    idle_keys = [key for key in idle_keys if key in _BOARDS]
+    for key in idle_keys[:max(0, len(_BOARDS) - config.WALLBOARD_MAX_BOARDS)]: # Boards with screens are never dropped
+        del _BOARDS[key]
+
+def get_board(filter_selections: Dict[str, List[str]], panel_names: List[str], lang_code: str) -> Board:
+    board_key = (tuple(sorted((k, tuple(sorted(v))) for k, v in filter_selections.items())), tuple(panel_names), lang_code)
+    board = _BOARDS.get(board_key)
+    if board is None:
+        board = _BOARDS[board_key] = Board(filter_selections, panel_names, lang_code)
+    _BOARDS.move_to_end(board_key)
+    board.last_used = time.monotonic()
+    _drop_idle_boards(board_key)
+    return board
+
+async def event_stream(board: Board) -> AsyncIterator[str]:
+    """Server-sent events of one screen: update messages as they come, a comment line as keep-alive otherwise."""
+    queue = board.subscribe()
+    try:
+        yield f"retry: {config.WALLBOARD_RECONNECT_MS}\n\n"
+        while queue in board.subscribers:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=config.WALLBOARD_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"data: {json.dumps(message, default=precomputed_store.json_default, separators=(',', ':'))}\n\n"
+    finally:
+        board.unsubscribe(queue)
+
+# --- Page ---
+def render_page(lang_code: str, rotate_s: float) -> str:
+    text_strings = config.TEXT_STRINGS.get(lang_code, config.TEXT_STRINGS[config.DEFAULT_LANG])
+    return (WALLBOARD_PAGE.replace("__TITLE__", text_strings.get("app_title", "Vital Signs"))
+            .replace("__LANG__", lang_code.lower()).replace("__ROTATE_MS__", str(int(rotate_s * 1000)))
+            .replace("__PLOTLYJS__", f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"))
+
+WALLBOARD_PAGE = """<!DOCTYPE html>
+<html lang="__LANG__"><head><meta charset="utf-8"><title>__TITLE__</title>
+<script src="__PLOTLYJS__"></script>
+<style>
+body { margin: 0; background: #2C3E50; color: #ECF0F1; font-family: sans-serif; overflow: hidden; }
+section { display: none; padding: 1.5vh 2vw; height: 97vh; box-sizing: border-box; }
+section.active { display: flex; flex-direction: column; }
+h1 { margin: 0 0 1vh 0; font-size: 4vh; }
+.cards { display: flex; gap: 1.5vw; margin-bottom: 1vh; }
+.card { background: #34495E; border-radius: 6px; padding: 1vh 1.2vw; min-width: 12vw; }
+.card .label { font-size: 1.8vh; color: #BDC3C7; } .card .value { font-size: 4.5vh; font-weight: bold; }
+.figures { flex: 1; display: grid; grid-template-columns: repeat(auto-fit, minmax(40vw, 1fr)); gap: 1vh; min-height: 0; }
+.figure { min-height: 30vh; } ul { font-size: 2vh; margin: 0.5vh 0; }
+</style></head>
+<body><div id="board"></div>
+<script>
+const query = window.location.search, rotateMs = __ROTATE_MS__;
+let board = null, version = 0, current = 0, connected = false;
+const sectionId = name => "panel-" + name, figureId = (name, slot) => "fig-" + name + "-" + slot;
+
+function renderPanel(name) {
+  const panel = board.panels[name];
+  let section = document.getElementById(sectionId(name));
+  if (!section) { section = document.createElement("section"); section.id = sectionId(name); document.getElementById("board").appendChild(section); }
+  section.innerHTML = "";
+  const title = document.createElement("h1"); title.textContent = panel.title; section.appendChild(title);
+  const cards = document.createElement("div"); cards.className = "cards"; section.appendChild(cards);
+  for (const [slot, card] of Object.entries(panel.cards)) {
+    const el = document.createElement("div"); el.className = "card";
+    el.innerHTML = '<div class="label"></div><div class="value"></div>';
+    el.querySelector(".label").textContent = card.label;
+    el.querySelector(".value").textContent = card.text; el.querySelector(".value").id = "card-" + name + "-" + slot;
+    cards.appendChild(el);
+  }
+  const figures = document.createElement("div"); figures.className = "figures"; section.appendChild(figures);
+  for (const [slot, fig] of Object.entries(panel.figures)) {
+    const el = document.createElement("div"); el.className = "figure"; el.id = figureId(name, slot); figures.appendChild(el);
+    Plotly.newPlot(el, fig.data, fig.layout, {displayModeBar: false, responsive: true});
+  }
+  const list = document.createElement("ul"); list.id = "insights-" + name; section.appendChild(list);
+  renderInsights(name, panel.insights);
+}
+
+function renderInsights(name, insights) {
+  const list = document.getElementById("insights-" + name); list.innerHTML = "";
+  for (const text of insights) { const item = document.createElement("li"); item.textContent = text; list.appendChild(item); }
+}
+
+function show(index) {
+  const sections = document.querySelectorAll("section");
+  if (!sections.length) return;
+  current = index % sections.length;
+  sections.forEach((section, i) => section.classList.toggle("active", i === current));
+  sections[current].querySelectorAll(".figure").forEach(el => Plotly.Plots.resize(el));
+}
+
+async function loadState() {
+  const response = await fetch("/api/wallboard/state" + query);
+  board = await response.json(); version = board.version;
+  document.getElementById("board").innerHTML = "";
+  board.order.forEach(renderPanel); show(current);
+}
+
+function applyFigure(el, change) {
+  if (change.react) { Plotly.react(el, change.react.data, change.react.layout); return; }
+  for (const op of change.ops) {
+    if (op.op === "extend") Plotly.extendTraces(el, {x: [op.x], y: [op.y]}, [op.trace], op.max_points);
+    else if (op.op === "restyle") Plotly.restyle(el, op.update, [op.trace]);
+    else if (op.op === "relayout") Plotly.relayout(el, op.update);
+  }
+}
+
+function applyUpdate(message) {
+  if (message.version !== version + 1) { loadState(); return; } // Missed an update: resync
+  version = message.version;
+  for (const [name, update] of Object.entries(message.panels)) {
+    if (update.replace) { board.panels[name] = update.replace; renderPanel(name); show(current); continue; }
+    for (const [slot, text] of Object.entries(update.cards || {})) {
+      document.getElementById("card-" + name + "-" + slot).textContent = text;
+    }
+    for (const [slot, change] of Object.entries(update.figures || {})) applyFigure(document.getElementById(figureId(name, slot)), change);
+    if (update.insights) renderInsights(name, update.insights);
+  }
+}
+
+loadState().then(() => {
+  setInterval(() => show(current + 1), rotateMs);
+  const events = new EventSource("/api/wallboard/events" + query);
+  events.onopen = () => { if (connected) loadState(); connected = true; }; // Reconnected: changes may have been missed
+  events.onmessage = event => applyUpdate(JSON.parse(event.data));
+});
+</script></body></html>
+"""